@@ -0,0 +1,81 @@
+"""Tabulated ISA atmosphere against the ISA formulas.
+
+Run with: python benchmark/bench_atmos.py [number of points]
+
+Reports the throughput of the atmosphere, of the speed conversions built on
+it, and of FuelFlow.enroute, and the largest relative error of the table
+(see ``aero.set_atmos_table``).
+
+"""
+
+import sys
+import time
+import numpy as np
+from openap import aero, FuelFlow
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+rng = np.random.default_rng(42)
+h = rng.uniform(0, 12500, n)
+v = rng.uniform(80, 250, n)
+mass = rng.uniform(50000, 75000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+fuelflow = FuelFlow("A320")
+
+calls = [
+    ("aero.atmos", lambda: aero.atmos(h)),
+    ("aero.density", lambda: aero.density(h)),
+    ("aero.tas2cas", lambda: aero.tas2cas(v, h)),
+    ("aero.cas2tas", lambda: aero.cas2tas(v, h)),
+    ("aero.tas2mach", lambda: aero.tas2mach(v, h)),
+    (
+        "FuelFlow.enroute",
+        lambda: fuelflow.enroute(mass, v / aero.kts, h / aero.ft, path_angle),
+    ),
+]
+
+
+def timed(func, repeat=5):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def error(est, ref):
+    est, ref = np.atleast_1d(est), np.atleast_1d(ref)
+    return max(np.max(np.abs(e / r - 1)) for e, r in zip(est, ref))
+
+
+if __name__ == "__main__":
+    print(f"{n:,} points, altitudes between 0 and 12.5 km")
+    print("-" * 66)
+    print(
+        f"{'':<20} {'formulas (Mpt/s)':>17} {'table':>8} "
+        f"{'speedup':>8} {'max rel':>9}"
+    )
+    print("-" * 66)
+    for label, func in calls:
+        aero.set_atmos_table(None)
+        t_ref, ref = timed(func)
+        aero.set_atmos_table()
+        t, res = timed(func)
+        rel = error(res, ref)
+        print(
+            f"{label:<20} {n / t_ref / 1e6:17.1f} {n / t / 1e6:8.1f} "
+            f"{t_ref / t:7.2f}x {rel:9.1e}"
+        )
+    print("-" * 66)
+
+    # error on the full table, between the breakpoints
+    hh = np.arange(0, 20000, 0.1) + rng.uniform(0, 0.1, 200000)
+    ref = aero._isa(hh)
+    for step in [0.5, 1, 5, 10, 50]:
+        aero.set_atmos_table(step)
+        rel = error(aero.atmos(hh), ref)
+        print(f"step {step:>4} m, 0-20 km: max rel error {rel:.1e}")
+    aero.set_atmos_table(None)
+    print("-" * 66)
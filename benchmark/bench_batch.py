@@ -0,0 +1,98 @@
+"""Ragged batch of flights, integrated in one call against one call per flight.
+
+Run with: python benchmark/bench_batch.py [number of flights]
+
+The flights have between 200 and 800 points, concatenated with their offsets
+(CSR layout). The batch is integrated with the compiled recurrence (when
+numba is installed), in lockstep with array operations, and with the python
+recurrence, flight after flight. The errors are relative to the compiled
+final masses (forward) and to the initial masses (backward).
+
+"""
+
+import sys
+import time
+import numpy as np
+from openap import mission
+
+n_flights = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+rng = np.random.default_rng(42)
+
+
+def flights():
+    sizes = rng.integers(200, 801, n_flights)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    t = np.concatenate([np.linspace(0, 1, s) for s in sizes])
+    cruise = np.repeat(rng.uniform(30000, 39000, n_flights), sizes)
+    alt = cruise * np.clip(np.minimum(t, 1 - t) / 0.3, 0, 1)
+    tas = 250 + 200 * alt / 39000
+    dt = np.repeat(rng.uniform(10, 30, n_flights), sizes)
+    climb = np.diff(alt, append=0) / dt
+    climb[offsets[1:] - 1] = 0
+    path_angle = np.degrees(np.arctan(climb * 0.3048 / (tas * 0.5144)))
+    masses = rng.uniform(55000, 70000, n_flights)
+    return masses, dt, tas, alt, path_angle, offsets
+
+
+def timed(func, repeat=3):
+    func()
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == "__main__":
+    masses, dt, tas, alt, path_angle, offsets = flights()
+    n = offsets[-1]
+    m = mission.Mission("A320")
+    args = (masses, dt, tas, alt, path_angle)
+
+    def batch(mass, backward=False):
+        return m.integrate(
+            mass, *args[1:], offsets=offsets, emissions=False, backward=backward
+        )
+
+    def per_flight():
+        return [
+            m.integrate(
+                masses[i],
+                *[a[offsets[i] : offsets[i + 1]] for a in args[1:]],
+                emissions=False,
+            )["final_mass"]
+            for i in range(n_flights)
+        ]
+
+    rows = []
+    modes = [("compiled", True, 1), ("lockstep", False, 1), ("python", False, 10**9)]
+    final = None
+    for label, use_numba, threshold in modes:
+        mission.use_numba, mission.lockstep_threshold = use_numba, threshold
+        if use_numba and mission._compiled() is None:
+            continue
+        repeat = 1 if label == "python" else 3
+
+        t, result = timed(lambda: batch(masses), repeat)
+        final = result["final_mass"] if final is None else final
+        err = np.nanmax(np.abs(result["final_mass"] / final - 1))
+        rows.append((f"batch, {label}, forward", t, err))
+
+        # backwards from the final masses, to the initial masses
+        t, result = timed(lambda: batch(final, backward=True), repeat)
+        err = np.nanmax(np.abs(result["initial_mass"] / masses - 1))
+        rows.append((f"batch, {label}, backward", t, err))
+
+    mission.use_numba = True
+    t, _ = timed(per_flight, repeat=1)
+    rows.append(("one call per flight", t, np.nan))
+
+    print(f"A320, {n_flights:,} flights, {n:,} points, no emissions")
+    print("-" * 62)
+    print(f"{'':<32} {'time (ms)':>9} {'ns/pt':>7} {'max rel err':>11}")
+    print("-" * 62)
+    for label, t, err in rows:
+        print(f"{label:<32} {t * 1e3:9.1f} {t / n * 1e9:7.0f} {err:11.1e}")
+    print("-" * 62)
@@ -0,0 +1,79 @@
+"""Cached casadi functions of the models against building the expressions.
+
+Run with: python benchmark/bench_casadi.py [number of points]
+
+The symbolic rows time a call of FuelFlow.enroute with SX and MX arguments,
+building the expression in python (cache disabled) or calling the cached
+function. The numeric rows evaluate the mapped function on arrays, as a
+casadi virtual machine and compiled (C code generated and compiled in a
+temporary directory), against the numpy backend.
+
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import casadi
+import openap
+from openap import casadi as oc
+from openap.casadi import cache
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+rng = np.random.default_rng(42)
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+
+
+def timed(func, repeat=5):
+    func()
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == "__main__":
+    fuelflow = oc.FuelFlow("A320")
+
+    print(f"A320, FuelFlow.enroute, {os.cpu_count()} CPUs")
+    print("-" * 48)
+    print(f"{'symbolic call':<32} {'time (ms)':>14}")
+    print("-" * 48)
+    for sym in (casadi.SX, casadi.MX):
+        args = [sym.sym(name) for name in "mvh"]
+        cache.enabled = False
+        t_build, _ = timed(lambda: fuelflow.enroute(*args))
+        cache.enabled = True
+        t_cached, _ = timed(lambda: fuelflow.enroute(*args))
+        print(f"{sym.__name__ + ', built':<32} {t_build * 1e3:14.2f}")
+        print(f"{sym.__name__ + ', cached':<32} {t_cached * 1e3:14.2f}")
+    print("-" * 48)
+
+    print(f"{f'evaluation, {n:,} points':<32} {'time (ms)':>9} {'ns/pt':>6}")
+    print("-" * 48)
+    t_numpy, ref = timed(lambda: openap.FuelFlow("A320").enroute(mass, tas, alt))
+    rows = [("numpy", t_numpy)]
+
+    with tempfile.TemporaryDirectory() as path:
+        cache.cache_dir = path
+        for compile in (False, True):
+            for n_threads in sorted({1, os.cpu_count() or 1}):
+                t, ff = timed(
+                    lambda: cache.evaluate(
+                        fuelflow, "enroute", mass, tas, alt,
+                        n_threads=n_threads, compile=compile,
+                    )
+                )
+                assert np.allclose(ff, ref, rtol=1e-12, equal_nan=True)
+                label = f"{'compiled' if compile else 'virtual machine'}"
+                rows.append((f"{label}, {n_threads} threads", t))
+
+    for label, t in rows:
+        print(f"{label:<32} {t * 1e3:9.1f} {t / n * 1e9:6.0f}")
+    print("-" * 48)
@@ -0,0 +1,52 @@
+"""Peak memory and run time of FuelFlow.enroute against the chunk size.
+
+Run with: python benchmark/bench_chunks.py [number of points]
+
+"""
+
+import sys
+import time
+import tracemalloc
+import numpy as np
+from openap import FuelFlow
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+rng = np.random.default_rng(42)
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+fuelflow = FuelFlow("A320")
+
+
+def run(chunk_size):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    ff = fuelflow.enroute(mass, tas, alt, path_angle, chunk_size=chunk_size)
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ff, dt, peak
+
+
+if __name__ == "__main__":
+    inputs = 4 * n * 8 / 1e6
+    print(f"FuelFlow.enroute, {n:,} points ({inputs:.0f} MB of inputs)")
+    print("-" * 66)
+    print(f"{'chunk size':>12} {'time (s)':>10} {'peak (MB)':>11} {'x output':>9} {'identical':>10}")
+    print("-" * 66)
+
+    ref, dt, peak = run(None)
+    output = ref.nbytes
+    print(f"{'none':>12} {dt:10.2f} {peak / 1e6:11.0f} {peak / output:9.1f} {'-':>10}")
+
+    for chunk_size in [2 ** 12, 2 ** 14, 2 ** 16, 2 ** 18, 2 ** 20]:
+        ff, dt, peak = run(chunk_size)
+        same = np.array_equal(ff, ref, equal_nan=True)
+        print(
+            f"{chunk_size:>12} {dt:10.2f} {peak / 1e6:11.0f} "
+            f"{peak / output:9.1f} {str(same):>10}"
+        )
+    print("-" * 66)
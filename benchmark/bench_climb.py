@@ -0,0 +1,78 @@
+"""Segment-wise (masked) against dense evaluation of the climb thrust.
+
+Run with: python benchmark/bench_climb.py [number of points]
+
+The dense evaluation computes the three altitude segments of the climb
+thrust for every point, the masked evaluation computes each segment on its
+own points only (see ``openap.thrust.masked_threshold``).
+
+"""
+
+import sys
+import time
+import numpy as np
+from openap import thrust, FuelFlow, Thrust
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+rng = np.random.default_rng(42)
+tas = rng.uniform(150, 480, n)
+mass = rng.uniform(50000, 75000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+
+def altitudes(low, mid, high):
+    """Random altitudes with the given shares of the three segments."""
+    segment = rng.choice(3, n, p=[low, mid, high])
+    lo = np.array([0, 10000, 30000])[segment]
+    hi = np.array([10000, 30000, 41000])[segment]
+    return rng.uniform(lo, hi)
+
+
+mixes = [
+    ("flights (15/25/60%)", altitudes(0.15, 0.25, 0.6)),
+    ("uniform (25/50/25%)", altitudes(0.25, 0.5, 0.25)),
+    ("terminal (90/10/0%)", altitudes(0.9, 0.1, 0.0)),
+    ("cruise (0/0/100%)", altitudes(0.0, 0.0, 1.0)),
+]
+
+thrust_model = Thrust("A320")
+fuelflow = FuelFlow("A320")
+
+calls = [
+    ("Thrust.climb", lambda alt: thrust_model.climb(tas, alt, 1000)),
+    ("Thrust.descent_idle", lambda alt: thrust_model.descent_idle(tas, alt)),
+    ("FuelFlow.enroute", lambda alt: fuelflow.enroute(mass, tas, alt, path_angle)),
+]
+
+
+def timed(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == "__main__":
+    print(f"A320, {n:,} points, altitude shares below 10k / 10-30k / above 30k ft")
+    print("-" * 78)
+    print(
+        f"{'':<20} {'altitudes':<20} {'dense (Mpt/s)':>14} "
+        f"{'masked':>8} {'speedup':>8} {'identical':>5}"
+    )
+    print("-" * 78)
+    for label, func in calls:
+        for mix, alt in mixes:
+            thrust.masked_threshold = None
+            t_ref, ref = timed(lambda: func(alt))
+            thrust.masked_threshold = 1
+            t, res = timed(lambda: func(alt))
+            same = np.array_equal(res, ref, equal_nan=True)
+            print(
+                f"{label:<20} {mix:<20} {n / t_ref / 1e6:14.1f} "
+                f"{n / t / 1e6:8.1f} {t_ref / t:7.2f}x {str(same):>5}"
+            )
+    print("-" * 78)
+    thrust.masked_threshold = None
@@ -0,0 +1,55 @@
+"""All emissions in one call against one call per species.
+
+Run with: python benchmark/bench_emission.py [number of points]
+
+"""
+
+import sys
+import timeit
+import numpy as np
+from openap import Emission
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+rng = np.random.default_rng(42)
+ffac = rng.uniform(0.2, 3, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+
+emission = Emission("A320")
+
+
+def separate(ffac, tas, alt):
+    return {
+        "co2": emission.co2(ffac),
+        "h2o": emission.h2o(ffac),
+        "nox": emission.nox(ffac, tas, alt),
+        "co": emission.co(ffac, tas, alt),
+        "hc": emission.hc(ffac, tas, alt),
+        "sox": emission.sox(ffac),
+        "soot": emission.soot(ffac),
+    }
+
+
+def timed(func, args, number):
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=5)) / number
+
+
+if __name__ == "__main__":
+    print("Emission of all species, A320")
+    print("-" * 66)
+    print(f"{'':<24} {'separate':>12} {'all()':>12} {'speedup':>8} {'identical':>9}")
+    print("-" * 66)
+    for label, args, number, unit, scale in [
+        ("scalar, per call", (1.2, 300.0, 30000.0), 2000, "us", 1e6),
+        (f"{n:,} points", (ffac, tas, alt), 5, "ms", 1e3),
+    ]:
+        t_ref = timed(separate, args, number)
+        t = timed(emission.all, args, number)
+        ref, res = separate(*args), emission.all(*args)
+        same = all(np.array_equal(ref[s], res[s]) for s in ref)
+        print(
+            f"{label:<24} {t_ref * scale:9.1f} {unit} {t * scale:9.1f} {unit} "
+            f"{t_ref / t:7.1f}x {str(same):>9}"
+        )
+    print("-" * 66)
@@ -0,0 +1,70 @@
+"""Mixed-fleet evaluation against a per-type split and merge.
+
+Run with: python benchmark/bench_fleet.py [number of points]
+
+"""
+
+import sys
+import time
+import numpy as np
+import openap
+from openap.fleet import FleetFuelFlow, FleetEmission
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+# all the types with a drag polar, interleaved row by row
+types = [
+    "A319", "A320", "A321", "A332", "A333", "A343", "A388", "B737",
+    "B738", "B739", "B744", "B752", "B77W", "B788", "B789", "E190",
+]  # fmt: skip
+
+rng = np.random.default_rng(42)
+index = rng.integers(0, len(types), n)
+typecode = np.array(types)[index]
+mtow = np.array([openap.prop.aircraft(ac)["limits"]["MTOW"] for ac in types])
+mass = rng.uniform(0.6, 0.9, n) * mtow[index]
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+
+def timed(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def split_merge():
+    fuelflow = np.empty(n)
+    nox = np.empty(n)
+    for ac in np.unique(typecode):
+        rows = typecode == ac
+        m = openap.models(ac)
+        ff = m.fuelflow.enroute(mass[rows], tas[rows], alt[rows], path_angle[rows])
+        fuelflow[rows] = ff
+        nox[rows] = m.emission.nox(ff, tas[rows], alt[rows])
+    return fuelflow, nox
+
+
+def fleet(codes):
+    ff = fleet_ff.enroute(codes, mass, tas, alt, path_angle)
+    return ff, fleet_em.nox(codes, ff, tas, alt)
+
+
+if __name__ == "__main__":
+    fleet_ff = FleetFuelFlow(types)
+    fleet_em = FleetEmission(types)
+
+    print(f"FuelFlow.enroute and Emission.nox, {n:,} points, {len(types)} types")
+    print("-" * 66)
+    t_ref, ref = timed(split_merge)
+    print(f"{'split and merge by type':<32} {t_ref * 1e3:9.1f} ms")
+
+    for label, codes in [("fleet, type names", typecode), ("fleet, type index", index)]:
+        t, res = timed(lambda: fleet(codes))
+        same = all(np.array_equal(a, b, equal_nan=True) for a, b in zip(res, ref))
+        print(f"{label:<32} {t * 1e3:9.1f} ms {t_ref / t:6.1f}x  identical: {same}")
+    print("-" * 66)
@@ -0,0 +1,60 @@
+"""Per-call cost of the invariants hoisted into the model constants.
+
+Run with: python benchmark/bench_invariants.py
+
+"""
+
+import timeit
+from openap import FuelFlow, Thrust, Drag, aero
+
+ac, eng = "A320", "CFM56-5B4"
+fuelflow = FuelFlow(ac, eng)
+thrust = Thrust(ac, eng)
+drag = Drag(ac)
+
+
+def hoisted_fuelflow():
+    # previously evaluated by FuelFlow.at_thrust() on every call
+    v_lof_max = fuelflow.wrap.takeoff_speed()["maximum"]
+    fuelflow.thrust.takeoff(tas=v_lof_max / 0.5144, alt=0)
+
+
+def hoisted_thrust():
+    # previously evaluated by Thrust.climb() on every call
+    aero.pressure(10000 * aero.ft)
+    aero.pressure(thrust.cruise_alt * aero.ft)
+    aero.mach2cas(thrust.cruise_mach, thrust.cruise_alt * aero.ft)
+
+
+def hoisted_drag():
+    # previously evaluated by Drag.nonclean() on every call
+    a = drag.aircraft
+    a["limits"]["MTOW"] * 9.8065 / a["wing"]["area"] * 3.16e-5 * a["limits"][
+        "MTOW"
+    ] ** (-0.215)
+    a["wing"]["span"] ** 2 / a["wing"]["area"]
+
+
+def bench(label, func, n=2000):
+    t = timeit.timeit(func, number=n) / n * 1e6
+    print(f"{label:<45} {t:8.2f} us/call")
+    return t
+
+
+if __name__ == "__main__":
+    print("-" * 66)
+    t = bench("FuelFlow.at_thrust", lambda: fuelflow.at_thrust(50000, 30000))
+    s = bench("  saved (max takeoff thrust)", hoisted_fuelflow)
+    print(f"  -> {s / (t + s) * 100:.0f}% of the previous per-call cost")
+
+    t = bench("Thrust.climb", lambda: thrust.climb(250, 30000, 1000))
+    s = bench("  saved (P10, Pcr, Fcr, vcas_ref)", hoisted_thrust)
+    print(f"  -> {s / (t + s) * 100:.0f}% of the previous per-call cost")
+
+    t = bench(
+        "Drag.nonclean",
+        lambda: drag.nonclean(60000, 150, 2000, 20, landing_gear=True),
+    )
+    s = bench("  saved (gear drag, aspect ratio)", hoisted_drag)
+    print(f"  -> {s / (t + s) * 100:.0f}% of the previous per-call cost")
+    print("-" * 66)
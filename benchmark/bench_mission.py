@@ -0,0 +1,103 @@
+"""Mission fuel burn integration against a loop over the points.
+
+Run with: python benchmark/bench_mission.py [number of points]
+
+The loop evaluates FuelFlow.enroute and Emission.all point by point, as the
+workbench scripts did before openap.mission. The integrator is timed with
+the mass recurrence compiled by numba (when installed) and in python, and
+backwards from the final mass (error: on the initial mass), with the level
+cruise run in closed form (breguet, error: on the total fuel burn), and the
+trip fuel solver with its emissions.
+
+"""
+
+import sys
+import time
+import numpy as np
+import openap
+from openap import mission
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+t = np.linspace(0, 1, n)
+alt = 36000 * np.clip(np.minimum(t, 1 - t) / 0.2, 0, 1)
+tas = 250 + 200 * alt / 36000
+dt = np.full(n, 20000 / n)
+path_angle = np.degrees(np.arctan(np.gradient(alt, dt[0]) * 0.3048 / (tas * 0.5144)))
+
+
+def timed(func, repeat=3):
+    func()
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def loop(fuelflow, emission, mass):
+    fuel, co2 = np.zeros(n), np.zeros(n)
+    for i in range(n):
+        ff = fuelflow.enroute(mass, tas[i], alt[i], path_angle[i])
+        mass -= ff * dt[i]
+        fuel[i] = ff * dt[i]
+        co2[i] = emission.all(ff, tas[i], alt[i])["co2"] * dt[i]
+    return fuel, co2
+
+
+if __name__ == "__main__":
+    m = mission.Mission("A320")
+    fuelflow, emission = m.fuelflow, m.emission
+
+    t_loop, (fuel, co2) = timed(lambda: loop(fuelflow, emission, 65000), repeat=1)
+    rows = [("loop over the points", t_loop, 0.0)]
+
+    for use_numba in (True, False):
+        mission.use_numba = use_numba
+        if use_numba and mission._compiled() is None:
+            continue
+        label = "numba" if use_numba else "python"
+        for emissions in (False, True):
+            t_int, result = timed(
+                lambda: m.integrate(
+                    65000, dt, tas, alt, path_angle, emissions=emissions
+                )
+            )
+            err = np.nanmax(np.abs(result["fuel"] / fuel - 1))
+            if emissions:
+                err = max(err, np.nanmax(np.abs(result["co2"] / co2 - 1)))
+            suffix = ", emissions" if emissions else ""
+            rows.append((f"integrate ({label}{suffix})", t_int, err))
+
+        t_breguet, cruise = timed(
+            lambda: m.integrate(
+                65000, dt, tas, alt, path_angle, emissions=False, breguet=1e-3
+            )
+        )
+        err = abs(cruise["totals"]["fuel"] / fuel.sum() - 1)
+        steps = cruise["breguet"]["steps"]
+        rows.append((f"breguet ({label}, {steps} steps)", t_breguet, err))
+
+        t_back, back = timed(
+            lambda: m.integrate(
+                result["final_mass"], dt, tas, alt, path_angle, backward=True
+            )
+        )
+        err = abs(back["initial_mass"] / 65000 - 1)
+        rows.append((f"integrate backward ({label})", t_back, err))
+
+        t_trip, solution = timed(
+            lambda: m.trip_fuel(15000, dt, tas, alt, path_angle, reserve=2000)
+        )
+        k = solution["iterations"]
+        trip = f"trip fuel ({label}, {k} pass{'es' if k > 1 else ''})"
+        rows.append((trip, t_trip, np.nan))
+
+    print(f"A320, {n:,} points, fuel burn {fuel.sum():.0f} kg")
+    print("-" * 64)
+    print(f"{'':<34} {'time (ms)':>9} {'speedup':>8} {'max rel err':>11}")
+    print("-" * 64)
+    for label, t, err in rows:
+        print(f"{label:<34} {t * 1e3:9.1f} {t_loop / t:8.0f} {err:11.1e}")
+    print("-" * 64)
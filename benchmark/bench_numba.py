@@ -0,0 +1,81 @@
+"""Numba backend against the numpy models.
+
+Run with: python benchmark/bench_numba.py
+
+The first run includes the compilation of the kernels, which are then
+cached on disk.
+
+"""
+
+import time
+import numpy as np
+import numba
+import openap
+from openap import numba as onb
+
+ac = "A320"
+n = 1_000_000
+
+rng = np.random.default_rng(42)
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+
+def timed(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def integrate(fuelflow, steps=2000, dt=10):
+    # mass-dependent fuel integration along a cruise, one point at a time
+    m = 70000.0
+    for _ in range(steps):
+        m -= fuelflow.enroute(m, 450.0, 35000.0, 0.0) * dt
+    return m
+
+
+if __name__ == "__main__":
+    ff_np = openap.FuelFlow(ac)
+    ff_nb = onb.FuelFlow(ac)
+
+    t0 = time.perf_counter()
+    ff_nb.enroute(mass[:10], tas[:10], alt[:10], path_angle[:10])
+    onb.parallel_threshold, threshold = 0, onb.parallel_threshold
+    ff_nb.enroute(mass[:10], tas[:10], alt[:10], path_angle[:10])
+    onb.parallel_threshold = threshold
+    print(f"load / compile kernels: {time.perf_counter() - t0:.2f} s")
+
+    print("-" * 66)
+    print(f"FuelFlow.enroute, {n:,} points")
+    t_np, ref = timed(lambda: ff_np.enroute(mass, tas, alt, path_angle))
+    print(f"{'numpy':<32} {t_np * 1e3:9.1f} ms")
+
+    onb.parallel_threshold = np.inf
+    t_serial, res = timed(lambda: ff_nb.enroute(mass, tas, alt, path_angle))
+    print(f"{'numba':<32} {t_serial * 1e3:9.1f} ms {t_np / t_serial:6.1f}x")
+
+    onb.parallel_threshold = 0
+    t_par, res = timed(lambda: ff_nb.enroute(mass, tas, alt, path_angle))
+    label = f"numba parallel ({numba.get_num_threads()} threads)"
+    print(f"{label:<32} {t_par * 1e3:9.1f} ms {t_np / t_par:6.1f}x")
+    onb.parallel_threshold = threshold
+
+    ok = ~np.isnan(ref)
+    assert np.array_equal(ok, ~np.isnan(res))
+    err = np.max(np.abs(res[ok] - ref[ok]) / ref[ok])
+    print(f"{'max. relative difference':<32} {err:9.1e}")
+
+    print("-" * 66)
+    print("mass integration, 2000 scalar steps")
+    t_np, m_np = timed(lambda: integrate(ff_np))
+    t_nb, m_nb = timed(lambda: integrate(ff_nb))
+    print(f"{'numpy (scalar fast path)':<32} {t_np * 1e3:9.1f} ms")
+    print(f"{'numba':<32} {t_nb * 1e3:9.1f} ms {t_np / t_nb:6.1f}x")
+    print(f"{'final mass difference (kg)':<32} {abs(m_np - m_nb):9.1e}")
+    print("-" * 66)
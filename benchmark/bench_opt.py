@@ -0,0 +1,79 @@
+"""Cruise optimizer with analytic gradients against numerical differentiation.
+
+Run with: python benchmark/bench_opt.py [number of masses]
+
+The numerical rows use the numdifftools Jacobians of the objective and the
+constraints, as the optimizer did before the analytic gradients (*_grad
+methods of the models). They are skipped when numdifftools is not installed.
+
+"""
+
+import sys
+import time
+import numpy as np
+from openap import aero
+from openap.traj.opt import CruiseOptimizer
+
+try:
+    from numdifftools import Jacobian
+except ImportError:
+    Jacobian = None
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+
+class NumericalOptimizer(CruiseOptimizer):
+    """Optimizer with numerical Jacobians."""
+
+    def _jac(self, func):
+        return lambda x, mass: Jacobian(lambda x: func(x, mass))(x)
+
+    def jac_fuel(self, x, mass):
+        return self._jac(self.func_fuel)(x, mass)
+
+    def jac_time(self, x, mass):
+        return self._jac(self.func_time)(x, mass)
+
+    def jac_cons_lift(self, x, mass):
+        return self._jac(self.func_cons_lift)(x, mass)
+
+    def jac_cons_thrust(self, x, mass):
+        return self._jac(self.func_cons_thrust)(x, mass)
+
+
+def run(opt, goal, masses):
+    t0 = time.perf_counter()
+    results = [opt.optimize(goal, mass=m) for m in masses]
+    return time.perf_counter() - t0, results
+
+
+if __name__ == "__main__":
+    masses = np.linspace(45000, 78000, n)
+
+    optimizers = {"analytic": CruiseOptimizer("A320")}
+    if Jacobian is not None:
+        optimizers["numerical"] = NumericalOptimizer("A320")
+    for opt in optimizers.values():
+        opt.update_bounds(hmin=30000 * aero.ft, hmax=37000 * aero.ft)
+
+    print(f"A320, {n} masses")
+    print("-" * 68)
+    print(
+        f"{'':<16} {'time (s)':>9} {'iterations':>11} {'it/s':>8} "
+        f"{'success':>8} {'max dx':>9}"
+    )
+    print("-" * 68)
+    for goal in ["fuel", "time"]:
+        ref = None
+        for label, opt in optimizers.items():
+            t, results = run(opt, goal, masses)
+            nit = sum(r.nit for r in results)
+            ok = sum(r.success for r in results)
+            x = np.array([r.x for r in results])
+            dx = 0.0 if ref is None else np.max(np.abs(x - ref))
+            ref = x if ref is None else ref
+            print(
+                f"{goal + ', ' + label:<16} {t:9.2f} {nit:11d} {nit / t:8.0f} "
+                f"{ok:5d}/{n:<2d} {dx:9.1e}"
+            )
+    print("-" * 68)
@@ -0,0 +1,57 @@
+"""Per-call latency of the scalar fast path against the numpy evaluation.
+
+Run with: python benchmark/bench_scalar.py
+
+"""
+
+import timeit
+import numpy as np
+from openap import FuelFlow, Thrust, Drag, Emission, extra
+
+ac, eng = "A320", "CFM56-5B4"
+fuelflow = FuelFlow(ac, eng)
+thrust = Thrust(ac, eng)
+drag = Drag(ac)
+emission = Emission(ac, eng)
+
+calls = [
+    ("FuelFlow.enroute", fuelflow.enroute, (60000, 230, 32000, 1)),
+    ("FuelFlow.takeoff", fuelflow.takeoff, (150, 0)),
+    ("FuelFlow.at_thrust", fuelflow.at_thrust, (50000, 30000)),
+    ("Thrust.climb", thrust.climb, (250, 30000, 1000)),
+    ("Thrust.takeoff", thrust.takeoff, (150, 0)),
+    ("Drag.clean", drag.clean, (60000, 230, 32000)),
+    ("Drag.nonclean", drag.nonclean, (60000, 150, 2000, 20)),
+    ("Emission.nox", emission.nox, (0.8, 230, 32000)),
+    ("Emission.co", emission.co, (0.8, 230, 32000)),
+    ("Emission.co2", emission.co2, (0.8,)),
+]
+
+
+def bench(func, args, n=5000):
+    return timeit.timeit(lambda: func(*args), number=n) / n * 1e6
+
+
+if __name__ == "__main__":
+    print("-" * 70)
+    print(f"{'':<22} {'numpy (us)':>12} {'scalar (us)':>12} {'speedup':>9} {'rel.err':>10}")
+    print("-" * 70)
+
+    for label, func, args in calls:
+        extra.set_scalar_fast_path(False)
+        ref = func(*args)
+        t_array = bench(func, args)
+
+        extra.set_scalar_fast_path(True)
+        res = func(*args)
+        t_scalar = bench(func, args)
+
+        err = abs(res - ref) / abs(ref)
+        assert err < 1e-12, (label, res, ref)
+
+        print(
+            f"{label:<22} {t_array:12.2f} {t_scalar:12.2f} "
+            f"{t_array / t_scalar:8.1f}x {err:10.1e}"
+        )
+
+    print("-" * 70)
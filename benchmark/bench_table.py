@@ -0,0 +1,90 @@
+"""Tabulated fuel flow and NOx models against the analytic models.
+
+Run with: python benchmark/bench_table.py [number of points]
+
+The numba rows are skipped when numba is not installed.
+
+With numpy, the tables are about as fast as the analytic models on arrays, and
+slower for scalar calls; only the numba tables are faster than the models.
+
+"""
+
+import sys
+import time
+import timeit
+import numpy as np
+import openap
+from openap.table import FuelFlowTable, EmissionTable
+
+try:
+    from openap import numba as onb
+except ImportError:
+    onb = None
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+rng = np.random.default_rng(42)
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+
+def timed(func, repeat=3):
+    func()
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def per_call(func, number=2000):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+if __name__ == "__main__":
+    models = openap.models("A320")
+    fuelflow = {"analytic": models.fuelflow, "table": FuelFlowTable("A320")}
+    emission = {"analytic": models.emission, "table": EmissionTable("A320")}
+    if onb is not None:
+        onb.parallel_threshold = np.inf
+        fuelflow["numba"] = onb.FuelFlow("A320")
+        fuelflow["numba table"] = onb.FuelFlowTable("A320")
+        emission["numba"] = onb.Emission("A320")
+        emission["numba table"] = onb.EmissionTable("A320")
+
+    print(f"A320, {n:,} points")
+    print(f"table error, fuel flow: {fuelflow['table'].error}")
+    print(f"table error, emission:  {emission['table'].error}")
+    print("-" * 66)
+    print(
+        f"{'':<24} {'array (ms)':>11} {'speedup':>8} "
+        f"{'scalar (us)':>12} {'max rel':>8}"
+    )
+    print("-" * 66)
+
+    t_ref, ref = timed(lambda: fuelflow["analytic"].enroute(mass, tas, alt, path_angle))
+    s_ref = per_call(lambda: fuelflow["analytic"].enroute(60000, 300, 30000, 1.0))
+    for label, model in fuelflow.items():
+        t, ff = timed(lambda: model.enroute(mass, tas, alt, path_angle))
+        s = per_call(lambda: model.enroute(60000, 300, 30000, 1.0))
+        rel = np.nanmax(np.abs(ff / ref - 1))
+        print(
+            f"{'enroute, ' + label:<24} {t * 1e3:11.1f} {t_ref / t:7.1f}x "
+            f"{s * 1e6:12.1f} {rel:8.1e}"
+        )
+
+    ff = np.nan_to_num(ref, nan=1.0)
+    t_ref, ref = timed(lambda: emission["analytic"].nox(ff, tas, alt))
+    s_ref = per_call(lambda: emission["analytic"].nox(1.0, 300, 30000))
+    for label, model in emission.items():
+        t, nox = timed(lambda: model.nox(ff, tas, alt))
+        s = per_call(lambda: model.nox(1.0, 300, 30000))
+        rel = np.max(np.abs(nox / ref - 1))
+        print(
+            f"{'nox, ' + label:<24} {t * 1e3:11.1f} {t_ref / t:7.1f}x "
+            f"{s * 1e6:12.1f} {rel:8.1e}"
+        )
+    print("-" * 66)
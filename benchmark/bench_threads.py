@@ -0,0 +1,57 @@
+"""Run time of the models against the number of threads.
+
+Run with: python benchmark/bench_threads.py [number of points]
+
+The chunks of the inputs are evaluated on a thread pool; numpy releases the
+GIL in the array operations. The scaling is bounded by the number of cores
+of the machine.
+
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from openap import FuelFlow, Emission, aero
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 4_000_000
+
+rng = np.random.default_rng(42)
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+fuelflow = FuelFlow("A320")
+emission = Emission("A320")
+ff = fuelflow.enroute(mass, tas, alt, path_angle)
+
+cases = {
+    "FuelFlow.enroute": lambda t: fuelflow.enroute(
+        mass, tas, alt, path_angle, n_threads=t
+    ),
+    "Emission.nox": lambda t: emission.nox(ff, tas, alt, n_threads=t),
+    "aero.tas2cas": lambda t: aero.tas2cas(tas * aero.kts, alt * aero.ft, n_threads=t),
+}
+
+
+def timed(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+    threads = [1, 2, 4, 8, 16, 32]
+    print(f"{n:,} points, {os.cpu_count()} cores")
+    print("-" * 66)
+    print(f"{'threads':<20}" + "".join(f"{t:>7}" for t in threads))
+    print("-" * 66)
+    for name, func in cases.items():
+        t1 = timed(lambda: func(1))
+        speedups = [t1 / timed(lambda: func(t)) for t in threads]
+        print(f"{name:<20}" + "".join(f"{s:6.2f}x" for s in speedups))
+    print("-" * 66)
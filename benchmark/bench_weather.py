@@ -0,0 +1,106 @@
+"""Fuel flow in a gridded atmosphere against the ISA.
+
+Run with: python benchmark/bench_weather.py [number of flights]
+
+The grid is a global 1 degree grid of 37 levels and 24 hours, with random
+temperatures (ISA+10 on average) and winds, saved to a temporary directory
+and memory-mapped. Each flight has 1,000 points along a straight track.
+
+"""
+
+import sys
+import time
+import tempfile
+import numpy as np
+import openap
+from openap import weather, aero
+
+n_flights = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_points = 1000
+
+rng = np.random.default_rng(42)
+
+
+def timed(func, repeat=3):
+    func()
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def grid(path):
+    lat = np.arange(90, -90.5, -1.0)
+    lon = np.arange(0, 360, 1.0)
+    level = np.linspace(0, 15000, 37)
+    hours = np.arange(24) * 3600.0
+
+    shape = (len(hours), len(level), len(lat), len(lon))
+    p, rho, T = aero.atmos(level)
+    dT = rng.normal(10, 5, shape)
+    fields = {
+        "temperature": (T[:, None, None] + dT).astype(np.float32),
+        "pressure": np.broadcast_to(p[:, None, None], shape).astype(np.float32),
+        "u": rng.normal(10, 15, shape).astype(np.float32),
+        "v": rng.normal(0, 10, shape).astype(np.float32),
+    }
+    weather.GriddedAtmosphere(lat, lon, level, hours, **fields).save(path)
+    return weather.GriddedAtmosphere.load(path)
+
+
+def flights():
+    s = np.linspace(0, 1, n_points)
+    lat0, lat1 = rng.uniform(-60, 60, (2, n_flights, 1))
+    lon0, lon1 = rng.uniform(-180, 180, (2, n_flights, 1))
+    t0 = rng.uniform(0, 18 * 3600, (n_flights, 1))
+    lat = lat0 + s * (lat1 - lat0)
+    lon = lon0 + s * (lon1 - lon0)
+    t = t0 + s * 5 * 3600
+    alt = np.minimum(35000, 40000 * np.sin(np.pi * s))
+    return [a.reshape(-1) for a in np.broadcast_arrays(lat, lon, t, alt)]
+
+
+if __name__ == "__main__":
+    n = n_flights * n_points
+    lat, lon, t, alt = flights()
+    mass = rng.uniform(50000, 75000, n)
+    tas = rng.uniform(400, 480, n)
+
+    with tempfile.TemporaryDirectory() as path:
+        gridded = grid(path)
+
+        t_along, atm = timed(lambda: gridded.along(lat, lon, t))
+
+        def query():
+            atm._h = None  # drop the cache of the levels
+            return atm.atmos(alt * aero.ft), atm.wind(alt * aero.ft)
+
+        t_query, _ = timed(query)
+
+        fuelflow = openap.FuelFlow("A320")
+        gridflow = weather.bind(fuelflow, atm)
+        t_isa, ref = timed(lambda: fuelflow.enroute(mass, tas, alt))
+
+        def enroute():
+            atm._h = None
+            return gridflow.enroute(mass, tas, alt)
+
+        t_grid, ff = timed(enroute)
+        del atm, gridflow
+
+    print(f"A320, {n_flights:,} flights, {n:,} points")
+    print("-" * 52)
+    print(f"{'':<34} {'time (ms)':>9} {'ns/pt':>7}")
+    print("-" * 52)
+    rows = [
+        ("locate the trajectories (along)", t_along),
+        ("atmos and wind", t_query),
+        ("enroute fuel flow, ISA", t_isa),
+        ("enroute fuel flow, gridded", t_grid),
+    ]
+    for label, t in rows:
+        print(f"{label:<34} {t * 1e3:9.1f} {t / n * 1e9:7.0f}")
+    print("-" * 52)
+    print(f"mean fuel flow change: {np.nanmean(ff / ref - 1):+.2%}")
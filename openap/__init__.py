@@ -1,11 +1,53 @@
-from .extra import aero
-from .extra import nav
-from .extra import filters
-from .extra import statistics
-
-from .thrust import Thrust
-from .drag import Drag
-from .fuel import FuelFlow
-from .emission import Emission
-from .kinematic import WRAP
-from .phase import FlightPhase
+"""Open Aircraft Performance Model (OpenAP).
+
+Submodules and model classes are imported on first access, so that
+``from openap import FuelFlow`` does not pay for the import of optional
+dependencies (scipy, matplotlib, scikit-fuzzy) used by other modules.
+
+"""
+
+import importlib
+
+_lazy_attributes = {
+    "aero": ("openap.extra.aero", None),
+    "nav": ("openap.extra.nav", None),
+    "filters": ("openap.extra.filters", None),
+    "statistics": ("openap.extra.statistics", None),
+    "Thrust": ("openap.thrust", "Thrust"),
+    "Drag": ("openap.drag", "Drag"),
+    "FuelFlow": ("openap.fuel", "FuelFlow"),
+    "Emission": ("openap.emission", "Emission"),
+    "WRAP": ("openap.kinematic", "WRAP"),
+    "FlightPhase": ("openap.phase", "FlightPhase"),
+    "models": ("openap.bundle", "models"),
+    "diagnostics": ("openap.diagnostics", None),
+    "weather": ("openap.weather", None),
+    "mission": ("openap.mission", None),
+}
+
+__all__ = list(_lazy_attributes)
+
+# submodules, as set by the imports of the package before the lazy imports;
+# not in __all__, some of them need optional dependencies
+for _name in [
+    "extra", "prop", "thrust", "drag", "fuel", "emission", "kinematic", "phase",
+    "bundle", "fleet", "table", "snapshot", "scalar", "traj", "casadi", "numba",
+]:
+    _lazy_attributes[_name] = (f"openap.{_name}", None)
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError(f"module 'openap' has no attribute '{name}'")
+
+    module_name, attr = _lazy_attributes[name]
+    value = importlib.import_module(module_name)
+    if attr is not None:
+        value = getattr(value, attr)
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
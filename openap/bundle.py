@@ -0,0 +1,73 @@
+"""Shared model bundles.
+
+Building a set of models for an aircraft (thrust, drag, fuel flow, kinematic
+and emission) has a cost. This module keeps the most recently used bundles in
+a bounded LRU cache, so that the same models are reused for each
+(aircraft, engine, options) combination.
+
+Examples::
+
+    import openap
+
+    m = openap.models("A320")
+    ff = m.fuelflow.enroute(mass=60000, tas=230, alt=32000)
+    nox = m.emission.nox(ff, tas=230, alt=32000)
+
+"""
+
+from collections import namedtuple
+from openap import prop
+
+ModelBundle = namedtuple(
+    "ModelBundle", ["thrust", "drag", "fuelflow", "wrap", "emission"]
+)
+
+cache = prop.Registry(maxsize=128)
+
+
+def set_capacity(maxsize):
+    """Set the maximum number of cached model bundles.
+
+    Args:
+        maxsize (int): Number of bundles kept, None for unbounded.
+
+    """
+    cache.resize(maxsize)
+
+
+def models(ac, eng=None, **kwargs):
+    """Get the (cached) bundle of models of an aircraft and engine.
+
+    Args:
+        ac (string): ICAO aircraft type (for example: A320).
+        eng (string): Engine type (for example: CFM56-5A3).
+            Leave empty to use the default engine specified
+            by in the aircraft database.
+        **kwargs: Options passed to the models, such as use_synonym
+            and wave_drag.
+
+    Returns:
+        ModelBundle: Named tuple with thrust, drag, fuelflow, wrap,
+            and emission models.
+
+    """
+    from openap import Thrust, Drag, FuelFlow, WRAP, Emission
+
+    prop_kwargs = {k: v for k, v in kwargs.items() if k != "wave_drag"}
+
+    if eng is None:
+        eng = prop.aircraft(ac, **prop_kwargs)["engine"]["default"]
+
+    key = (ac.upper(), eng.upper(), tuple(sorted(kwargs.items())))
+
+    def build():
+        thrust = Thrust(ac, eng, **prop_kwargs)
+        drag = Drag(ac, **kwargs)
+        wrap = WRAP(ac, **prop_kwargs)
+        fuelflow = FuelFlow(
+            ac, eng, thrust=thrust, drag=drag, wrap=wrap, **prop_kwargs
+        )
+        emission = Emission(ac, eng, **prop_kwargs)
+        return ModelBundle(thrust, drag, fuelflow, wrap, emission)
+
+    return cache.get("models", key, build)
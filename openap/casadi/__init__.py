@@ -1,16 +1,17 @@
-from .. import *
+from .. import drag, thrust, fuel, emission
 from . import numpy_override as np
 from . import aero_override as aero
+from . import cache
 
 
 class RemoveDecoratorMeta(type):
     def __new__(cls, name, base, attr_dict):
         # for all methods in all base classes
-        # reimplement in attr_dict
+        # reimplement in attr_dict, cached for symbolic inputs (see cache)
         for b in base:
             for elt in vars(b):
                 if hasattr(getattr(b, elt), "orig_func"):
-                    attr_dict[elt] = getattr(b, elt).orig_func
+                    attr_dict[elt] = cache.cached(getattr(b, elt).orig_func)
 
         attr_dict["np"] = np
         attr_dict["aero"] = aero
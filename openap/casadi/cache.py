@@ -0,0 +1,364 @@
+"""Cached casadi Functions of the model methods.
+
+Calling a method of an ``openap.casadi`` model builds the symbolic expression
+of the model in python, operation by operation, which is slow compared to
+evaluating a ``casadi.Function`` of the same expression. The methods of the
+models called with symbolic (SX or MX) arguments are therefore turned into a
+``casadi.Function`` once per model, method and signature (the shapes of the
+numeric and symbolic arguments, and the values of the other arguments, such
+as flags), which is cached and called afterwards. Calls with SX arguments
+return the expanded SX expression, calls with MX arguments a call node of the
+function. Calls with numeric arguments only are evaluated as before. The
+cache is disabled with ``enabled = False``.
+
+The functions are built from the constants of a model when first called;
+changes of the attributes of a model after that are not seen by the cached
+functions of the model.
+
+``function`` gives the cached function of a method, optionally generated as
+C code and compiled with the system compiler (``compiler`` and ``flags``).
+The shared libraries are stored in ``cache_dir``, and reused as long as the
+expression of the function and the compiler options are the same. ``batch``
+gives the function mapped over several points, evaluated on threads, and
+``evaluate`` evaluates it on numeric arrays. The last ``max_maps`` mapped
+functions of each model are cached.
+
+Examples::
+
+    import casadi
+    from openap import casadi as oc
+
+    fuelflow = oc.FuelFlow("A320")
+    mass, tas, alt = casadi.MX.sym("m"), casadi.MX.sym("v"), casadi.MX.sym("h")
+    fuelflow.enroute(mass, tas, alt)  # built once, then cached
+
+    f = oc.cache.function(fuelflow, "enroute", mass, tas, alt, compile=True)
+    oc.cache.evaluate(fuelflow, "enroute", masses, speeds, altitudes, n_threads=4)
+
+"""
+
+import os
+import sys
+import hashlib
+import collections
+import functools
+import threading
+import subprocess
+import weakref
+import numpy as np
+import casadi
+
+enabled = True
+
+cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "openap", "casadi")
+compiler = os.environ.get("CC", "cc")
+flags = ["-O2", "-fPIC", "-shared"]
+
+# maximum number of mapped functions kept per model (one per number of
+# points and threads), the least recently used are dropped
+max_maps = 16
+
+# model -> {(method, signature): casadi.Function}
+_functions = weakref.WeakKeyDictionary()
+# model -> OrderedDict {(function, n, n_threads): mapped casadi.Function}
+_maps = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+_local = threading.local()
+
+_SYMBOLIC = (casadi.SX, casadi.MX)
+
+
+def _is_input(value):
+    if isinstance(value, (bool, np.bool_)):
+        return False
+    return isinstance(value, (int, float, np.number, np.ndarray, casadi.DM, *_SYMBOLIC))
+
+
+def _shape(value):
+    if isinstance(value, (casadi.DM, *_SYMBOLIC)):
+        return value.shape
+    shape = np.shape(value)
+    if len(shape) > 2:
+        raise RuntimeError("Arguments of casadi functions have at most 2 dimensions.")
+    return tuple(shape) + (1,) * (2 - len(shape))
+
+
+def _signature(args, kwargs):
+    """Input names and shapes, and the key of a call."""
+    items = [(str(i), a) for i, a in enumerate(args)] + sorted(kwargs.items())
+    names, key = [], []
+    for name, value in items:
+        if _is_input(value):
+            names.append(name)
+            key.append((name, "input", _shape(value)))
+        else:
+            key.append((name, "value", value))
+    return names, tuple(key)
+
+
+def _flatten(result):
+    """Outputs of a method as a list, and the structure of the result."""
+    if isinstance(result, tuple):
+        parts = [_flatten(r) for r in result]
+        return [o for p in parts for o in p[0]], ("tuple", [p[1] for p in parts])
+    if isinstance(result, dict):
+        parts = [_flatten(r) for r in result.values()]
+        outputs = [o for p in parts for o in p[0]]
+        return outputs, ("dict", list(result), [p[1] for p in parts])
+    return [result], None
+
+
+def _unflatten(outputs, structure):
+    """Result of a method from the outputs of its function."""
+    outputs = iter(outputs)
+
+    def build(s):
+        if s is None:
+            return next(outputs)
+        if s[0] == "tuple":
+            return tuple(build(sub) for sub in s[1])
+        return {k: build(sub) for k, sub in zip(s[1], s[2])}
+
+    return build(structure)
+
+
+def _build(model, method, names, args, kwargs):
+    """Function of a model method, with SX inputs of the argument shapes."""
+    func = getattr(model, method)
+
+    symbols = {n: casadi.SX.sym(f"x{n}", *_shape(v)) for n, v in _items(args, kwargs)}
+    sym_args = [symbols.get(str(i), a) for i, a in enumerate(args)]
+    sym_kwargs = {k: symbols.get(k, a) for k, a in kwargs.items()}
+
+    # the nested calls of the cached methods are expanded
+    _local.building = True
+    try:
+        result = func(*sym_args, **sym_kwargs)
+    finally:
+        _local.building = False
+
+    outputs, structure = _flatten(result)
+    outputs = [casadi.SX(o) for o in outputs]
+    f = casadi.Function(
+        f"{type(model).__name__}_{method.strip('_')}",
+        [symbols[n] for n in names],
+        outputs,
+        [f"i{n}" if n.isdigit() else n for n in names],
+        [f"o{i}" for i in range(len(outputs))],
+    )
+    f.structure = structure
+    return f
+
+
+def _items(args, kwargs):
+    for i, a in enumerate(args):
+        if _is_input(a):
+            yield str(i), a
+    for k, a in sorted(kwargs.items()):
+        if _is_input(a):
+            yield k, a
+
+
+def _cached(model, method, args, kwargs):
+    """Cached function of a model method for the given arguments."""
+    names, key = _signature(args, kwargs)
+    key = (method, key)
+
+    with _lock:
+        functions = _functions.setdefault(model, {})
+        f = functions.get(key)
+
+    if f is None:
+        f = _build(model, method, names, args, kwargs)
+        with _lock:
+            f = functions.setdefault(key, f)
+
+    return f, [a for n, a in _items(args, kwargs)]
+
+
+def _symbolic(args, kwargs):
+    for a in args:
+        if isinstance(a, _SYMBOLIC):
+            return True
+    for a in kwargs.values():
+        if isinstance(a, _SYMBOLIC):
+            return True
+    return False
+
+
+def cached(func):
+    """Call a model method through its cached function for symbolic inputs."""
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if (
+            not enabled
+            or getattr(_local, "building", False)
+            or not _symbolic(args, kwargs)
+        ):
+            return func(self, *args, **kwargs)
+
+        try:
+            hash(_signature(args, kwargs)[1])
+        except TypeError:
+            # unhashable arguments
+            return func(self, *args, **kwargs)
+
+        f, inputs = _cached(self, func.__name__, args, kwargs)
+        return _unflatten(f.call(inputs), f.structure)
+
+    wrapper.cached_func = func
+    return wrapper
+
+
+def _compile(f):
+    """Generate, compile and load the C code of a function, cached on disk."""
+    h = hashlib.sha1(f.serialize().encode())
+    h.update(repr((casadi.__version__, compiler, flags)).encode())
+    name = f"{f.name()}_{h.hexdigest()[:16]}"
+
+    lib = os.path.join(cache_dir, f"{name}.so")
+    if not os.path.exists(lib):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{name}_{os.getpid()}_{threading.get_ident()}"
+        src = os.path.join(cache_dir, f"{tmp}.c")
+
+        gen = casadi.CodeGenerator(f"{tmp}.c")
+        gen.add(f)
+        gen.generate(cache_dir + os.sep)
+
+        cmd = [compiler, *flags, src, "-o", os.path.join(cache_dir, f"{tmp}.so")]
+        if sys.platform == "darwin":
+            cmd[1:1] = ["-undefined", "dynamic_lookup"]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            msg = getattr(e, "stderr", b"") or str(e).encode()
+            raise RuntimeError(f"Compilation of {f.name()} failed: {msg.decode()}")
+        finally:
+            os.remove(src)
+        os.replace(os.path.join(cache_dir, f"{tmp}.so"), lib)
+
+    compiled = casadi.external(f.name(), lib)
+    compiled.structure = f.structure
+    return compiled
+
+
+def function(model, method, *args, compile=False, **kwargs):
+    """Get the cached casadi Function of a model method.
+
+    The inputs of the function are the numeric and symbolic arguments, with
+    their shapes, in the order of the positional arguments and then of the
+    sorted keyword arguments. The other arguments (such as flags) are fixed.
+    The outputs are the results of the method, flattened (tuple items and
+    dictionary values in order).
+
+    Args:
+        model: Model object of ``openap.casadi`` (for example: FuelFlow).
+        method (str): Name of the method (for example: enroute).
+        *args: Arguments of the method, numbers or casadi matrices giving
+            the shapes of the inputs.
+        compile (bool): Generate and compile the C code of the function,
+            see ``cache_dir``. Defaults to False.
+        **kwargs: Keyword arguments of the method.
+
+    Returns:
+        casadi.Function: Function of the method.
+
+    """
+    f, inputs = _cached(model, method, args, kwargs)
+    if not compile:
+        return f
+
+    key = ("compiled", f)
+    with _lock:
+        compiled = _functions[model].get(key)
+    if compiled is None:
+        compiled = _compile(f)
+        with _lock:
+            compiled = _functions[model].setdefault(key, compiled)
+    return compiled
+
+
+def batch(model, method, n, *args, n_threads=None, compile=False, **kwargs):
+    """Get the cached function of a model method mapped over n points.
+
+    The inputs of the mapped function are the inputs of ``function`` side by
+    side (1 x n for scalars), or the inputs of a single point, which are
+    repeated.
+
+    Args:
+        model: Model object of ``openap.casadi`` (for example: FuelFlow).
+        method (str): Name of the method (for example: enroute).
+        n (int): Number of points.
+        *args: Arguments of the method for a single point, see ``function``.
+        n_threads (int): Number of threads, None for the number of CPUs.
+        compile (bool): Compile the function, see ``function``.
+        **kwargs: Keyword arguments of the method.
+
+    Returns:
+        casadi.Function: Mapped function.
+
+    """
+    if n_threads is None:
+        n_threads = os.cpu_count() or 1
+
+    f = function(model, method, *args, compile=compile, **kwargs)
+    key = (f, n, n_threads)
+    with _lock:
+        maps = _maps.setdefault(model, collections.OrderedDict())
+        mapped = maps.get(key)
+        if mapped is not None:
+            maps.move_to_end(key)
+            return mapped
+
+    if n_threads > 1:
+        mapped = f.map(n, "thread", n_threads)
+    else:
+        mapped = f.map(n)
+    mapped.structure = f.structure
+    with _lock:
+        mapped = maps.setdefault(key, mapped)
+        while len(maps) > max_maps:
+            maps.popitem(last=False)
+    return mapped
+
+
+def evaluate(model, method, *args, n_threads=None, compile=False, **kwargs):
+    """Evaluate a model method on arrays with its mapped function.
+
+    Args:
+        model: Model object of ``openap.casadi`` (for example: FuelFlow).
+        method (str): Name of the method (for example: enroute).
+        *args: Arguments of the method, 1-d arrays of the same size, or
+            scalars, which are repeated.
+        n_threads (int): Number of threads, None for the number of CPUs.
+        compile (bool): Compile the function, see ``function``.
+        **kwargs: Keyword arguments of the method.
+
+    Returns:
+        ndarray, or tuple or dict of ndarrays: Results of the method.
+
+    """
+    n = max([np.size(a) for a in args + tuple(kwargs.values()) if _is_input(a)])
+
+    def point(a):
+        return 0.0 if _is_input(a) else a
+
+    def row(a):
+        return np.reshape(np.asarray(a, dtype=float), (1, -1)) if _is_input(a) else a
+
+    f = batch(
+        model,
+        method,
+        n,
+        *[point(a) for a in args],
+        n_threads=n_threads,
+        compile=compile,
+        **{k: point(a) for k, a in kwargs.items()},
+    )
+    args = [row(a) for a in args]
+    kwargs = {k: row(a) for k, a in kwargs.items()}
+    inputs = [a for name, a in _items(args, kwargs)]
+    outputs = [np.asarray(o).reshape(-1) for o in f.call(inputs)]
+    return _unflatten(outputs, f.structure)
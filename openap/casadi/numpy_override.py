@@ -7,3 +7,4 @@ where = casadi.if_else
 maximum = casadi.fmax
 minimum = casadi.fmin
 interp = lambda x, xp, yp: casadi.interpolant("LUT", "linear", [xp], yp)(x)
+logical_not = casadi.logic_not
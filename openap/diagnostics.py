@@ -0,0 +1,132 @@
+"""Diagnostics of the model evaluations.
+
+The models flag the points whose results may not be reliable, instead of
+printing warnings. The conditions are counted with vectorized operations,
+once per call (or per chunk of a large input), and only while a collector
+is active; otherwise they cost a single check per call.
+
+Conditions:
+
+- ``negative_lift``: lift coefficient below zero (``Drag``).
+- ``thrust_exceeded``: required thrust above 120% of the maximum climb
+  thrust (``FuelFlow.enroute``, ``Mission.integrate``), set to NaN when
+  ``fillna`` is True.
+- ``nan_fuel``: fuel flow is NaN (``FuelFlow.enroute``, ``Mission.integrate``).
+- ``out_of_grid``: inputs out of the grid of a table, evaluated with the
+  model (``FuelFlowTable``, ``EmissionTable``).
+- ``crossover_clipped``: Mach crossover altitude above the cruise altitude,
+  clipped to the cruise altitude (``Generator.climb`` and
+  ``Generator.descent``).
+
+The numpy and scalar models report the conditions; the casadi and numba
+models do not, except ``out_of_grid`` for the numba tables.
+
+Examples::
+
+    from openap import FuelFlow, diagnostics
+
+    with diagnostics.collect(masks=True) as diag:
+        fuelflow.enroute(mass=masses, tas=speeds, alt=altitudes)
+
+    diag.counts  # {'negative_lift': 0, 'thrust_exceeded': 12, ...}
+    diag.masks["nan_fuel"]  # boolean arrays, one per call or chunk
+
+"""
+
+import threading
+import numpy as np
+
+_collectors = []
+_lock = threading.Lock()
+
+
+class Diagnostics(object):
+    """Counts (and optionally masks) of the conditions flagged by the models.
+
+    Use as a context manager, see ``collect``. Collectors can be nested, and
+    collect the evaluations of all threads.
+
+    Attributes:
+        counts (dict): Number of flagged points, by condition.
+        points (dict): Number of evaluated points, by condition.
+        sources (dict): Models reporting the condition, by condition.
+        masks (dict): Boolean masks of the flagged points, by condition, one
+            per call (or per chunk of a large input, in evaluation order).
+            Only kept when masks is True.
+
+    """
+
+    def __init__(self, masks=False):
+        self.keep_masks = masks
+        self.clear()
+
+    def clear(self):
+        """Reset the counts and masks."""
+        self.counts = {}
+        self.points = {}
+        self.sources = {}
+        self.masks = {}
+
+    def _add(self, name, source, count, size, mask):
+        self.counts[name] = self.counts.get(name, 0) + count
+        self.points[name] = self.points.get(name, 0) + size
+        self.sources.setdefault(name, set()).add(source)
+        if self.keep_masks:
+            self.masks.setdefault(name, []).append(mask)
+
+    def __enter__(self):
+        with _lock:
+            _collectors.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        with _lock:
+            _collectors.remove(self)
+        return False
+
+    def __repr__(self):
+        counts = ", ".join(f"{k}: {v}/{self.points[k]}" for k, v in self.counts.items())
+        return f"Diagnostics({counts})"
+
+
+def collect(masks=False):
+    """Collect the diagnostics of the evaluations inside a with block.
+
+    Args:
+        masks (bool): Keep the boolean masks of the flagged points, in
+            addition to the counts. Defaults to False.
+
+    Returns:
+        Diagnostics: Collector, to be used as a context manager.
+
+    """
+    return Diagnostics(masks)
+
+
+def active():
+    """Whether a collector is active; check before computing the masks."""
+    return len(_collectors) > 0
+
+
+def record(name, mask, source=None):
+    """Report the points of a condition to the active collectors.
+
+    Args:
+        name (str): Condition name.
+        mask (bool or ndarray): Points where the condition holds.
+        source (str): Model reporting the condition.
+
+    """
+    if not _collectors:
+        return
+
+    # symbolic (casadi) expressions are not evaluated
+    if not isinstance(mask, (bool, np.bool_, np.ndarray)):
+        return
+
+    mask = np.asarray(mask, dtype=bool)
+    count = int(np.count_nonzero(mask))
+
+    with _lock:
+        for collector in _collectors:
+            collector._add(name, source, count, mask.size, mask)
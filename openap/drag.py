@@ -2,12 +2,11 @@
 
 import os
 import importlib
-import pandas as pd
 import glob
-import yaml
 import math
 import warnings
-from . import prop
+from collections import namedtuple
+from . import prop, snapshot, diagnostics
 from .extra import ndarrayconvert
 
 
@@ -15,18 +14,44 @@ curr_path = os.path.dirname(os.path.realpath(__file__))
 dir_dragpolar = curr_path + "/data/dragpolar/"
 file_synonym = curr_path + "/data/dragpolar/_synonym.csv"
 
-polar_synonym = pd.read_csv(file_synonym)
+DragConstants = namedtuple(
+    "DragConstants",
+    [
+        "S",  # wing area (m2)
+        "cd0",  # zero-lift drag coefficient, clean configuration
+        "k",  # lift-induced drag coefficient factor, clean configuration
+        "ar",  # wing aspect ratio
+        "delta_cd_gear",  # drag coefficient increment of the landing gear
+        "flap_cd0_factor",  # flap drag increment factor, times sin(flap)^2
+        "flap_e_factor",  # Oswald factor increment per degree of flap
+    ],
+)
+
+
+def _load_dragpolar(ac):
+    snap = snapshot.get()
+    if snap is not None and ac in snap.dragpolar_index:
+        return prop.freeze(snap.dragpolar(ac))
+
+    import yaml
+
+    with open(dir_dragpolar + ac + ".yml") as f:
+        dragpolar = yaml.safe_load(f)
+    return prop.freeze(dragpolar)
 
 
 class Drag(object):
     """Compute the drag of aircraft."""
 
-    def __init__(self, ac, wave_drag=False, **kwargs):
+    def __init__(self, ac, wave_drag=False, atmosphere=None, **kwargs):
         """Initialize Drag object.
 
         Args:
             ac (string): ICAO aircraft type (for example: A320).
             wave_drag (bool): enable wave_drag model (experimental).
+            atmosphere (TrajectoryAtmosphere): Non-standard atmosphere at
+                the points of a trajectory (see ``openap.weather``). Defaults
+                to the ISA.
 
         """
         if not hasattr(self, "np"):
@@ -40,11 +65,15 @@ class Drag(object):
         self.ac = ac.lower()
         self.aircraft = prop.aircraft(ac, **kwargs)
         self.polar = self.dragpolar()
+        self.const = self._constants()
 
         self.wave_drag = wave_drag
         if self.wave_drag:
             warnings.warn("Performance warning: Wave drag model is experimental.")
 
+        if atmosphere is not None:
+            self.aero = atmosphere
+
     def dragpolar(self):
         """Find and construct the drag polar model.
 
@@ -52,73 +81,200 @@ class Drag(object):
             dict: drag polar model parameters.
 
         """
-        polar_files = glob.glob(dir_dragpolar + "*.yml")
-        ac_polar_available = [s[-8:-4].lower() for s in polar_files]
+        snap = snapshot.get()
+        if snap is not None:
+            ac_polar_available = snap.dragpolar_index
+        else:
+            polar_files = prop.registry.get(
+                "files", "dragpolar", lambda: glob.glob(dir_dragpolar + "*.yml")
+            )
+            ac_polar_available = [s[-8:-4].lower() for s in polar_files]
+
+        polar_synonym = prop.synonym("dragpolar")
 
         if self.ac in ac_polar_available:
             ac = self.ac
         else:
-            syno = polar_synonym.query("orig==@self.ac")
-            if self.use_synonym and syno.shape[0] > 0:
-                ac = syno.new.iloc[0]
+            if self.use_synonym and self.ac in polar_synonym:
+                ac = polar_synonym[self.ac]
             else:
                 raise RuntimeError(f"Drag polar for {self.ac} not avaiable in OpenAP.")
 
-        f = dir_dragpolar + ac + ".yml"
-        dragpolar = yaml.safe_load(open(f))
-        return dragpolar
+        return prop.registry.get("dragpolar", ac, lambda: _load_dragpolar(ac))
 
-    @ndarrayconvert
-    def _cl(self, mass, tas, alt, path_angle):
+    def _constants(self):
+        """Compute the invariants of the aircraft and drag polar."""
+        S = self.aircraft["wing"]["area"]
+        mtow = self.aircraft["limits"]["MTOW"]
+        flaps = self.polar["flaps"]
+        rear_mount = self.aircraft["engine"]["mount"] == "rear"
+
+        return DragConstants(
+            S=S,
+            cd0=self.polar["clean"]["cd0"],
+            k=self.polar["clean"]["k"],
+            ar=self.aircraft["wing"]["span"] ** 2 / S,
+            delta_cd_gear=mtow * 9.8065 / S * 3.16e-5 * mtow ** (-0.215),
+            flap_cd0_factor=flaps["lambda_f"] * flaps["cf/c"] ** 1.38 * flaps["Sf/S"],
+            flap_e_factor=0.0046 if rear_mount else 0.0026,
+        )
+
+    def _cl_qs(self, mass, tas, rho, path_angle):
+        """Lift coefficient and dynamic pressure times wing area."""
         v = tas * self.aero.kts
-        h = alt * self.aero.ft
         gamma = path_angle * self.np.pi / 180
 
-        S = self.aircraft["wing"]["area"]
+        S = self.const.S
 
-        rho = self.aero.density(h)
         qS = 0.5 * rho * v ** 2 * S
         L = mass * self.aero.g0 * self.np.cos(gamma)
         qS = self.np.where(qS < 1e-3, 1e-3, qS)
         cl = L / qS
+
+        if diagnostics.active():
+            diagnostics.record("negative_lift", cl < 0, "Drag")
+
+        return cl, qS
+
+    @ndarrayconvert
+    def _cl(self, mass, tas, alt, path_angle):
+        rho = self.aero.density(alt * self.aero.ft)
+        cl, qS = self._cl_qs(mass, tas, rho, path_angle)
         return cl
 
     @ndarrayconvert
     def _calc_drag(self, mass, tas, alt, cd0, k, path_angle):
-        v = tas * self.aero.kts
-        h = alt * self.aero.ft
-        gamma = path_angle * self.np.pi / 180
-
-        S = self.aircraft["wing"]["area"]
-
-        rho = self.aero.density(h)
-        qS = 0.5 * rho * v ** 2 * S
-        L = mass * self.aero.g0 * self.np.cos(gamma)
-        qS = self.np.where(qS < 1e-3, 1e-3, qS)
-        cl = L / qS
+        rho = self.aero.density(alt * self.aero.ft)
+        cl, qS = self._cl_qs(mass, tas, rho, path_angle)
         cd = cd0 + k * cl ** 2
         D = cd * qS
-        if (cl < 0):
-            print("Warning: your CL < 0")
-            print("Current mass", mass)
-            print("Current V", v)
         return D
     
     @ndarrayconvert
     def _calc_CL_CD(self, mass, tas, alt, cd0, k, path_angle):
+        rho = self.aero.density(alt * self.aero.ft)
+        cl, qS = self._cl_qs(mass, tas, rho, path_angle)
+        cd = cd0 + k * cl ** 2
+        return cl, cd
+
+    def _mach_crit(self, cl):
+        """Critical Mach number, and cosine of sweep."""
+        sweep = math.radians(self.aircraft["wing"]["sweep"])
+        tc = self.aircraft["wing"]["t/c"]
+        if tc is None:
+            tc = 0.11
+
+        cos_sweep = math.cos(sweep)
+        mach_crit = (
+            0.87 - 0.108 / cos_sweep - 0.1 * cl / (cos_sweep ** 2) - tc / cos_sweep
+        ) / cos_sweep
+        return mach_crit, cos_sweep
+
+    def _wave_dmach(self, cl, mach):
+        """Mach number above the critical Mach number, and cosine of sweep."""
+        mach_crit, cos_sweep = self._mach_crit(cl)
+        dmach = self.np.where(mach - mach_crit <= 0, 0, mach - mach_crit)
+        return dmach, cos_sweep
+
+    def _wave_cd0(self, cl, mach):
+        """Zero-lift drag coefficient increment due to compressibility."""
+        dmach, cos_sweep = self._wave_dmach(cl, mach)
+        dCdw = self.np.where(dmach, 20 * dmach ** 4, 0)
+        return dCdw
+
+    def _clean(self, mass, tas, path_angle, rho, T):
+        """Clean configuration drag for a given air density and temperature.
+
+        Args:
+            mass (float or ndarray): Mass of the aircraft (unit: kg).
+            tas (float or ndarray): True airspeed (unit: kt).
+            path_angle (float or ndarray): Path angle (unit: degree).
+            rho (float or ndarray): Air density (unit: kg/m3).
+            T (float or ndarray): Air temperature (unit: K).
+
+        Returns:
+            float or ndarray: Total drag (unit: N).
+
+        """
+        cd0 = self.const.cd0
+        k = self.const.k
+
+        cl, qS = self._cl_qs(mass, tas, rho, path_angle)
+
+        if self.wave_drag:
+            a = self.np.sqrt(self.aero.gamma * self.aero.R * T)
+            mach = tas * self.aero.kts / a
+            dCdw = self._wave_cd0(cl, mach)
+        else:
+            dCdw = 0
+
+        cd0 = cd0 + dCdw
+
+        cd = cd0 + k * cl ** 2
+        D = cd * qS
+        return D
+
+    def _clean_grad(self, mass, tas, path_angle, rho, T, drho, dT):
+        """Clean configuration drag and its partial derivatives.
+
+        Args:
+            mass (float or ndarray): Mass of the aircraft (unit: kg).
+            tas (float or ndarray): True airspeed (unit: kt).
+            path_angle (float or ndarray): Path angle (unit: degree).
+            rho (float or ndarray): Air density (unit: kg/m3).
+            T (float or ndarray): Air temperature (unit: K).
+            drho (float or ndarray): Derivative of the air density with the
+                altitude (unit: kg/m3/ft).
+            dT (float or ndarray): Derivative of the air temperature with the
+                altitude (unit: K/ft).
+
+        Returns:
+            (float or ndarray, dict): Total drag (unit: N), and its partial
+                derivatives, see ``clean_grad``.
+
+        """
+        c = self.const
         v = tas * self.aero.kts
-        h = alt * self.aero.ft
         gamma = path_angle * self.np.pi / 180
 
-        S = self.aircraft["wing"]["area"]
+        # D = cd(cl, mach) * qS, with cl = L / qS
+        qS = 0.5 * rho * v ** 2 * c.S
+        clipped = qS < 1e-3
+        qS = self.np.where(clipped, 1e-3, qS)
+        qS_tas = self.np.where(clipped, 0, rho * v * c.S * self.aero.kts)
+        qS_alt = self.np.where(clipped, 0, 0.5 * v ** 2 * c.S * drho)
 
-        rho = self.aero.density(h)
-        qS = 0.5 * rho * v ** 2 * S
         L = mass * self.aero.g0 * self.np.cos(gamma)
-        qS = self.np.where(qS < 1e-3, 1e-3, qS)
+        L_mass = self.aero.g0 * self.np.cos(gamma)
+        L_path = -mass * self.aero.g0 * self.np.sin(gamma) * self.np.pi / 180
         cl = L / qS
-        cd = cd0 + k * cl ** 2
-        return cl, cd
+
+        cd = c.cd0 + c.k * cl ** 2
+        cd_cl = 2 * c.k * cl
+
+        if self.wave_drag:
+            a = self.np.sqrt(self.aero.gamma * self.aero.R * T)
+            mach = v / a
+            dmach, cos_sweep = self._wave_dmach(cl, mach)
+            cd = cd + 20 * dmach ** 4
+            cd_mach = 80 * dmach ** 3
+            cd_cl = cd_cl + cd_mach * 0.1 / cos_sweep ** 3
+            D_tas = qS * cd_mach * self.aero.kts / a
+            D_alt = qS * cd_mach * (-mach * dT / (2 * T))
+        else:
+            D_tas = 0
+            D_alt = 0
+
+        D = cd * qS
+        D_qS = cd - cd_cl * cl
+
+        grad = {
+            "mass": cd_cl * L_mass,
+            "tas": D_qS * qS_tas + D_tas,
+            "alt": D_qS * qS_alt + D_alt,
+            "path_angle": cd_cl * L_path,
+        }
+        return D, grad
 
     @ndarrayconvert
     def clean(self, mass, tas, alt, path_angle=0):
@@ -134,36 +290,34 @@ class Drag(object):
             int: Total drag (unit: N).
 
         """
+        p, rho, T = self.aero.atmos(alt * self.aero.ft)
+        D = self._clean(mass, tas, path_angle, rho, T)
+        return D
+    
+    @ndarrayconvert
+    def clean_grad(self, mass, tas, alt, path_angle=0):
+        """Compute drag at clean configuration, and its partial derivatives.
 
-        cd0 = self.polar["clean"]["cd0"]
-        k = self.polar["clean"]["k"]
-
-        if self.wave_drag:
-            mach = self.aero.tas2mach(tas * self.aero.kts, alt * self.aero.ft)
-            cl = self._cl(mass, tas, alt, path_angle)
-
-            sweep = math.radians(self.aircraft["wing"]["sweep"])
-            tc = self.aircraft["wing"]["t/c"]
-            if tc is None:
-                tc = 0.11
-
-            cos_sweep = math.cos(sweep)
-            mach_crit = (
-                0.87 - 0.108 / cos_sweep - 0.1 * cl / (cos_sweep ** 2) - tc / cos_sweep
-            ) / cos_sweep
-
-            dmach = self.np.where(mach - mach_crit <= 0, 0, mach - mach_crit)
+        The derivatives are closed-form, exact up to the rounding errors.
 
-            dCdw = self.np.where(dmach, 20 * dmach ** 4, 0)
+        Args:
+            mass (int or ndarray): Mass of the aircraft (unit: kg).
+            tas (int or ndarray): True airspeed (unit: kt).
+            alt (int or ndarray): Altitude (unit: ft).
+            path_angle (float or ndarray): Path angle (unit: degree). Defaults to 0.
 
-        else:
-            dCdw = 0
+        Returns:
+            (float or ndarray, dict): Total drag (unit: N), and its partial
+                derivatives with respect to mass (N/kg), tas (N/kt),
+                alt (N/ft) and path_angle (N/degree).
 
-        cd0 = cd0 + dCdw
+        """
+        h = alt * self.aero.ft
+        p, rho, T = self.aero.atmos(h)
+        dp, drho, dT = self.aero.atmos_grad(h)
+        ft = self.aero.ft
+        return self._clean_grad(mass, tas, path_angle, rho, T, drho * ft, dT * ft)
 
-        D = self._calc_drag(mass, tas, alt, cd0, k, path_angle)
-        return D
-    
     @ndarrayconvert
     def clean_CL_CD(self, mass, tas, alt, path_angle=0):
         """Compute drag at clean configuration (considering compressibility).
@@ -179,27 +333,13 @@ class Drag(object):
 
         """
 
-        cd0 = self.polar["clean"]["cd0"]
-        k = self.polar["clean"]["k"]
+        cd0 = self.const.cd0
+        k = self.const.k
 
         if self.wave_drag:
             mach = self.aero.tas2mach(tas * self.aero.kts, alt * self.aero.ft)
             cl = self._cl(mass, tas, alt, path_angle)
-
-            sweep = math.radians(self.aircraft["wing"]["sweep"])
-            tc = self.aircraft["wing"]["t/c"]
-            if tc is None:
-                tc = 0.11
-
-            cos_sweep = math.cos(sweep)
-            mach_crit = (
-                0.87 - 0.108 / cos_sweep - 0.1 * cl / (cos_sweep ** 2) - tc / cos_sweep
-            ) / cos_sweep
-
-            dmach = self.np.where(mach - mach_crit <= 0, 0, mach - mach_crit)
-
-            dCdw = self.np.where(dmach, 20 * dmach ** 4, 0)
-
+            dCdw = self._wave_cd0(cl, mach)
         else:
             dCdw = 0
 
@@ -224,42 +364,27 @@ class Drag(object):
             int or ndarray: Total drag (unit: N).
 
         """
-        cd0 = self.polar["clean"]["cd0"]
-        k = self.polar["clean"]["k"]
+        cd0 = self.const.cd0
+        k = self.const.k
 
-        # --- calc new CD0 ---
-        lambda_f = self.polar["flaps"]["lambda_f"]
-        cfc = self.polar["flaps"]["cf/c"]
-        SfS = self.polar["flaps"]["Sf/S"]
+        c = self.const
 
+        # --- calc new CD0 ---
         delta_cd_flap = (
-            lambda_f
-            * (cfc) ** 1.38
-            * (SfS)
-            * self.np.sin(flap_angle * self.np.pi / 180) ** 2
+            c.flap_cd0_factor * self.np.sin(flap_angle * self.np.pi / 180) ** 2
         )
 
         if landing_gear:
-            delta_cd_gear = (
-                self.aircraft["limits"]["MTOW"]
-                * 9.8065
-                / self.aircraft["wing"]["area"]
-                * 3.16e-5
-                * self.aircraft["limits"]["MTOW"] ** (-0.215)
-            )
+            delta_cd_gear = c.delta_cd_gear
         else:
             delta_cd_gear = 0
 
         cd0_total = cd0 + delta_cd_flap + delta_cd_gear
 
         # --- calc new k ---
-        if self.aircraft["engine"]["mount"] == "rear":
-            delta_e_flap = 0.0046 * flap_angle
-        else:
-            delta_e_flap = 0.0026 * flap_angle
+        delta_e_flap = c.flap_e_factor * flap_angle
 
-        ar = self.aircraft["wing"]["span"] ** 2 / self.aircraft["wing"]["area"]
-        k_total = 1 / (1 / k + self.np.pi * ar * delta_e_flap)
+        k_total = 1 / (1 / k + self.np.pi * c.ar * delta_e_flap)
 
         D = self._calc_drag(mass, tas, alt, cd0_total, k_total, path_angle)
         return D
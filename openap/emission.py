@@ -4,11 +4,20 @@ import importlib
 from openap import prop
 from openap.extra import ndarrayconvert
 
+# emission indices of the species proportional to the fuel flow (unit: g/kg)
+EI_CO2 = 3149
+EI_H2O = 1230
+EI_SOOT = 0.03
+EI_SOX = 0.84
+
+# ICAO engine certification modes: idle, approach, climb-out, and takeoff
+MODES = ["idl", "app", "co", "to"]
+
 
 class Emission(object):
     """Emission model based on ICAO emmision databank."""
 
-    def __init__(self, ac, eng=None, **kwargs):
+    def __init__(self, ac, eng=None, atmosphere=None, **kwargs):
         """Initialize Emission object.
 
         Args:
@@ -16,6 +25,9 @@ class Emission(object):
             eng (string): Engine type (for example: CFM56-5A3).
                 Leave empty to use the default engine specified
                 by in the aircraft database.
+            atmosphere (TrajectoryAtmosphere): Non-standard atmosphere at
+                the points of a trajectory (see ``openap.weather``). Defaults
+                to the ISA.
 
         """
         if not hasattr(self, "np"):
@@ -32,6 +44,15 @@ class Emission(object):
 
         self.engine = prop.engine(eng)
 
+        # fuel flows and emission indices of the ICAO modes
+        self.ff_modes = [self.engine[f"ff_{m}"] for m in MODES]
+        self.ei = {
+            s: [self.engine[f"ei_{s}_{m}"] for m in MODES] for s in ["nox", "co", "hc"]
+        }
+
+        if atmosphere is not None:
+            self.aero = atmosphere
+
     def _fl2sl(self, ffac, tas, alt):
         """Convert to sea-level equivalent"""
         M = self.aero.tas2mach(tas * self.aero.kts, alt * self.aero.ft)
@@ -44,6 +65,14 @@ class Emission(object):
 
         return ff_sl, ratio
 
+    def _nox_index(self, ff_sl, ratio, alt):
+        """NOx emission index at the flight level (unit: g/kg)."""
+        nox_sl = self.np.interp(ff_sl, self.ff_modes, self.ei["nox"])
+
+        # convert back to actual flight level
+        omega = 10 ** (-3) * self.np.exp(-0.0001426 * (alt - 12900))
+        return nox_sl * self.np.sqrt(1 / ratio) * self.np.exp(-19 * (omega - 0.00634))
+
     @ndarrayconvert
     def co2(self, ffac):
         """Compute CO2 emission with given fuel flow.
@@ -55,7 +84,7 @@ class Emission(object):
             float: CO2 emission from all engines (unit: g/s).
 
         """
-        return ffac * 3149
+        return ffac * EI_CO2
 
     @ndarrayconvert
     def h2o(self, ffac):
@@ -68,7 +97,7 @@ class Emission(object):
             float: H2O emission from all engines (unit: g/s).
 
         """
-        return ffac * 1230
+        return ffac * EI_H2O
 
     @ndarrayconvert
     def soot(self, ffac):
@@ -81,7 +110,7 @@ class Emission(object):
             float: Soot emission from all engines (unit: g/s).
 
         """
-        return ffac * 0.03
+        return ffac * EI_SOOT
 
     @ndarrayconvert
     def sox(self, ffac):
@@ -94,7 +123,7 @@ class Emission(object):
             float: SOx emission from all engines (unit: g/s).
 
         """
-        return ffac * 0.84
+        return ffac * EI_SOX
 
     @ndarrayconvert
     def nox(self, ffac, tas, alt=0):
@@ -110,26 +139,7 @@ class Emission(object):
 
         """
         ff_sl, ratio = self._fl2sl(ffac, tas, alt)
-
-        nox_sl = self.np.interp(
-            ff_sl,
-            [
-                self.engine["ff_idl"],
-                self.engine["ff_app"],
-                self.engine["ff_co"],
-                self.engine["ff_to"],
-            ],
-            [
-                self.engine["ei_nox_idl"],
-                self.engine["ei_nox_app"],
-                self.engine["ei_nox_co"],
-                self.engine["ei_nox_to"],
-            ],
-        )
-
-        # convert back to actual flight level
-        omega = 10 ** (-3) * self.np.exp(-0.0001426 * (alt - 12900))
-        nox_fl = nox_sl * self.np.sqrt(1 / ratio) * self.np.exp(-19 * (omega - 0.00634))
+        nox_fl = self._nox_index(ff_sl, ratio, alt)
 
         # convert g/(kg fuel) to g/s for all engines
         nox_rate = nox_fl * ffac
@@ -149,22 +159,7 @@ class Emission(object):
 
         """
         ff_sl, ratio = self._fl2sl(ffac, tas, alt)
-
-        co_sl = self.np.interp(
-            ff_sl,
-            [
-                self.engine["ff_idl"],
-                self.engine["ff_app"],
-                self.engine["ff_co"],
-                self.engine["ff_to"],
-            ],
-            [
-                self.engine["ei_co_idl"],
-                self.engine["ei_co_app"],
-                self.engine["ei_co_co"],
-                self.engine["ei_co_to"],
-            ],
-        )
+        co_sl = self.np.interp(ff_sl, self.ff_modes, self.ei["co"])
 
         # convert back to actual flight level
         co_fl = co_sl * ratio
@@ -187,22 +182,7 @@ class Emission(object):
 
         """
         ff_sl, ratio = self._fl2sl(ffac, tas, alt)
-
-        hc_sl = self.np.interp(
-            ff_sl,
-            [
-                self.engine["ff_idl"],
-                self.engine["ff_app"],
-                self.engine["ff_co"],
-                self.engine["ff_to"],
-            ],
-            [
-                self.engine["ei_hc_idl"],
-                self.engine["ei_hc_app"],
-                self.engine["ei_hc_co"],
-                self.engine["ei_hc_to"],
-            ],
-        )
+        hc_sl = self.np.interp(ff_sl, self.ff_modes, self.ei["hc"])
 
         # convert back to actual flight level
         hc_fl = hc_sl * ratio
@@ -210,3 +190,34 @@ class Emission(object):
         # convert g/(kg fuel) to g/s for all engines
         hc_rate = hc_fl * ffac
         return hc_rate
+
+    @ndarrayconvert
+    def all(self, ffac, tas, alt=0):
+        """Compute all emissions with given fuel flow, speed, and altitude.
+
+        Same results as the methods of each species, with a single conversion
+        of the fuel flow to sea level.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            dict: Emissions of CO2, H2O, NOx, CO, HC, SOx, and soot from all
+                engines, by species name (unit: g/s).
+
+        """
+        ff_sl, ratio = self._fl2sl(ffac, tas, alt)
+        co_sl = self.np.interp(ff_sl, self.ff_modes, self.ei["co"])
+        hc_sl = self.np.interp(ff_sl, self.ff_modes, self.ei["hc"])
+
+        return {
+            "co2": ffac * EI_CO2,
+            "h2o": ffac * EI_H2O,
+            "nox": self._nox_index(ff_sl, ratio, alt) * ffac,
+            "co": co_sl * ratio * ffac,
+            "hc": hc_sl * ratio * ffac,
+            "sox": ffac * EI_SOX,
+            "soot": ffac * EI_SOOT,
+        }
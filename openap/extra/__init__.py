@@ -1,22 +1,308 @@
-import numpy as np
+import os
+import threading
 import functools
+import importlib
+from types import ModuleType
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+_scalar_fast_path = True
+_scalar = None
+_chunk_size = 2 ** 14
+_n_threads = 1
+_executor = None
+_executor_size = 0
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def set_scalar_fast_path(enabled):
+    """Enable or disable the scalar evaluation of the models.
+
+    When enabled (default), model methods called with only scalar arguments
+    are evaluated with python floats (see ``openap.scalar``) instead of 0-d
+    numpy arrays. Results are returned as numpy scalars.
+
+    Args:
+        enabled (bool): Use the scalar evaluation.
+
+    """
+    global _scalar_fast_path
+    _scalar_fast_path = bool(enabled)
+
+
+def set_chunk_size(size):
+    """Set the number of points evaluated at once by the models.
+
+    Larger inputs are split into chunks along the first axis, and the results
+    are written into preallocated outputs. This bounds the memory used by the
+    temporary arrays of the models. Can also be set for a single call with
+    the ``chunk_size`` keyword argument.
+
+    Args:
+        size (int): Maximum number of points per chunk, None to disable.
+
+    """
+    global _chunk_size
+    _chunk_size = size
+
+
+def set_n_threads(n):
+    """Set the number of threads evaluating the chunks of large inputs.
+
+    Inputs larger than the chunk size (see ``set_chunk_size``) are split into
+    chunks, which are evaluated on a pool of threads. numpy releases the GIL
+    in the array operations, so the chunks run in parallel. Can also be set
+    for a single call with the ``n_threads`` keyword argument.
+
+    Args:
+        n (int): Number of threads, None for the number of CPUs. Defaults to
+            1 (no threads).
+
+    """
+    global _n_threads
+    _n_threads = _threads(n)
+
+
+def _threads(n):
+    if n is None:
+        return os.cpu_count() or 1
+    return max(1, int(n))
+
+
+def _get_executor(n_threads):
+    # a single pool, sized to the largest number of threads asked for; a
+    # smaller pool is replaced but not shut down, as other threads may still
+    # be submitting chunks to it, and its threads exit once it is collected
+    global _executor, _executor_size
+
+    with _executor_lock:
+        if _executor_size < n_threads:
+            _executor = ThreadPoolExecutor(
+                max_workers=n_threads, thread_name_prefix="openap"
+            )
+            _executor_size = n_threads
+        return _executor
+
+
+def _all_scalar(args, kwargs):
+    for arg in args:
+        if not isinstance(arg, (int, float)):
+            return False
+    for arg in kwargs.values():
+        if not isinstance(arg, (int, float)):
+            return False
+    return True
+
+
+def _to_numpy(value):
+    if isinstance(value, float):
+        return np.float64(value)
+    if isinstance(value, bool):
+        return np.bool_(value)
+    if isinstance(value, int):
+        return np.int64(value)
+    if isinstance(value, tuple):
+        return tuple(_to_numpy(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _to_numpy(v) for k, v in value.items()}
+    return value
+
+
+def _has_complex(value):
+    if isinstance(value, complex):
+        return True
+    if isinstance(value, tuple):
+        return any(_has_complex(v) for v in value)
+    if isinstance(value, dict):
+        return any(_has_complex(v) for v in value.values())
+    return False
+
+
+def _scalar_call(func, self, args, kwargs):
+    """Evaluate func on the scalar twin of self, None if not possible."""
+    global _scalar
+
+    if _scalar is None:
+        from openap import scalar as _scalar
+
+    try:
+        result = func(_scalar.twin(self), *args, **kwargs)
+    except (ArithmeticError, ValueError, TypeError):
+        # leave the corner cases (and the errors) to the numpy evaluation
+        return None
+
+    # negative base with fractional exponent, numpy gives nan
+    if _has_complex(result):
+        return None
+
+    return _to_numpy(result)
+
+
+def _allocate(result, shape):
+    if isinstance(result, tuple):
+        return tuple(_allocate(r, shape) for r in result)
+    if isinstance(result, dict):
+        return {k: _allocate(r, shape) for k, r in result.items()}
+    return np.empty(shape, dtype=np.result_type(result))
+
+
+def _assign(out, result, rows):
+    if isinstance(out, tuple):
+        for o, r in zip(out, result):
+            _assign(o, r, rows)
+    elif isinstance(out, dict):
+        for k in out:
+            _assign(out[k], result[k], rows)
+    else:
+        out[rows] = result
+
+
+def _run_chunk(func, args, kwargs, rows, out):
+    _local.worker = True
+    try:
+        result = func(
+            *[a if a.ndim == 0 else a[rows] for a in args],
+            **{k: a if a.ndim == 0 else a[rows] for k, a in kwargs.items()},
+        )
+        _assign(out, result, rows)
+    finally:
+        _local.worker = False
+
+
+def _run_chunks(func, args, kwargs, chunks, out):
+    for rows in chunks:
+        _run_chunk(func, args, kwargs, rows, out)
+
+
+def _chunked_call(func, args, kwargs, chunk_size, n_threads=1):
+    """Evaluate func on chunks of the (broadcast) inputs, possibly threaded."""
+    shape = np.broadcast_shapes(
+        *[a.shape for a in args], *[a.shape for a in kwargs.values()]
+    )
+
+    # nested calls inside a chunk are not threaded again
+    if getattr(_local, "worker", False):
+        n_threads = 1
+
+    size = int(np.prod(shape))
+    if not chunk_size and n_threads > 1:
+        chunk_size = -(-size // n_threads)
+
+    if not chunk_size or len(shape) == 0 or size <= chunk_size:
+        return func(*args, **kwargs)
+
+    # chunks of whole rows, views on the broadcast inputs; 0-d arguments
+    # (such as flags) are passed as they are
+    step = max(1, chunk_size * shape[0] // size)
+
+    def broadcast(a):
+        return a if a.ndim == 0 else np.broadcast_to(a, shape)
+
+    args = [broadcast(a) for a in args]
+    kwargs = {k: broadcast(a) for k, a in kwargs.items()}
+    chunks = [slice(i, i + step) for i in range(0, shape[0], step)]
+
+    # the first chunk gives the structure and types of the outputs
+    rows = chunks[0]
+    result = func(
+        *[a if a.ndim == 0 else a[rows] for a in args],
+        **{k: a if a.ndim == 0 else a[rows] for k, a in kwargs.items()},
+    )
+    out = _allocate(result, shape)
+    _assign(out, result, rows)
+    del result
+
+    if n_threads > 1 and len(chunks) > 2:
+        # n_threads tasks at most, each evaluating every n_threads-th chunk,
+        # so that a call does not use more threads of the shared pool
+        executor = _get_executor(n_threads)
+        rest = chunks[1:]
+        futures = [
+            executor.submit(_run_chunks, func, args, kwargs, rest[i::n_threads], out)
+            for i in range(min(n_threads, len(rest)))
+        ]
+        for future in futures:
+            future.result()
+    else:
+        for rows in chunks[1:]:
+            _run_chunk(func, args, kwargs, rows, out)
+
+    return out
 
 
 def ndarrayconvert(func):
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
+        chunk_size = kwargs.pop("chunk_size", _chunk_size)
+        n_threads = _threads(kwargs.pop("n_threads", _n_threads))
+
+        # an atmosphere given at the points of a trajectory (see
+        # openap.weather) is aligned with the whole inputs
+        backend = self.__dict__.get("aero")
+        if not isinstance(backend, ModuleType) and getattr(backend, "pointwise", 0):
+            chunk_size, n_threads = None, 1
+
+        elif _scalar_fast_path and _all_scalar(args, kwargs):
+            result = _scalar_call(func, self, args, kwargs)
+            if result is not None:
+                return result
+
         new_args = []
         new_kwargs = {}
 
         for arg in args:
-            arg = np.array(arg)
+            arg = np.asarray(arg)
             new_args.append(arg)
 
         for k, arg in kwargs.items():
-            arg = np.array(arg)
+            arg = np.asarray(arg)
             new_kwargs[k] = arg
 
-        return func(self, *new_args, **new_kwargs)
+        return _chunked_call(
+            functools.partial(func, self), new_args, new_kwargs, chunk_size, n_threads
+        )
 
     wrapper.orig_func = func
     return wrapper
+
+
+def chunked(func):
+    """Evaluate a function of arrays in chunks (and threads) for large inputs.
+
+    Function-level variant of ``ndarrayconvert``, for the functions of the
+    ``aero`` module. Only the calls with the ``chunk_size`` or ``n_threads``
+    keyword arguments, or with more than one thread set by ``set_n_threads``,
+    are chunked; their results are numpy arrays. Other inputs, such as pandas
+    objects, are passed unchanged.
+
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        opted_in = "chunk_size" in kwargs or "n_threads" in kwargs
+        chunk_size = kwargs.pop("chunk_size", _chunk_size)
+        n_threads = _threads(kwargs.pop("n_threads", _n_threads))
+        if not opted_in and n_threads == 1:
+            return func(*args, **kwargs)
+
+        # small inputs are passed as they are, without conversion
+        limit = chunk_size or (0 if n_threads > 1 else np.inf)
+        if all(np.size(a) <= limit for a in args) and all(
+            np.size(a) <= limit for a in kwargs.values()
+        ):
+            return func(*args, **kwargs)
+
+        new_args = [np.asarray(a) for a in args]
+        new_kwargs = {k: np.asarray(a) for k, a in kwargs.items()}
+        return _chunked_call(func, new_args, new_kwargs, chunk_size, n_threads)
+
+    wrapper.orig_func = func
+    return wrapper
+
+
+def __getattr__(name):
+    # submodules, imported on first access as openap.extra.<name>
+    if name in ("aero", "nav", "filters", "statistics"):
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -24,6 +24,8 @@ Speed conversion at altitude h[m] in ISA:
 
 import numpy as np
 
+from . import chunked
+
 """Aero and Geo Constants """
 kts = 0.514444  # knot -> m/s
 ft = 0.3048  # ft -> m
@@ -45,6 +47,77 @@ r_earth = 6371000.0  # m, average earth radius
 a0 = 340.293988  # m/s, sea level speed of sound ISA, sqrt(gamma*R*T0)
 
 
+# density table of the tabulated atmosphere, see set_atmos_table
+_atmos_table = None
+
+
+def set_atmos_table(step=1.0, top=20000.0):
+    """Evaluate the ISA atmosphere of arrays by interpolation in a table.
+
+    The density is tabulated every step meters from sea level to top, and
+    interpolated linearly at a position given by the altitude (no search).
+    The temperature is exact, and the pressure follows from the density and
+    the temperature. All the functions of this module (and the models) use
+    the table through ``atmos``.
+
+    Arrays with altitudes out of the table (or nan) are evaluated with the
+    ISA formulas, as well as scalars. With the default 1 m step, the largest
+    relative error of the density and pressure is about 1e-9, see
+    ``benchmark/bench_atmos.py``.
+
+    Args:
+        step (float): Altitude step of the table (m), None to use the ISA
+            formulas everywhere (default mode).
+        top (float): Highest altitude of the table (m).
+
+    """
+    global _atmos_table
+
+    if step is None:
+        _atmos_table = None
+        return
+
+    n = int(round(top / step))
+    h = np.arange(n + 1) * step
+    p, rho, T = _isa(h)
+
+    # slope of each cell, zero after the last point
+    slope = np.append(np.diff(rho), 0.0)
+    _atmos_table = (1 / step, float(h[-1]), rho, slope)
+
+
+def _isa(h):
+    T = np.maximum(288.15 - 0.0065 * h, 216.65)
+    rhotrop = 1.225 * (T / 288.15) ** 4.256848030018761
+    dhstrat = np.maximum(0.0, h - 11000.0)
+    rho = rhotrop * np.exp(-dhstrat / 6341.552161)
+    p = rho * R * T
+    return p, rho, T
+
+
+def _isa_table(h, table):
+    inv_step, top, rho, slope = table
+    if not (h.min() >= 0 and h.max() <= top):  # also for nan
+        return _isa(h)
+
+    # in place, the temporary arrays cost as much as the arithmetic
+    u = h * inv_step
+    i = u.astype(np.intp)
+    u -= i
+    rho_h = slope.take(i)
+    rho_h *= u
+    rho_h += rho.take(i)
+
+    T = h * -0.0065
+    T += 288.15
+    np.maximum(T, 216.65, out=T)
+
+    p = rho_h * T
+    p *= R
+    return p, rho_h, T
+
+
+@chunked
 def atmos(h):
     """Compute press, density and temperature at a given altitude.
 
@@ -56,14 +129,34 @@ def atmos(h):
             Air pressure (Pa), density (kg/m3), and temperature (K).
 
     """
-    T = np.maximum(288.15 - 0.0065 * h, 216.65)
-    rhotrop = 1.225 * (T / 288.15) ** 4.256848030018761
-    dhstrat = np.maximum(0.0, h - 11000.0)
-    rho = rhotrop * np.exp(-dhstrat / 6341.552161)
-    p = rho * R * T
-    return p, rho, T
+    table = _atmos_table
+    if table is not None and isinstance(h, np.ndarray) and h.size > 0:
+        return _isa_table(h, table)
+    return _isa(h)
+
+
+@chunked
+def atmos_grad(h):
+    """Compute the derivatives of press, density and temperature with altitude.
+
+    Args:
+        h (float or ndarray): Altitude (in meters).
+
+    Returns:
+        (float, float, float) or (ndarray, ndarray, ndarray):
+            Derivatives of air pressure (Pa/m), density (kg/m4), and
+            temperature (K/m).
+
+    """
+    p, rho, T = _isa(h)
+    troposphere = h < 11000.0
+    dT = np.where(troposphere, -0.0065, 0.0)
+    drho = np.where(troposphere, 4.256848030018761 * dT / T, -1 / 6341.552161) * rho
+    dp = R * (drho * T + rho * dT)
+    return dp, drho, dT
 
 
+@chunked
 def temperature(h):
     """Compute air temperature at a given altitude.
 
@@ -78,6 +171,7 @@ def temperature(h):
     return T
 
 
+@chunked
 def pressure(h):
     """Compute air pressure at a given altitude.
 
@@ -92,6 +186,7 @@ def pressure(h):
     return p
 
 
+@chunked
 def density(h):
     """Compute air density at a given altitude.
 
@@ -106,6 +201,7 @@ def density(h):
     return r
 
 
+@chunked
 def vsound(h):
     """Compute speed of sound at a given altitude.
 
@@ -175,6 +271,7 @@ def bearing(lat1, lon1, lat2, lon2):
     return bearing
 
 
+@chunked
 def h_isa(p):
     """Compute ISA altitude for a given pressure.
 
@@ -233,6 +330,7 @@ def latlon(lat1, lon1, d, brg, h=0):
     return lat2, lon2
 
 
+@chunked
 def tas2mach(v_tas, h):
     """Convert true airspeed to mach number at a given altitude.
 
@@ -249,6 +347,7 @@ def tas2mach(v_tas, h):
     return mach
 
 
+@chunked
 def mach2tas(mach, h):
     """Convert mach number to true airspeed at a given altitude.
 
@@ -265,6 +364,7 @@ def mach2tas(mach, h):
     return v_tas
 
 
+@chunked
 def eas2tas(v_eas, h):
     """Convert equivalent airspeed to true airspeed at a given altitude.
 
@@ -281,6 +381,7 @@ def eas2tas(v_eas, h):
     return v_tas
 
 
+@chunked
 def tas2eas(v_tas, h):
     """Convert true airspeed to equivalent airspeed at a given altitude.
 
@@ -297,6 +398,7 @@ def tas2eas(v_tas, h):
     return v_eas
 
 
+@chunked
 def cas2tas(v_cas, h):
     """Convert calibrated airspeed to true airspeed at a given altitude.
 
@@ -314,6 +416,7 @@ def cas2tas(v_cas, h):
     return v_tas
 
 
+@chunked
 def tas2cas(v_tas, h):
     """Convert true airspeed to calibrated airspeed at a given altitude.
 
@@ -331,6 +434,7 @@ def tas2cas(v_tas, h):
     return v_cas
 
 
+@chunked
 def mach2cas(mach, h):
     """Convert mach number to calibrated airspeed at a given altitude.
 
@@ -347,6 +451,7 @@ def mach2cas(mach, h):
     return v_cas
 
 
+@chunked
 def cas2mach(v_cas, h):
     """Convert calibrated airspeed to mach number  at a given altitude.
 
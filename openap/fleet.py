@@ -0,0 +1,435 @@
+"""Mixed-fleet evaluation of the fuel flow and emission models.
+
+The fleet models hold the constants of several aircraft types (wing area,
+drag polar, engine thrust, fuel flow coefficients, emission indices) as
+arrays, one value per type. A call takes a row-wise array of type codes,
+gathers the constants of each row, and evaluates all the rows in one
+vectorized pass with the formulas of the single-type models.
+
+Type codes are either the ICAO types given to the fleet model (upper case),
+or integer positions in the list of types, which is faster for long inputs
+(for example, the codes of a pandas categorical).
+
+Examples::
+
+    from openap.fleet import FleetFuelFlow
+
+    fleet = FleetFuelFlow(["A320", "B738", "E190"])
+    fleet.enroute(df.typecode, mass=df.mass, tas=df.tas, alt=df.alt)
+
+"""
+
+import numpy as np
+from openap import prop, bundle, thrust, drag, fuel, emission
+from openap.extra import ndarrayconvert, aero
+
+
+class _RowNumpy(object):
+    """numpy, with the interpolation in a different table for each point."""
+
+    def __getattr__(self, name):
+        return getattr(np, name)
+
+    @staticmethod
+    def interp(x, xp, fp):
+        # same formula as numpy.interp, with knots given as arrays of points
+        x = np.asarray(x)
+        y = np.where(x < xp[0], fp[0], fp[-1])
+        for j in range(len(xp) - 1):
+            inside = (x >= xp[j]) & (x < xp[j + 1])
+            slope = (fp[j + 1] - fp[j]) / (xp[j + 1] - xp[j])
+            y = np.where(inside, slope * (x - xp[j]) + fp[j], y)
+        return np.where(np.isnan(x), x, y)
+
+
+class _GatherMeta(type):
+    """Model classes evaluated on gathered constants, without decorators.
+
+    The inputs are chunked once by the fleet model, so the methods of the
+    single-type models are used without the ``ndarrayconvert`` decorator.
+    """
+
+    def __new__(cls, name, base, attr_dict):
+        seen = set(attr_dict)
+        for b in base:
+            for c in b.__mro__:
+                for elt, value in vars(c).items():
+                    if elt in seen:
+                        continue
+                    seen.add(elt)
+                    if hasattr(value, "orig_func"):
+                        attr_dict[elt] = value.orig_func
+
+        return super().__new__(cls, name, base, attr_dict)
+
+
+class _Thrust(thrust.Thrust, metaclass=_GatherMeta):
+    pass
+
+
+class _Drag(drag.Drag, metaclass=_GatherMeta):
+    pass
+
+
+class _FuelFlow(fuel.FuelFlow, metaclass=_GatherMeta):
+    pass
+
+
+class _Emission(emission.Emission, metaclass=_GatherMeta):
+    pass
+
+
+def _view(cls, **attrs):
+    """Model of class cls with the given attributes, without initialization."""
+    model = cls.__new__(cls)
+    model.__dict__.update(attrs)
+    return model
+
+
+def _stack(records):
+    """Record of arrays (one value per type) from a list of records."""
+    return type(records[0])(
+        *[np.array(values, dtype=float) for values in zip(*records)]
+    )
+
+
+def _gather(record, index):
+    return type(record)(*[values[index] for values in record])
+
+
+class _Fleet(object):
+    """Aircraft types and engines of a fleet model."""
+
+    def __init__(self, types, engines=None, **kwargs):
+        if "wave_drag" in kwargs:
+            raise RuntimeError("Wave drag is not supported by the fleet models.")
+
+        self.types = [ac.upper() for ac in types]
+
+        if engines is None:
+            engines = [None] * len(self.types)
+        elif isinstance(engines, dict):
+            engines = [engines.get(ac) for ac in types]
+
+        if len(engines) != len(self.types):
+            raise RuntimeError("Fleet types and engines have different lengths.")
+
+        self.models = [
+            bundle.models(ac, eng, **kwargs) for ac, eng in zip(self.types, engines)
+        ]
+
+        # lookup of the type codes, first position of each type
+        codes = {}
+        for i, ac in enumerate(self.types):
+            codes.setdefault(ac, i)
+        self._codes = np.array(sorted(codes))
+        self._positions = np.array([codes[ac] for ac in self._codes])
+
+    def index(self, typecode):
+        """Positions in the fleet of the type codes.
+
+        Args:
+            typecode (str, int, or ndarray): ICAO types or positions in the
+                list of types of the fleet.
+
+        Returns:
+            int or ndarray: Positions in the list of types.
+
+        """
+        typecode = np.asarray(typecode)
+
+        if typecode.dtype.kind in "iu":
+            if typecode.size and (
+                typecode.min() < 0 or typecode.max() >= len(self.types)
+            ):
+                raise RuntimeError("Type index out of the range of the fleet.")
+            return typecode
+
+        if typecode.dtype.kind == "O":
+            typecode = typecode.astype(str)
+
+        pos = np.searchsorted(self._codes, typecode)
+        pos = np.minimum(pos, len(self._codes) - 1)
+        unknown = self._codes[pos] != typecode
+        if np.any(unknown):
+            missing = sorted(set(np.atleast_1d(typecode[unknown]).tolist()))
+            raise RuntimeError(f"Aircraft types {missing} not in the fleet.")
+
+        return self._positions[pos]
+
+
+class FleetFuelFlow(_Fleet):
+    """Fuel flow model of a mixed fleet."""
+
+    def __init__(self, types, engines=None, **kwargs):
+        """Initialize FleetFuelFlow object.
+
+        Args:
+            types (list): ICAO aircraft types (for example: A320).
+            engines (list or dict): Engine type of each aircraft type, or a
+                dictionary of engine types by aircraft type. Leave empty to
+                use the default engines of the aircraft database.
+            **kwargs: Options passed to the models, such as use_synonym.
+
+        """
+        super(FleetFuelFlow, self).__init__(types, engines, **kwargs)
+
+        self.thrust_const = _stack([m.thrust.const for m in self.models])
+        self.drag_const = _stack([m.drag.const for m in self.models])
+        self.fuel_const = _stack([m.fuelflow.const for m in self.models])
+
+    def _model(self, typecode):
+        """Fuel flow model with the constants of each point."""
+        index = self.index(typecode)
+
+        thrust = _view(
+            _Thrust, np=np, aero=aero, const=_gather(self.thrust_const, index)
+        )
+        drag = _view(
+            _Drag,
+            np=np,
+            aero=aero,
+            const=_gather(self.drag_const, index),
+            wave_drag=False,
+        )
+
+        c = _gather(self.fuel_const, index)
+        return _view(
+            _FuelFlow,
+            np=np,
+            aero=aero,
+            const=c,
+            thrust=thrust,
+            drag=drag,
+            func_fuel=prop.func_fuel(c.fuel_c3, c.fuel_c2, c.fuel_c1),
+        )
+
+    @ndarrayconvert
+    def at_thrust(self, typecode, acthr, alt=0):
+        """Compute the fuel flow at a given total thrust.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            acthr (int or ndarray): The total net thrust of the aircraft (unit: N).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float or ndarray: Fuel flow (unit: kg/s).
+
+        """
+        return self._model(typecode).at_thrust(acthr, alt)
+
+    def takeoff(self, typecode, tas, alt=None, throttle=1):
+        """Compute the fuel flow at takeoff.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            tas (int or ndarray): Aircraft true airspeed (unit: kt).
+            alt (int or ndarray): Altitude of airport (unit: ft). Defaults to sea-level.
+            throttle (float or ndarray): The throttle setting, between 0 and 1.
+                Defaults to 1, which is at full thrust.
+
+        Returns:
+            float or ndarray: Fuel flow (unit: kg/s).
+
+        """
+        sea_level = alt is None
+        alt = 0 if sea_level else alt
+        return self._takeoff(typecode, tas, alt, throttle, sea_level)
+
+    @ndarrayconvert
+    def _takeoff(self, typecode, tas, alt, throttle, sea_level):
+        alt = None if sea_level else alt
+        return self._model(typecode).takeoff(tas, alt, throttle)
+
+    @ndarrayconvert
+    def enroute(self, typecode, mass, tas, alt, path_angle=0, fillna=True):
+        """Compute the fuel flow during climb, cruise, or descent.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            mass (int or ndarray): Aircraft mass (unit: kg).
+            tas (int or ndarray): Aircraft true airspeed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+            path_angle (float or ndarray): Flight path angle (unit: degrees).
+            fillna (bool): Set fuel flow to NaN when the required thrust exceeds
+                the maximum thrust by more than 20%. Defaults to True.
+
+        Returns:
+            float or ndarray: Fuel flow (unit: kg/s).
+
+        """
+        return self._model(typecode).enroute(mass, tas, alt, path_angle, fillna)
+
+
+class FleetEmission(_Fleet):
+    """Emission model of a mixed fleet."""
+
+    def __init__(self, types, engines=None, **kwargs):
+        """Initialize FleetEmission object.
+
+        Args:
+            types (list): ICAO aircraft types (for example: A320).
+            engines (list or dict): Engine type of each aircraft type, or a
+                dictionary of engine types by aircraft type. Leave empty to
+                use the default engines of the aircraft database.
+            **kwargs: Options passed to the models, such as use_synonym.
+
+        """
+        super(FleetEmission, self).__init__(types, engines, **kwargs)
+
+        self.n_eng = np.array([m.emission.n_eng for m in self.models], dtype=float)
+
+        # fuel flows and emission indices of the ICAO modes, one array per mode
+        emissions = [m.emission for m in self.models]
+        self.ff_modes = [
+            np.array(ff, dtype=float) for ff in zip(*[e.ff_modes for e in emissions])
+        ]
+        self.ei = {
+            s: [np.array(ei, dtype=float) for ei in zip(*[e.ei[s] for e in emissions])]
+            for s in ["nox", "co", "hc"]
+        }
+
+    def _model(self, typecode):
+        """Emission model with the engine of each point."""
+        index = self.index(typecode)
+        return _view(
+            _Emission,
+            np=_RowNumpy(),
+            aero=aero,
+            n_eng=self.n_eng[index],
+            ff_modes=[ff[index] for ff in self.ff_modes],
+            ei={s: [ei[index] for ei in v] for s, v in self.ei.items()},
+        )
+
+    @ndarrayconvert
+    def co2(self, typecode, ffac):
+        """Compute CO2 emission with given fuel flow.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+
+        Returns:
+            float or ndarray: CO2 emission from all engines (unit: g/s).
+
+        """
+        return _Emission.co2(self, ffac)
+
+    @ndarrayconvert
+    def h2o(self, typecode, ffac):
+        """Compute H2O emission with given fuel flow.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+
+        Returns:
+            float or ndarray: H2O emission from all engines (unit: g/s).
+
+        """
+        return _Emission.h2o(self, ffac)
+
+    @ndarrayconvert
+    def soot(self, typecode, ffac):
+        """Compute soot emission with given fuel flow.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+
+        Returns:
+            float or ndarray: Soot emission from all engines (unit: g/s).
+
+        """
+        return _Emission.soot(self, ffac)
+
+    @ndarrayconvert
+    def sox(self, typecode, ffac):
+        """Compute SOx emission with given fuel flow.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+
+        Returns:
+            float or ndarray: SOx emission from all engines (unit: g/s).
+
+        """
+        return _Emission.sox(self, ffac)
+
+    @ndarrayconvert
+    def nox(self, typecode, ffac, tas, alt=0):
+        """Compute NOx emission with given fuel flow, speed, and altitude.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float or ndarray: NOx emission from all engines (unit: g/s).
+
+        """
+        return self._model(typecode).nox(ffac, tas, alt)
+
+    @ndarrayconvert
+    def co(self, typecode, ffac, tas, alt=0):
+        """Compute CO emission with given fuel flow, speed, and altitude.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float or ndarray: CO emission from all engines (unit: g/s).
+
+        """
+        return self._model(typecode).co(ffac, tas, alt)
+
+    @ndarrayconvert
+    def hc(self, typecode, ffac, tas, alt=0):
+        """Compute HC emission with given fuel flow, speed, and altitude.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float or ndarray: HC emission from all engines (unit: g/s).
+
+        """
+        return self._model(typecode).hc(ffac, tas, alt)
+
+    @ndarrayconvert
+    def all(self, typecode, ffac, tas, alt=0):
+        """Compute all emissions with given fuel flow, speed, and altitude.
+
+        Args:
+            typecode (str, int, or ndarray): Aircraft types, or positions
+                in the list of types.
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            dict: Emissions of CO2, H2O, NOx, CO, HC, SOx, and soot from all
+                engines, by species name (unit: g/s).
+
+        """
+        return self._model(typecode).all(ffac, tas, alt)
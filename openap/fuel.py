@@ -1,14 +1,29 @@
 """OpenAP FuelFlow model."""
 
 import importlib
-from openap import prop
+from collections import namedtuple
+from openap import prop, diagnostics
 from openap.extra import ndarrayconvert
 
+FuelConstants = namedtuple(
+    "FuelConstants",
+    [
+        "n_eng",  # number of engines
+        "maxthr",  # total takeoff thrust at the maximum liftoff speed (N)
+        "fuel_c3",  # fuel flow polynomial coefficients (kg/s)
+        "fuel_c2",
+        "fuel_c1",
+        "fuel_ch",  # fuel flow altitude correction factor (kg/s/N per meter)
+    ],
+)
+
 
 class FuelFlow(object):
     """Fuel flow model based on ICAO emission databank."""
 
-    def __init__(self, ac, eng=None, **kwargs):
+    def __init__(
+        self, ac, eng=None, thrust=None, drag=None, wrap=None, atmosphere=None, **kwargs
+    ):
         """Initialize FuelFlow object.
 
         Args:
@@ -16,11 +31,20 @@ class FuelFlow(object):
             eng (string): Engine type (for example: CFM56-5A3).
                 Leave empty to use the default engine specified
                 by in the aircraft database.
+            thrust (Thrust): Existing thrust model to share. Optional.
+            drag (Drag): Existing drag model to share. Optional.
+            wrap (WRAP): Existing kinematic model to share. Optional.
+            atmosphere (TrajectoryAtmosphere): Non-standard atmosphere at
+                the points of a trajectory (see ``openap.weather``), also
+                used by the thrust and drag models. Defaults to the ISA.
 
         """
         if not hasattr(self, "np"):
             self.np = importlib.import_module("numpy")
 
+        if not hasattr(self, "aero"):
+            self.aero = importlib.import_module("openap").aero
+
         if not hasattr(self, "Thrust"):
             self.Thrust = importlib.import_module("openap.thrust").Thrust
 
@@ -37,19 +61,39 @@ class FuelFlow(object):
 
         self.engine = prop.engine(eng)
 
-        self.thrust = self.Thrust(ac, eng, **kwargs)
-        self.drag = self.Drag(ac, **kwargs)
-        self.wrap = self.WRAP(ac, **kwargs)
+        self.thrust = thrust if thrust is not None else self.Thrust(ac, eng, **kwargs)
+        self.drag = drag if drag is not None else self.Drag(ac, **kwargs)
+        self.wrap = wrap if wrap is not None else self.WRAP(ac, **kwargs)
 
         c3, c2, c1 = (
             self.engine["fuel_c3"],
             self.engine["fuel_c2"],
             self.engine["fuel_c1"],
         )
-        
 
         self.func_fuel = prop.func_fuel(c3, c2, c1)
 
+        # use maximum dynamic thrust at see-level as denominator
+        v_lof_max = self.wrap.takeoff_speed()["maximum"]
+        maxthr = self.thrust.takeoff(tas=v_lof_max / 0.5144, alt=0)
+
+        self.const = FuelConstants(
+            n_eng=self.aircraft["engine"]["number"],
+            maxthr=float(maxthr),
+            fuel_c3=c3,
+            fuel_c2=c2,
+            fuel_c1=c1,
+            fuel_ch=self.engine["fuel_ch"],
+        )
+
+        # after the constants, which are those of the ISA; the thrust and
+        # drag models may be shared, and are copied
+        if atmosphere is not None:
+            bind = importlib.import_module("openap.weather").bind
+            self.aero = atmosphere
+            self.thrust = bind(self.thrust, atmosphere)
+            self.drag = bind(self.drag, atmosphere)
+
     @ndarrayconvert
     def at_thrust(self, acthr, alt=0):
         """Compute the fuel flow at a given total thrust.
@@ -62,24 +106,16 @@ class FuelFlow(object):
             float: Fuel flow (unit: kg/s).
 
         """
-        n_eng = self.aircraft["engine"]["number"]
-        engthr = acthr / n_eng
-
-        # use maximum dynamic thrust at see-level as denominator
-        v_lof_max = self.wrap.takeoff_speed()["maximum"]
-        maxthr = self.thrust.takeoff(tas=v_lof_max / 0.5144, alt=0)
-       
-        ratio = acthr / maxthr
-       
+        c = self.const
+        engthr = acthr / c.n_eng
 
+        ratio = acthr / c.maxthr
 
         ff_sl = self.func_fuel(ratio)
-        ff_corr_alt = self.engine["fuel_ch"] * (engthr / 1000) * (alt * 0.3048)
+        ff_corr_alt = c.fuel_ch * (engthr / 1000) * (alt * 0.3048)
         ff_eng = ff_sl + ff_corr_alt
 
-
-
-        fuelflow = ff_eng * n_eng
+        fuelflow = ff_eng * c.n_eng
 
         return fuelflow
 
@@ -106,7 +142,9 @@ class FuelFlow(object):
         return fuelflow
 
     @ndarrayconvert
-    def enroute(self, mass, tas, alt, path_angle=0, fillna=True):
+    def enroute(
+        self, mass, tas, alt, path_angle=0, fillna=True, intermediates=False
+    ):
         """Compute the fuel flow during climb, cruise, or descent.
 
         The net thrust is first estimated based on the dynamic equation.
@@ -118,28 +156,145 @@ class FuelFlow(object):
             tas (int or ndarray): Aircraft true airspeed (unit: kt).
             alt (int or ndarray): Aircraft altitude (unit: ft).
             path_angle (float or ndarray): Flight path angle (unit: degrees).
+            fillna (bool): Set fuel flow to NaN when the required thrust exceeds
+                the maximum thrust by more than 20%. Defaults to True.
+            intermediates (bool): Return all intermediate results of the
+                evaluation instead of fuel flow only. Defaults to False.
 
         Returns:
-            float: Fuel flow (unit: kg/s).
+            float or dict: Fuel flow (unit: kg/s). If intermediates is True,
+                a dictionary with the following keys:
+
+                - fuelflow: fuel flow (kg/s)
+                - drag: drag (N)
+                - thrust: required net thrust (N)
+                - thrust_idle: idle thrust (N)
+                - thrust_max: maximum climb thrust (N)
+                - mach: Mach number
+                - cas: calibrated airspeed (kt)
+                - pressure: air pressure (Pa)
+                - density: air density (kg/m3)
+                - temperature: air temperature (K)
+                - feasible: required thrust within the performance boundary
+
+                Mach number and CAS of TAS below 10 kt are evaluated at 10 kt.
 
         """
-        D = self.drag.clean(mass=mass, tas=tas, alt=alt, path_angle=path_angle)
+        result = self._enroute(mass, tas, alt, path_angle, fillna)
+
+        if intermediates:
+            return result
+
+        return result["fuelflow"]
+
+    def _enroute(self, mass, tas, alt, path_angle, fillna):
+        """Evaluate the en-route model with a single atmosphere evaluation."""
+        p, rho, T_air = self.aero.atmos(alt * self.aero.ft)
+
+        D = self.drag._clean(mass, tas, path_angle, rho, T_air)
 
         # Convert angles from degrees to radians.
         gamma = path_angle * self.np.pi / 180
 
         T = D + mass * 9.80665 * self.np.sin(gamma)
-        T_idle = self.thrust.descent_idle(tas=tas, alt=alt)
+
+        # maximum climb thrust, the idle thrust is 7% of it
+        tas_thr = self.np.where(tas < 10, 10, tas)
+        mach, vcas = self.thrust._mach_cas(tas_thr, p, rho, T_air)
+        T_max = self.thrust._climb(mach, vcas, p, alt, 0)
+        T_idle = 0.07 * T_max
+
         T = self.np.where(T < 0, T_idle, T)
 
         fuelflow = self.at_thrust(T, alt)
 
         # do not performa calculation outside performance boundary (with margin of 20%)
+        infeasible = T > 1.20 * T_max
         if fillna:
-            T_max = self.thrust.climb(tas=tas, alt=alt, roc=0)
-            fuelflow = self.np.where(T > 1.20 * T_max, self.np.nan, fuelflow)
+            fuelflow = self.np.where(infeasible, self.np.nan, fuelflow)
+
+        if diagnostics.active():
+            diagnostics.record("thrust_exceeded", infeasible, "FuelFlow")
+            diagnostics.record("nan_fuel", fuelflow != fuelflow, "FuelFlow")
+
+        return {
+            "fuelflow": fuelflow,
+            "drag": D,
+            "thrust": T,
+            "thrust_idle": T_idle,
+            "thrust_max": T_max,
+            "mach": mach,
+            "cas": vcas / self.aero.kts,
+            "pressure": p,
+            "density": rho,
+            "temperature": T_air,
+            "feasible": self.np.logical_not(infeasible),
+        }
 
-        return fuelflow
+    @ndarrayconvert
+    def enroute_grad(self, mass, tas, alt, path_angle=0, fillna=True):
+        """Compute the fuel flow during climb, cruise, or descent, and its
+        partial derivatives.
+
+        The derivatives are closed-form, exact up to the rounding errors,
+        within the altitude segments of the thrust model, see ``enroute``.
+
+        Args:
+            mass (int or ndarray): Aircraft mass (unit: kg).
+            tas (int or ndarray): Aircraft true airspeed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+            path_angle (float or ndarray): Flight path angle (unit: degrees).
+            fillna (bool): Set fuel flow (and derivatives) to NaN when the
+                required thrust exceeds the maximum thrust by more than 20%.
+                Defaults to True.
+
+        Returns:
+            (float or ndarray, dict): Fuel flow (unit: kg/s), and its partial
+                derivatives with respect to mass (kg/s/kg), tas (kg/s/kt),
+                alt (kg/s/ft) and path_angle (kg/s/degree).
+
+        """
+        c = self.const
+        h = alt * self.aero.ft
+        p, rho, T_air = self.aero.atmos(h)
+        dp, drho, dT = [d * self.aero.ft for d in self.aero.atmos_grad(h)]
+
+        D, grad = self.drag._clean_grad(mass, tas, path_angle, rho, T_air, drho, dT)
+
+        gamma = path_angle * self.np.pi / 180
+        T = D + mass * 9.80665 * self.np.sin(gamma)
+        T_grad = {
+            "mass": grad["mass"] + 9.80665 * self.np.sin(gamma),
+            "tas": grad["tas"],
+            "alt": grad["alt"],
+            "path_angle": grad["path_angle"]
+            + mass * 9.80665 * self.np.cos(gamma) * self.np.pi / 180,
+        }
+
+        # idle thrust, 7% of the maximum climb thrust
+        T_max, max_grad = self.thrust._climb_grad(
+            tas, alt, 0, p, rho, T_air, dp, drho, dT
+        )
+        idle = T < 0
+        T = self.np.where(idle, 0.07 * T_max, T)
+        for k in T_grad:
+            T_grad[k] = self.np.where(idle, 0.07 * max_grad.get(k, 0), T_grad[k])
+
+        # fuel flow at thrust, see at_thrust
+        ratio = T / c.maxthr
+        ff_sl_ratio = 3 * c.fuel_c3 * ratio ** 2 + 2 * c.fuel_c2 * ratio + c.fuel_c1
+        ff_T = ff_sl_ratio * c.n_eng / c.maxthr + c.fuel_ch * alt * 0.3048 / 1000
+        fuelflow = self.at_thrust(T, alt)
+
+        grad = {k: ff_T * v for k, v in T_grad.items()}
+        grad["alt"] = grad["alt"] + c.fuel_ch * T * 0.3048 / 1000
+
+        if fillna:
+            infeasible = T > 1.20 * T_max
+            fuelflow = self.np.where(infeasible, self.np.nan, fuelflow)
+            grad = {k: self.np.where(infeasible, self.np.nan, v) for k, v in grad.items()}
+
+        return fuelflow, grad
 
     def plot_model(self, plot=True):
         """Plot the engine fuel model, or return the pyplot object.
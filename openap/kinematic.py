@@ -22,14 +22,54 @@ Examples:
 """
 
 import os
+import copy
 import glob
-import pandas as pd
+import functools
+from openap import prop, snapshot
+from openap.snapshot import WRAP_COLUMNS
 
 curr_path = os.path.dirname(os.path.realpath(__file__))
 dir_wrap = curr_path + "/data/wrap/"
 file_synonym = curr_path + "/data/wrap/_synonym.csv"
 
-wrap_synonym = pd.read_csv(file_synonym)
+
+def _load_columns(ac):
+    snap = snapshot.get()
+    if snap is not None and ac in snap.wrap_index:
+        return snap.wrap(ac)
+
+    import pandas as pd
+
+    df = pd.read_fwf(dir_wrap + ac + ".txt")
+    return {col: df.iloc[:, i].values for i, col in enumerate(WRAP_COLUMNS)}
+
+
+def _load_wrap(ac):
+    return _compile(_load_columns(ac))
+
+
+def _compile(columns):
+    """Compile WRAP table columns into read-only records indexed by variable."""
+    records = {}
+    for var, opt, vmin, vmax, model, params in zip(
+        columns["variable"],
+        columns["opt"],
+        columns["min"],
+        columns["max"],
+        columns["model"],
+        columns["parameters"],
+    ):
+        records.setdefault(
+            str(var),
+            {
+                "default": float(opt),
+                "minimum": float(vmin),
+                "maximum": float(vmax),
+                "statmodel": str(model),
+                "statmodel_params": [float(i) for i in str(params).split("|")],
+            },
+        )
+    return prop.freeze(records)
 
 
 class WRAP(object):
@@ -48,39 +88,52 @@ class WRAP(object):
 
         self.use_synonym = kwargs.get("use_synonym", False)
 
-        wrap_files = glob.glob(dir_wrap + "*.txt")
-        ac_wrap_available = [s[-8:-4].lower() for s in wrap_files]
+        snap = snapshot.get()
+        if snap is not None:
+            ac_wrap_available = snap.wrap_index
+        else:
+            wrap_files = prop.registry.get(
+                "files", "wrap", lambda: glob.glob(dir_wrap + "*.txt")
+            )
+            ac_wrap_available = [s[-8:-4].lower() for s in wrap_files]
 
         if self.ac not in ac_wrap_available and not self.use_synonym:
             raise RuntimeError(f"Kinematic model for {self.ac} not avaiable in OpenAP.")
 
         if self.ac not in ac_wrap_available and self.use_synonym:
-            syno = wrap_synonym.query("orig==@self.ac")
-            if syno.shape[0] > 0:
-                self.ac = syno.new.iloc[0]
+            wrap_synonym = prop.synonym("wrap")
+            if self.ac in wrap_synonym:
+                self.ac = wrap_synonym[self.ac]
             else:
                 raise RuntimeError(
                     f"Kinematic model for {self.ac} not avaiable in OpenAP."
                 )
 
-        self.df = pd.read_fwf(dir_wrap + self.ac + ".txt")
+        self.records = prop.registry.get(
+            "wrap", self.ac, lambda: _load_wrap(self.ac)
+        )
+
+    @functools.cached_property
+    def df(self):
+        """Original WRAP table as a pandas DataFrame, built on first access.
+
+        The table is an export of the model: the accessors (such as
+        ``cruise_mach``) read the shared compiled records, and do not see
+        the changes of the table.
+
+        """
+        import pandas as pd
+
+        return pd.DataFrame(_load_columns(self.ac))
 
     def _get_var(self, var):
-        r = self.df[self.df["variable"] == var]
+        res = self.records.get(var)
 
-        if r.shape[0] == 0:
+        if res is None:
             raise RuntimeError("variable not found")
 
-        v = r.values[0]
-
-        res = {
-            "default": v[3],
-            "minimum": v[4],
-            "maximum": v[5],
-            "statmodel": v[6],
-            "statmodel_params": [float(i) for i in v[7].split("|")],
-        }
-        return res
+        # a mutable copy of the shared record
+        return copy.deepcopy(res)
 
     def takeoff_speed(self):
         """Get takeoff speed."""
@@ -0,0 +1,953 @@
+"""Fuel burn and emissions along a trajectory.
+
+``Mission.integrate`` integrates the mass of the aircraft along the points of
+a trajectory, with the en-route fuel flow model (``FuelFlow.enroute``): the
+fuel flow at each point is evaluated at the current mass, and burnt during
+the time step of the point.
+
+Only the drag and the weight component of the thrust depend on the mass.
+The required thrust is a polynomial of the mass at each point, whose
+coefficients are evaluated for all points at once, with the atmosphere, the
+maximum thrust, and the altitude correction of the fuel flow. The mass
+recurrence then only evaluates the polynomials, in a loop compiled with
+numba when it is installed (``use_numba``). The emissions are evaluated for
+all points once the fuel flow is known.
+
+The mass can also be integrated backwards, from the final (landing) mass,
+solving the forward recurrence for the mass at each point. Batches of
+flights are given as 2-d arrays, or as concatenated arrays with the offsets
+of the flights (CSR layout); without numba, the flights of large batches are
+integrated together, one point index at a time (``lockstep_threshold``).
+
+With ``breguet``, the runs of level cruise points (path angle, airspeed and
+altitude constant within a tolerance) are integrated in closed form, as a
+single step of the recurrence: the Breguet range equation, with the
+quadratic drag polar and the specific fuel consumption of the fuel flow model
+at the mass in the middle of the run. The mass at the points of a run follows
+from the closed form, and the result reports the runs and the variation of
+the specific fuel consumption over them.
+
+``Mission.trip_fuel`` finds the trip fuel of a trajectory, for a payload and
+the reserve fuel, with a single backward integration from the landing mass
+(or secant iterations on the fuel burn, with contingency fuel). The checks
+of the mass limits are returned as a status code (``SUCCESS``,
+``INFEASIBLE``, ...), see ``STATUS_MESSAGES``.
+
+Examples::
+
+    from openap.mission import Mission
+
+    mission = Mission("A320")
+    result = mission.integrate(70000, dt, tas, alt, path_angle)
+    result["fuel"].sum(), result["final_mass"], result["co2"].sum()
+
+    result = mission.integrate(60000, dt, tas, alt, path_angle, backward=True)
+    result["initial_mass"]  # takeoff mass to land at 60000 kg
+
+    solution = mission.trip_fuel(15000, dt, tas, alt, path_angle, reserve=2000)
+    solution["status"], solution["trip_fuel"], solution["takeoff_mass"]
+
+"""
+
+import math
+import types
+import functools
+import importlib
+from collections import namedtuple
+import numpy as np
+from openap import diagnostics
+
+# compile the mass recurrence with numba, when installed
+use_numba = True
+
+# minimum number of flights evaluated in lockstep with array operations,
+# when the recurrence is not compiled
+lockstep_threshold = 64
+
+# maximum number of Newton iterations per point of the backward recurrence
+_NEWTON_ITERATIONS = 20
+
+# fixed point iterations on the mass in the middle of a level cruise run
+_SFC_ITERATIONS = 8
+
+# density of the jet fuel, for the fuel capacity of the aircraft (kg/L)
+FUEL_DENSITY = 0.8
+
+# status of Mission.trip_fuel
+SUCCESS = 0
+INFEASIBLE = 1
+MTOW_EXCEEDED = 2
+CAPACITY_EXCEEDED = 3
+MLW_EXCEEDED = 4
+NOT_CONVERGED = 5
+
+STATUS_MESSAGES = {
+    SUCCESS: "Trip fuel found.",
+    INFEASIBLE: "Required thrust above the maximum thrust at some points.",
+    MTOW_EXCEEDED: "Takeoff mass above the maximum takeoff mass.",
+    CAPACITY_EXCEEDED: "Fuel above the fuel capacity.",
+    MLW_EXCEEDED: "Landing mass above the maximum landing mass.",
+    NOT_CONVERGED: "Trip fuel iterations did not converge.",
+}
+
+# steps of the mass recurrence: a point, a point at takeoff thrust, or a run
+# of level cruise points integrated in closed form
+_POINT = 0
+_TAKEOFF = 1
+_CRUISE = 2
+
+# mass independent inputs of the mass recurrence, see Mission._prepare
+_Points = namedtuple(
+    "_Points",
+    [
+        "dt", "tas", "alt", "shape", "offsets", "single", "mode", "args", "consts",
+        "cruise",
+    ],
+)
+
+# level cruise runs of the points, see Mission._cruise_runs
+_Runs = namedtuple("_Runs", ["step", "elapsed", "points", "offsets", "coefs"])
+
+
+def _point(
+    m, qS, lift, weight, wave0, idle, tmax, ff_alt,
+    cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1,
+):
+    """Fuel flow at a point for a given mass, its derivative with the mass,
+    and feasibility, from the coefficients of the point (see
+    ``Mission._coefficients``)."""
+    cl = m * lift
+    dmach = wave0 + wave_cl * cl
+    if dmach < 0:
+        dmach = 0.0
+    D = (cd0 + 20 * dmach ** 4 + k * cl * cl) * qS
+    dD = (80 * dmach ** 3 * wave_cl + 2 * k * cl) * lift * qS
+    T = D + m * weight
+    dT = dD + weight
+    if T < 0:
+        T = idle
+        dT = 0.0
+
+    r = T / maxthr
+    ff = (c3 * r ** 3 + c2 * r ** 2 + c1 * r) * n_eng + ff_alt * T
+    dff = ((3 * c3 * r ** 2 + 2 * c2 * r + c1) * n_eng / maxthr + ff_alt) * dT
+    return ff, dff, not T > 1.20 * tmax
+
+
+def _cruise(
+    m, qS, lift, weight, tmax, ff_alt, cd0, k, n_eng, maxthr, c3, c2, c1,
+    duration, sign,
+):
+    """Mass at the end of a level cruise run from the mass at its start (sign
+    1), or at its start from the mass at its end (sign -1), and whether the
+    run is infeasible.
+
+    The required thrust is a + weight * m + b * m**2 over the run, and the
+    specific fuel consumption (fuel flow per N of thrust) is taken constant,
+    at the mass in the middle of the run. The mass then decreases as
+    u = s * tan(atan(u0 / s) - c * sqrt(a' * b) * t), with u = m + shift
+    (Breguet range equation with a quadratic drag polar).
+    """
+    a = cd0 * qS
+    b = k * lift * lift * qS
+    shift = weight / (2 * b)
+    a = a - weight * shift / 2
+    s = np.sqrt(a / b)
+    rate = np.sqrt(a * b) * duration * sign
+
+    u = m + shift
+    phase = np.arctan(u / s)
+    u_end = u
+    for _ in range(_SFC_ITERATIONS):
+        # specific fuel consumption at the start, then in the middle
+        um = (u + u_end) / 2
+        r = (a + b * um * um) / maxthr
+        c = (c3 * r * r + c2 * r + c1) * n_eng / maxthr + ff_alt
+        u_end = s * np.tan(phase - c * rate)
+
+    m_end = u_end - shift
+    heavy = u if sign > 0 else u_end
+    return m_end, c, a + b * heavy * heavy > 1.20 * tmax
+
+
+def _forward(
+    mass0, offsets, dt, qS, lift, weight, wave0, idle, tmax, ff_alt, kind,
+    ff_fixed, cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1, fillna,
+    mass, fuelflow, feasible, final,
+):
+    """Mass recurrence of each flight, from its initial mass.
+
+    The fuel flow of the cruise runs is their specific fuel consumption.
+    """
+    for f in range(len(mass0)):
+        m = mass0[f]
+        for i in range(offsets[f], offsets[f + 1]):
+            mass[i] = m
+            if kind[i] == _CRUISE:
+                m_end, ff, bad = _cruise(
+                    m, qS[i], lift[i], weight[i], tmax[i], ff_alt[i], cd0, k,
+                    n_eng, maxthr, c3, c2, c1, dt[i], 1.0,
+                )
+                if fillna and bad:
+                    ff = math.nan
+                    m_end = math.nan
+                feasible[i] = not bad
+                fuelflow[i] = ff
+                m = m_end
+                continue
+            if kind[i] == _TAKEOFF:
+                ff, ok = ff_fixed[i], True
+            else:
+                ff, dff, ok = _point(
+                    m, qS[i], lift[i], weight[i], wave0[i], idle[i], tmax[i],
+                    ff_alt[i], cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1,
+                )
+                if fillna and not ok:
+                    ff = math.nan
+            feasible[i] = ok
+            fuelflow[i] = ff
+            m = m - ff * dt[i]
+        final[f] = m
+
+
+def _backward(
+    mass1, offsets, dt, qS, lift, weight, wave0, idle, tmax, ff_alt, kind,
+    ff_fixed, cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1, fillna,
+    mass, fuelflow, feasible, initial,
+):
+    """Mass recurrence of each flight, backwards from its final mass.
+
+    The mass at each point solves m - fuelflow(m) * dt = mass at the next
+    point (Newton iterations), the inverse of the forward recurrence.
+    """
+    for f in range(len(mass1)):
+        m_next = mass1[f]
+        for i in range(offsets[f + 1] - 1, offsets[f] - 1, -1):
+            if kind[i] == _CRUISE:
+                m, ff, bad = _cruise(
+                    m_next, qS[i], lift[i], weight[i], tmax[i], ff_alt[i], cd0, k,
+                    n_eng, maxthr, c3, c2, c1, dt[i], -1.0,
+                )
+                ok = not bad
+                if fillna and bad:
+                    ff = math.nan
+                    m = math.nan
+            elif kind[i] == _TAKEOFF:
+                ff, ok = ff_fixed[i], True
+                m = m_next + ff * dt[i]
+            else:
+                m = m_next
+                for _ in range(_NEWTON_ITERATIONS):
+                    ff, dff, ok = _point(
+                        m, qS[i], lift[i], weight[i], wave0[i], idle[i], tmax[i],
+                        ff_alt[i], cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1,
+                    )
+                    step = (m - ff * dt[i] - m_next) / (1 - dff * dt[i])
+                    m = m - step
+                    if abs(step) <= 1e-12 * abs(m):
+                        break
+                ff, dff, ok = _point(
+                    m, qS[i], lift[i], weight[i], wave0[i], idle[i], tmax[i],
+                    ff_alt[i], cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1,
+                )
+                if fillna and not ok:
+                    ff = math.nan
+                    m = math.nan
+            mass[i] = m
+            feasible[i] = ok
+            fuelflow[i] = ff
+            m_next = m
+        initial[f] = m_next
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled():
+    """Forward and backward recurrences compiled with numba, or None."""
+    try:
+        numba = importlib.import_module("numba")
+    except ImportError:
+        return None
+
+    # the compiled recurrences call the compiled point functions
+    scope = dict(
+        globals(),
+        _point=numba.njit(cache=True)(_point),
+        _cruise=numba.njit(cache=True)(_cruise),
+    )
+    return [
+        numba.njit(cache=True)(
+            types.FunctionType(func.__code__, scope, func.__name__)
+        )
+        for func in (_forward, _backward)
+    ]
+
+
+def _points(
+    m, qS, lift, weight, wave0, idle, tmax, ff_alt,
+    cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1,
+):
+    """Vectorized ``_point``, for arrays of points."""
+    cl = m * lift
+    dmach = np.maximum(wave0 + wave_cl * cl, 0)
+    D = (cd0 + 20 * dmach ** 4 + k * cl * cl) * qS
+    dD = (80 * dmach ** 3 * wave_cl + 2 * k * cl) * lift * qS
+    T = D + m * weight
+    dT = dD + weight
+    negative = T < 0
+    T = np.where(negative, idle, T)
+    dT = np.where(negative, 0.0, dT)
+
+    r = T / maxthr
+    ff = (c3 * r ** 3 + c2 * r ** 2 + c1 * r) * n_eng + ff_alt * T
+    dff = ((3 * c3 * r ** 2 + 2 * c2 * r + c1) * n_eng / maxthr + ff_alt) * dT
+    return ff, dff, ~(T > 1.20 * tmax)
+
+
+def _lockstep(mass0, offsets, args, consts, fillna, backward):
+    """Mass recurrence of all flights together, one point index at a time.
+
+    Each step evaluates the points of the same index of all the flights
+    long enough, with array operations. Same results as ``_forward`` and
+    ``_backward``.
+    """
+    dt, qS, lift, weight, wave0, idle, tmax, ff_alt, kind, ff_fixed = args
+    cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1 = consts
+    n = dt.size
+    mass, fuelflow, feasible = np.empty(n), np.empty(n), np.empty(n, dtype=bool)
+
+    # flights by decreasing length: the flights of a step are the first ones
+    length = np.diff(offsets)
+    order = np.argsort(-length, kind="stable")
+    start, length = offsets[:-1][order], length[order]
+    m = np.array(mass0, dtype=float)[order]
+
+    steps = range(length.max() - 1, -1, -1) if backward else range(length.max())
+    for j in steps:
+        active = np.searchsorted(-length, -j, side="left")
+        i = start[:active] + j
+        m_next = m[:active]
+        coef = [a[i] for a in (qS, lift, weight, wave0, idle, tmax, ff_alt)]
+
+        if backward:
+            mi = m_next
+            for _ in range(_NEWTON_ITERATIONS):
+                ff, dff, ok = _points(mi, *coef, *consts)
+                step = (mi - ff * dt[i] - m_next) / (1 - dff * dt[i])
+                mi = mi - step
+                if not (np.abs(step) > 1e-12 * np.abs(mi)).any():
+                    break
+        else:
+            mi = m_next
+
+        ff, dff, ok = _points(mi, *coef, *consts)
+
+        # level cruise runs, in closed form
+        runs = np.flatnonzero(kind[i] == _CRUISE)
+        if runs.size:
+            ir = i[runs]
+            m_run, ff[runs], bad = _cruise(
+                m_next[runs], qS[ir], lift[ir], weight[ir], tmax[ir], ff_alt[ir],
+                cd0, k, n_eng, maxthr, c3, c2, c1, dt[ir], -1.0 if backward else 1.0,
+            )
+            ok[runs] = ~bad
+            if backward:
+                mi[runs] = m_run
+
+        if fillna:
+            ff = np.where(ok, ff, np.nan)
+            if backward:
+                mi = np.where(ok, mi, np.nan)
+
+        takeoff = kind[i] == _TAKEOFF
+        ff = np.where(takeoff, ff_fixed[i], ff)
+        ok = ok | takeoff
+        if backward:
+            mi = np.where(takeoff, m_next + ff_fixed[i] * dt[i], mi)
+
+        # before the update of m, of which mi is a view forwards
+        mass[i], fuelflow[i], feasible[i] = mi, ff, ok
+
+        if backward:
+            m[:active] = mi
+        else:
+            m_end = mi - ff * dt[i]
+            if runs.size:
+                m_end[runs] = np.where(ok[runs] | (not fillna), m_run, np.nan)
+            m[:active] = m_end
+
+    end = np.empty_like(m)
+    end[order] = m
+    return mass, fuelflow, feasible, end
+
+
+def _per_flight(ufunc, values, offsets, empty):
+    """Reduction of the values of each flight (CSR layout)."""
+    values = np.append(values, empty)
+    reduced = ufunc.reduceat(values, offsets[:-1])
+    return np.where(offsets[1:] > offsets[:-1], reduced, empty)
+
+
+class Mission(object):
+    """Fuel burn and emissions of a flight, from its trajectory."""
+
+    def __init__(
+        self, ac, eng=None, fuelflow=None, emission=None, atmosphere=None, **kwargs
+    ):
+        """Initialize Mission object.
+
+        Args:
+            ac (string): ICAO aircraft type (for example: A320).
+            eng (string): Engine type (for example: CFM56-5A3).
+                Leave empty to use the default engine specified
+                by in the aircraft database.
+            fuelflow (FuelFlow): Existing fuel flow model to share. Optional.
+            emission (Emission): Existing emission model to share. Optional.
+            atmosphere (TrajectoryAtmosphere): Non-standard atmosphere at
+                the points of the trajectory (see ``openap.weather``), used
+                by the new models. Defaults to the ISA.
+
+        """
+        if not hasattr(self, "FuelFlow"):
+            self.FuelFlow = importlib.import_module("openap.fuel").FuelFlow
+
+        if not hasattr(self, "Emission"):
+            self.Emission = importlib.import_module("openap.emission").Emission
+
+        if fuelflow is None:
+            fuelflow = self.FuelFlow(ac, eng, atmosphere=atmosphere, **kwargs)
+        if emission is None:
+            emission = self.Emission(ac, eng, atmosphere=atmosphere, **kwargs)
+
+        self.fuelflow = fuelflow
+        self.emission = emission
+
+    def _coefficients(self, tas, alt, path_angle):
+        """Mass independent terms of the required thrust and the fuel flow."""
+        ff = self.fuelflow
+        drag, thrust, aero = ff.drag, ff.thrust, ff.aero
+
+        p, rho, T_air = aero.atmos(alt * aero.ft)
+
+        # lift coefficient and weight component of the thrust, per kg
+        cl, qS = drag._cl_qs(1.0, tas, rho, path_angle)
+        weight = 9.80665 * np.sin(path_angle * np.pi / 180)
+
+        # Mach number above the critical Mach number, linear in the lift
+        # coefficient, see Drag._wave_dmach
+        if drag.wave_drag:
+            mach = tas * aero.kts / np.sqrt(aero.gamma * aero.R * T_air)
+            mach_crit, cos_sweep = drag._mach_crit(0.0)
+            wave0 = mach - mach_crit
+            wave_cl = 0.1 / cos_sweep ** 3
+        else:
+            wave0 = np.full_like(qS, -np.inf)
+            wave_cl = 0.0
+
+        # maximum climb thrust, the idle thrust is 7% of it
+        tas_thr = np.where(tas < 10, 10, tas)
+        mach, vcas = thrust._mach_cas(tas_thr, p, rho, T_air)
+        tmax = thrust._climb(mach, vcas, p, alt, 0)
+
+        # altitude correction of the fuel flow, per N of thrust
+        ff_alt = ff.const.fuel_ch * alt * 0.3048 / 1000
+
+        return cl, qS, weight, wave0, wave_cl, 0.07 * tmax, tmax, ff_alt
+
+    def integrate(
+        self, mass, dt, tas, alt, path_angle=0, takeoff=None, fillna=True,
+        emissions=True, backward=False, offsets=None, breguet=None,
+    ):
+        """Integrate the mass and the emissions along a trajectory.
+
+        The fuel flow of each point is the en-route fuel flow at the mass of
+        the aircraft at the point (see ``FuelFlow.enroute``), burnt during the
+        time step of the point, or the takeoff fuel flow at the points flown
+        at takeoff thrust.
+
+        A batch of flights is given as 2-d arrays, one row per flight, or as
+        the concatenated arrays of the flights and their offsets, with the
+        masses of the flights. The points of the same index of all the
+        flights are evaluated together when the mass recurrence is not
+        compiled, see ``lockstep_threshold``.
+
+        Args:
+            mass (float or ndarray): Initial mass of the aircraft, or final
+                mass when backward is True (unit: kg).
+            dt (ndarray): Time step of each point (unit: s).
+            tas (float or ndarray): True airspeed (unit: kt).
+            alt (float or ndarray): Altitude (unit: ft).
+            path_angle (float or ndarray): Flight path angle (unit: degrees).
+            takeoff (ndarray): Points flown at takeoff thrust (bool).
+                Defaults to none.
+            fillna (bool): Set the fuel flow to NaN when the required thrust
+                exceeds the maximum thrust by more than 20%, and the mass of
+                the following points (or previous points, backwards).
+                Defaults to True.
+            emissions (bool): Compute the emissions. Defaults to True.
+            backward (bool): Integrate backwards, from the final mass (for
+                example, the landing mass). The mass at each point is the
+                mass from which the forward integration reaches the mass of
+                the next point. Defaults to False.
+            offsets (ndarray): Index of the first point of each flight in the
+                concatenated arrays, and the number of points at the end
+                (CSR layout). Defaults to none.
+            breguet (float): Relative tolerance of the level cruise runs
+                integrated in closed form: consecutive points where the sine
+                of the path angle is at most breguet in absolute value, and
+                the dynamic pressure and the altitude are in the same bins of
+                relative width breguet, without wave drag.
+                Defaults to none, all points are integrated one by one.
+
+        Returns:
+            dict: Results, in the layout of the inputs, with the following
+            keys:
+
+            - mass: mass at each point (kg)
+            - fuelflow: fuel flow at each point (kg/s)
+            - fuel: fuel burnt at each point (kg)
+            - feasible: required thrust within the performance boundary
+            - initial_mass: mass at the start of the trajectory (kg)
+            - final_mass: mass at the end of the trajectory (kg)
+            - co2, h2o, nox, co, hc, sox, soot: emissions at each point (g),
+              when emissions is True.
+            - totals: fuel and emissions of each flight, by key
+            - breguet: report of the level cruise runs, when breguet is
+              given: number of runs, of points in the runs, and of steps of
+              the recurrence (the runs and the other points), and maximum
+              relative variation of the specific fuel consumption over a run
+              (taken constant, at the middle of the run)
+
+        """
+        points = self._prepare(dt, tas, alt, path_angle, takeoff, offsets, breguet)
+        run = self._run(points, mass, fillna, backward)
+        return self._result(points, run, emissions)
+
+    def trip_fuel(
+        self,
+        payload,
+        dt,
+        tas,
+        alt,
+        path_angle=0,
+        takeoff=None,
+        reserve=0,
+        contingency=0,
+        oew=None,
+        mtow=None,
+        mlw=None,
+        max_fuel=None,
+        tol=0.01,
+        max_iter=20,
+        emissions=True,
+        backward=True,
+        offsets=None,
+        breguet=None,
+    ):
+        """Compute the minimum trip fuel of a trajectory.
+
+        The takeoff mass is the operating empty mass, the payload, the
+        reserve fuel, the trip fuel, and the contingency fuel (a fraction of
+        the trip fuel); the trip fuel is the fuel burnt along the trajectory
+        from the takeoff mass. The infeasible points (see ``integrate``) are
+        integrated at their required thrust.
+
+        Integrated backwards from the landing mass, the trip fuel is found in
+        a single integration without contingency fuel. Otherwise, the trip
+        fuel is found by secant iterations. A batch of flights is given as
+        for ``integrate``, with the payloads (and reserves) of the flights.
+
+        Args:
+            payload (float or ndarray): Payload mass (unit: kg).
+            dt (ndarray): Time step of each point (unit: s).
+            tas (float or ndarray): True airspeed (unit: kt).
+            alt (float or ndarray): Altitude (unit: ft).
+            path_angle (float or ndarray): Flight path angle (unit: degrees).
+            takeoff (ndarray): Points flown at takeoff thrust (bool).
+                Defaults to none.
+            reserve (float or ndarray): Reserve fuel, not burnt (unit: kg).
+                Defaults to 0.
+            contingency (float): Contingency fuel, as a fraction of the trip
+                fuel, not burnt. Defaults to 0.
+            oew (float): Operating empty mass (unit: kg). Defaults to the OEW
+                of the aircraft.
+            mtow (float): Maximum takeoff mass (unit: kg). Defaults to the
+                MTOW of the aircraft.
+            mlw (float): Maximum landing mass (unit: kg). Defaults to the MLW
+                of the aircraft.
+            max_fuel (float): Fuel capacity (unit: kg). Defaults to the fuel
+                capacity of the aircraft, at ``FUEL_DENSITY``.
+            tol (float): Tolerance on the trip fuel (unit: kg). Defaults to
+                0.01.
+            max_iter (int): Maximum number of integrations. Defaults to 20.
+            emissions (bool): Compute the emissions. Defaults to True.
+            backward (bool): Integrate backwards from the landing mass, or
+                forwards from the takeoff mass. Defaults to True.
+            offsets (ndarray): Offsets of the flights of a batch, see
+                ``integrate``. Defaults to none.
+            breguet (float): Tolerance of the level cruise runs integrated in
+                closed form, see ``integrate``. Defaults to none.
+
+        Returns:
+            dict: Results of the integration (see ``integrate``), with the
+            following keys, per flight for a batch:
+
+            - status: status code, ``SUCCESS`` when the trip fuel is found
+              and within the limits of the aircraft
+            - message: description of the status
+            - trip_fuel: trip fuel (kg)
+            - takeoff_mass: takeoff mass (kg)
+            - landing_mass: landing mass (kg)
+            - iterations: number of integrations
+
+        """
+        limits = self.fuelflow.aircraft["limits"]
+        oew = limits["OEW"] if oew is None else oew
+        mtow = limits["MTOW"] if mtow is None else mtow
+        mlw = limits["MLW"] if mlw is None else mlw
+        if max_fuel is None:
+            max_fuel = limits["MFC"] * FUEL_DENSITY
+
+        points = self._prepare(dt, tas, alt, path_angle, takeoff, offsets, breguet)
+        n_flights = len(points.offsets) - 1
+        base = np.broadcast_to(oew + np.asarray(payload) + reserve, (n_flights,))
+
+        def burn(trip):
+            """Run, takeoff and landing masses, and fuel burn for a trip fuel."""
+            if backward:
+                landing = base + contingency * trip
+                run = self._run(points, landing, False, True)
+                takeoff = run[3]
+            else:
+                takeoff = base + (1 + contingency) * trip
+                run = self._run(points, takeoff, False, False)
+                landing = run[4]
+            return run, takeoff, landing, takeoff - landing
+
+        # secant iterations on the excess of fuel burn, from no trip fuel,
+        # for the flights not converged yet
+        trip = np.zeros(n_flights)
+        run, takeoff_mass, landing_mass, burnt = burn(trip)
+        iterations = 1
+        done = np.zeros(n_flights, dtype=bool)
+        converged = np.zeros(n_flights, dtype=bool)
+        if backward and not contingency:
+            converged[:] = done[:] = True
+            trip = burnt
+
+        trip0, excess0 = trip, burnt - trip
+        trip = np.where(done, trip, burnt)
+        while not done.all() and iterations < max_iter:
+            run, takeoff_mass, landing_mass, burnt = burn(trip)
+            iterations += 1
+            excess = burnt - trip
+
+            converged |= ~done & (np.abs(excess) < tol)
+            done |= converged | ~np.isfinite(excess) | (excess == excess0)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                secant = trip - excess * (trip - trip0) / (excess - excess0)
+            trip0, excess0 = trip, excess
+            trip = np.where(done, trip, secant)
+
+        feasible = _per_flight(np.logical_and, run[2], points.offsets, True)
+        fuel = takeoff_mass - oew - np.asarray(payload)
+        status = np.select(
+            [
+                ~converged,
+                ~feasible,
+                takeoff_mass > mtow,
+                fuel > max_fuel,
+                landing_mass > mlw,
+            ],
+            [
+                NOT_CONVERGED,
+                INFEASIBLE,
+                MTOW_EXCEEDED,
+                CAPACITY_EXCEEDED,
+                MLW_EXCEEDED,
+            ],
+            SUCCESS,
+        )
+
+        result = self._result(points, run, emissions)
+        if points.single:
+            status = int(status[0])
+            message = STATUS_MESSAGES[status]
+        else:
+            message = [STATUS_MESSAGES[s] for s in status]
+
+        result.update(
+            status=status,
+            message=message,
+            trip_fuel=result["initial_mass"] - result["final_mass"],
+            takeoff_mass=result["initial_mass"],
+            landing_mass=result["final_mass"],
+            iterations=iterations,
+        )
+        return result
+
+    def _prepare(self, dt, tas, alt, path_angle, takeoff, offsets=None, breguet=None):
+        """Mass independent inputs of the mass recurrence."""
+        shape = np.broadcast_shapes(*[np.shape(a) for a in (dt, tas, alt, path_angle)])
+        if len(shape) not in (1, 2) or (offsets is not None and len(shape) != 1):
+            raise RuntimeError(
+                "Trajectories are 1-d arrays, 2-d for batches, or 1-d with offsets."
+            )
+        n = int(np.prod(shape))
+
+        single = offsets is None and len(shape) == 1
+        if offsets is None:
+            n_flights = shape[0] if len(shape) == 2 else 1
+            offsets = np.arange(n_flights + 1) * shape[-1]
+        else:
+            offsets = np.asarray(offsets, dtype=np.int64)
+            if (
+                offsets.ndim != 1
+                or offsets.size < 2
+                or offsets[0] != 0
+                or offsets[-1] != n
+                or (np.diff(offsets) < 0).any()
+            ):
+                raise RuntimeError(
+                    "Offsets start at 0, are increasing, and end at the number "
+                    "of points."
+                )
+
+        dt, tas, alt, path_angle = [
+            np.broadcast_to(np.asarray(a, dtype=float), shape).reshape(-1)
+            for a in (dt, tas, alt, path_angle)
+        ]
+
+        if takeoff is None:
+            fixed = np.zeros(n, dtype=bool)
+        else:
+            fixed = np.broadcast_to(np.asarray(takeoff, dtype=bool), shape).reshape(-1)
+        ff_fixed = np.zeros(n)
+        if fixed.any():
+            ff_fixed[fixed] = self.fuelflow.takeoff(tas[fixed], alt[fixed])
+        kind = np.where(fixed, _TAKEOFF, _POINT)
+
+        lift, qS, weight, wave0, wave_cl, idle, tmax, ff_alt = self._coefficients(
+            tas, alt, path_angle
+        )
+
+        drag, c = self.fuelflow.drag.const, self.fuelflow.const
+        args = [dt, qS, lift, weight, wave0, idle, tmax, ff_alt, kind, ff_fixed]
+        consts = [
+            drag.cd0, drag.k, wave_cl, c.n_eng, c.maxthr, c.fuel_c3, c.fuel_c2,
+            c.fuel_c1,
+        ]
+        consts = [float(v) for v in consts]
+
+        args = [np.ascontiguousarray(np.broadcast_to(a, (n,))) for a in args]
+        cruise = None
+        if breguet is not None:
+            cruise = self._cruise_runs(args, offsets, breguet)
+            args = cruise.coefs
+
+        n_flights = len(offsets) - 1
+        if use_numba and _compiled() is not None:
+            mode = "compiled"
+        elif n_flights >= lockstep_threshold:
+            mode = "lockstep"
+        else:
+            # python floats are faster to index than numpy arrays
+            mode = "python"
+            args = [a.tolist() for a in args]
+
+        return _Points(
+            dt, tas, alt, shape, offsets, single, mode, args, consts, cruise
+        )
+
+    def _cruise_runs(self, args, offsets, tol):
+        """Level cruise runs of the points, and the steps of the recurrence.
+
+        Consecutive points of a flight are in the same run when the sine of
+        their path angle is below tol, and their dynamic pressure and
+        altitude are in the same bins of relative width tol, away from the
+        wave drag. Each run is a single step of the recurrence, with the mean
+        coefficients of its points (weighted by their time steps), their
+        minimum maximum thrust, and their total time step.
+        """
+        dt, qS, lift, weight, wave0, idle, tmax, ff_alt, kind, ff_fixed = args
+        drag = self.fuelflow.drag
+        n = dt.size
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            level = (
+                (kind == _POINT)
+                & (np.abs(weight) <= tol * 9.80665)
+                & (qS > 0)
+                & (ff_alt > 0)
+                & (weight ** 2 < drag.const.cd0 * drag.const.k * (lift * qS) ** 2)
+                & (not drag.wave_drag)
+            )
+            bins_q = np.floor(np.log(qS) / tol)
+            bins_h = np.floor(np.log(ff_alt) / tol)
+
+        start = np.ones(n, dtype=bool)
+        start[1:] = ~(
+            level[1:]
+            & level[:-1]
+            & (bins_q[1:] == bins_q[:-1])
+            & (bins_h[1:] == bins_h[:-1])
+        )
+        start[offsets[:-1][offsets[:-1] < n]] = True
+        first = np.flatnonzero(start)
+        step = np.cumsum(start) - 1
+        run = np.diff(np.append(first, n)) > 1
+
+        coefs = [a[first] for a in args]
+        if run.any():
+            duration = np.add.reduceat(dt, first)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                w = np.where(duration[step] > 0, dt / duration[step], 1.0)
+                w = w / np.add.reduceat(w, first)[step]
+
+            def mean(x):
+                return np.add.reduceat(x * w, first)[run]
+
+            # coefficients of the steps, updated in place
+            dt_s, qS_s, lift_s, weight_s, _, _, tmax_s, ff_alt_s, kind_s, _ = coefs
+            dt_s[run] = duration[run]
+            qS_s[run] = mean(qS)
+            lift_s[run] = np.sqrt(mean(lift * lift * qS) / qS_s[run])
+            weight_s[run] = mean(weight)
+            tmax_s[run] = np.minimum.reduceat(tmax, first)[run]
+            ff_alt_s[run] = mean(ff_alt)
+            kind_s[run] = _CRUISE
+
+        cumulative = np.cumsum(dt) - dt
+        elapsed = cumulative - cumulative[first][step]
+        return _Runs(
+            step, elapsed, run[step], np.searchsorted(first, offsets), coefs
+        )
+
+    def _run(self, points, mass, fillna, backward=False):
+        """Mass recurrence from the initial (or final) masses of the flights.
+
+        Returns the mass, fuel flow and feasibility of the points, the initial
+        and final masses of the flights, and the report of the level cruise
+        runs (None without runs).
+        """
+        offsets = points.offsets if points.cruise is None else points.cruise.offsets
+        n, n_flights = len(points.args[0]), len(offsets) - 1
+        mass = np.broadcast_to(np.asarray(mass, dtype=float), (n_flights,))
+
+        if points.mode == "compiled":
+            out = [np.empty(n), np.empty(n), np.empty(n, dtype=bool)]
+            end = np.empty(n_flights)
+            sweep = _compiled()[backward]
+            sweep(np.ascontiguousarray(mass), offsets, *points.args,
+                  *points.consts, fillna, *out, end)
+        elif points.mode == "lockstep":
+            *out, end = _lockstep(
+                mass, offsets, points.args, points.consts, fillna, backward
+            )
+        else:
+            out = [[0.0] * n, [0.0] * n, [False] * n]
+            end = [0.0] * n_flights
+            sweep = _backward if backward else _forward
+            sweep(mass.tolist(), offsets.tolist(), *points.args,
+                  *points.consts, fillna, *out, end)
+
+        out = [np.asarray(a) for a in out]
+        report = None
+        if points.cruise is not None:
+            out, report = self._expand(points, *out)
+        end = np.asarray(end, dtype=float)
+        if backward:
+            return (*out, end, mass, report)
+        return (*out, mass, end, report)
+
+    def _expand(self, points, mass, fuelflow, feasible):
+        """Mass, fuel flow and feasibility of the points from the steps of the
+        recurrence, and the report of the level cruise runs.
+
+        The mass of the points of a run is its closed form at their time in
+        the run, and their fuel flow is the mass burnt over their time step.
+        """
+        runs = points.cruise
+        dt, qS, lift, weight, wave0, idle, tmax, ff_alt, kind, ff_fixed = runs.coefs
+        cd0, k, wave_cl, n_eng, maxthr, c3, c2, c1 = points.consts
+
+        # closed form of the runs, see _cruise
+        b = k * lift * lift * qS
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shift = weight / (2 * b)
+            a = cd0 * qS - weight * shift / 2
+            s = np.sqrt(a / b)
+            phase = np.arctan((mass + shift) / s)
+            rate = np.sqrt(a * b) * fuelflow
+
+        def closed_form(i, t):
+            return s[i] * np.tan(phase[i] - rate[i] * t) - shift[i]
+
+        def thrust(i, m):
+            return a[i] + b[i] * (m + shift[i]) ** 2
+
+        def sfc(i, m):
+            r = thrust(i, m) / maxthr
+            return (c3 * r * r + c2 * r + c1) * n_eng / maxthr + ff_alt[i]
+
+        step = runs.step
+        out = mass[step], fuelflow[step], feasible[step]
+
+        i, t = step[runs.points], runs.elapsed[runs.points]
+        dt_run = points.dt[runs.points]
+        m0 = np.where(t > 0, closed_form(i, t), mass[i])
+        burnt = m0 - closed_form(i, t + dt_run)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ff = np.where(dt_run > 0, burnt / dt_run, sfc(i, m0) * thrust(i, m0))
+        ff[np.isnan(fuelflow[i])] = np.nan
+        out[0][runs.points] = m0
+        out[1][runs.points] = ff
+
+        # variation of the specific fuel consumption over the runs, taken
+        # constant in the closed form
+        r = np.flatnonzero(kind == _CRUISE)
+        with np.errstate(invalid="ignore"):
+            variation = np.abs(sfc(r, closed_form(r, dt[r])) / sfc(r, mass[r]) - 1)
+        report = {
+            "runs": r.size,
+            "points": int(runs.points.sum()),
+            "steps": kind.size,
+            "sfc_variation": float(np.nanmax(variation, initial=0.0)),
+        }
+        return out, report
+
+    def _result(self, points, run, emissions):
+        mass, fuelflow, feasible, initial, final, report = run
+
+        if diagnostics.active():
+            diagnostics.record("thrust_exceeded", ~feasible, "Mission")
+            diagnostics.record("nan_fuel", fuelflow != fuelflow, "Mission")
+
+        fuel = fuelflow * points.dt
+        result = {
+            "mass": mass,
+            "fuelflow": fuelflow,
+            "fuel": fuel,
+            "feasible": feasible,
+        }
+
+        if emissions:
+            rates = self.emission.all(fuelflow, points.tas, points.alt)
+            result.update({k: v * points.dt for k, v in rates.items()})
+
+        totals = {
+            k: _per_flight(np.add, result[k], points.offsets, 0.0)
+            for k in result
+            if k not in ("mass", "fuelflow", "feasible")
+        }
+        result = {k: v.reshape(points.shape) for k, v in result.items()}
+        result.update(initial_mass=initial, final_mass=final, totals=totals)
+        if report is not None:
+            result["breguet"] = report
+
+        if points.single:
+            result["initial_mass"] = float(initial[0])
+            result["final_mass"] = float(final[0])
+            result["totals"] = {k: float(v[0]) for k, v in totals.items()}
+
+        return result
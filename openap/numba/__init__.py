@@ -0,0 +1,435 @@
+"""Numba backend of the OpenAP models.
+
+The models in this module have the same API as the numpy models, but are
+evaluated by compiled kernels (``openap.numba.kernels``). The kernels are
+cached on disk, so the compilation cost is only paid at the first use.
+Inputs with at least ``parallel_threshold`` points are evaluated in parallel
+on all cores (see ``numba.set_num_threads``).
+
+``FuelFlowTable`` and ``EmissionTable`` evaluate the tables of
+``openap.table`` with compiled interpolation kernels.
+
+Requires the optional dependency numba.
+
+Examples::
+
+    from openap.numba import FuelFlow
+
+    fuelflow = FuelFlow("A320")
+    fuelflow.enroute(mass=masses, tas=speeds, alt=altitudes)
+
+"""
+
+import math
+import functools
+import numpy as np
+from .. import drag, thrust, fuel, emission, table
+from . import kernels
+
+# minimum number of points evaluated in parallel
+parallel_threshold = 20000
+
+
+@functools.lru_cache(maxsize=1024)
+def _float_record(const):
+    return type(const)(*[float(v) for v in const])
+
+
+def _as_float(const):
+    """Constants record with float fields only.
+
+    Records of different aircraft may mix int and float values. Each mix is
+    a different numba type, and mixing types of the same record class in one
+    process leads to wrong dispatching.
+    """
+    if isinstance(const, tuple) and hasattr(const, "_fields"):
+        return _float_record(const)
+    return const
+
+
+def _evaluate(kernel, loops, consts, args):
+    """Evaluate a point kernel on scalars, or its loop kernel on arrays."""
+    consts = [_as_float(c) for c in consts]
+
+    if all(isinstance(a, (int, float)) for a in args):
+        return np.float64(kernel(*consts, *[float(a) for a in args]))
+
+    arrays = [np.asarray(a, dtype=np.float64) for a in args]
+    shape = np.broadcast_shapes(*[a.shape for a in arrays])
+    flat = [
+        np.ascontiguousarray(a).reshape(-1)
+        if a.shape == shape
+        else np.broadcast_to(a, shape).reshape(-1)
+        for a in arrays
+    ]
+    out = np.empty(flat[0].size)
+
+    serial, parallel = loops
+    run = parallel if out.size >= parallel_threshold else serial
+    run(*consts, *flat, out)
+    return out.reshape(shape)
+
+
+class Thrust(thrust.Thrust):
+    def takeoff(self, tas, alt=None):
+        """Calculate thrust at takeoff condition.
+
+        Args:
+            tas (float or ndarray): True airspeed (kt).
+            alt (float or ndarray): Altitude of the runway (ft). Defaults to 0.
+
+        Returns:
+            float or ndarray: Total thrust (unit: N).
+
+        """
+        sea_level = alt is None
+        alt = 0 if sea_level else alt
+        return _evaluate(
+            kernels.takeoff,
+            kernels.takeoff_loops,
+            (self.const, sea_level),
+            (tas, alt),
+        )
+
+    def cruise(self, tas, alt):
+        """Calculate thrust at the cruise.
+
+        Args:
+            tas (float or ndarray): True airspeed (kt).
+            alt (float or ndarray): Altitude (ft).
+
+        Returns:
+            float or ndarray: Total thrust (unit: N).
+
+        """
+        return self.climb(tas, alt, roc=0)
+
+    def climb(self, tas, alt, roc):
+        """Calculate thrust during the climb.
+
+        Args:
+            tas (float or ndarray): True airspeed (kt).
+            alt (float or ndarray): Altitude(ft)
+            roc (float or ndarray): Vertical rate (ft/min).
+
+        Returns:
+            float or ndarray: Total thrust (unit: N).
+
+        """
+        return _evaluate(
+            kernels.climb, kernels.climb_loops, (self.const,), (tas, alt, roc)
+        )
+
+
+class Drag(drag.Drag):
+    def _wave(self):
+        """Wave drag settings of the kernels: (enabled, cos(sweep), t/c)."""
+        tc = self.aircraft["wing"]["t/c"]
+        if tc is None:
+            tc = 0.11
+        cos_sweep = math.cos(math.radians(self.aircraft["wing"]["sweep"]))
+        return (1.0 if self.wave_drag else 0.0, cos_sweep, float(tc))
+
+    def clean(self, mass, tas, alt, path_angle=0):
+        """Compute drag at clean configuration (considering compressibility).
+
+        Args:
+            mass (int or ndarray): Mass of the aircraft (unit: kg).
+            tas (int or ndarray): True airspeed (unit: kt).
+            alt (int or ndarray): Altitude (unit: ft).
+            path_angle (float or ndarray): Path angle (unit: degree). Defaults to 0.
+
+        Returns:
+            int: Total drag (unit: N).
+
+        """
+        return _evaluate(
+            kernels.clean,
+            kernels.clean_loops,
+            (self.const, self._wave()),
+            (mass, tas, alt, path_angle),
+        )
+
+    def nonclean(self, mass, tas, alt, flap_angle, path_angle=0, landing_gear=False):
+        """Compute drag at at non-clean configuration.
+
+        Args:
+            mass (int or ndarray): Mass of the aircraft (unit: kg).
+            tas (int or ndarray): True airspeed (unit: kt).
+            alt (int or ndarray): Altitude (unit: ft).
+            flap_angle (int or ndarray): flap deflection angle (unit: degree).
+            path_angle (float or ndarray): Path angle (unit: degree). Defaults to 0.
+            landing_gear (bool): Is landing gear extended? Defaults to False.
+
+        Returns:
+            int or ndarray: Total drag (unit: N).
+
+        """
+        return _evaluate(
+            kernels.drag_nonclean,
+            kernels.nonclean_loops,
+            (self.const, bool(landing_gear)),
+            (mass, tas, alt, flap_angle, path_angle),
+        )
+
+
+class FuelFlow(fuel.FuelFlow):
+    def __init__(self, ac, eng=None, **kwargs):
+        self.Drag = Drag
+        self.Thrust = Thrust
+        super(FuelFlow, self).__init__(ac=ac, eng=eng, **kwargs)
+
+    def at_thrust(self, acthr, alt=0):
+        """Compute the fuel flow at a given total thrust.
+
+        Args:
+            acthr (int or ndarray): The total net thrust of the aircraft (unit: N).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: Fuel flow (unit: kg/s).
+
+        """
+        return _evaluate(
+            kernels.at_thrust, kernels.at_thrust_loops, (self.const,), (acthr, alt)
+        )
+
+    def takeoff(self, tas, alt=None, throttle=1):
+        """Compute the fuel flow at takeoff.
+
+        Args:
+            tas (int or ndarray): Aircraft true airspeed (unit: kt).
+            alt (int or ndarray): Altitude of airport (unit: ft). Defaults to sea-level.
+            throttle (float or ndarray): The throttle setting, between 0 and 1.
+                Defaults to 1, which is at full thrust.
+
+        Returns:
+            float: Fuel flow (unit: kg/s).
+
+        """
+        sea_level = alt is None
+        alt = 0 if sea_level else alt
+        return _evaluate(
+            kernels.fuel_takeoff,
+            kernels.fuel_takeoff_loops,
+            (self.const, self.thrust.const, sea_level),
+            (tas, alt, throttle),
+        )
+
+    def enroute(self, mass, tas, alt, path_angle=0, fillna=True, intermediates=False):
+        """Compute the fuel flow during climb, cruise, or descent.
+
+        Args:
+            mass (int or ndarray): Aircraft mass (unit: kg).
+            tas (int or ndarray): Aircraft true airspeed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+            path_angle (float or ndarray): Flight path angle (unit: degrees).
+            fillna (bool): Set fuel flow to NaN when the required thrust exceeds
+                the maximum thrust by more than 20%. Defaults to True.
+            intermediates (bool): Return all intermediate results, evaluated
+                by the numpy model. Defaults to False.
+
+        Returns:
+            float or dict: Fuel flow (unit: kg/s).
+
+        """
+        if intermediates:
+            return super(FuelFlow, self).enroute(
+                mass, tas, alt, path_angle, fillna, intermediates
+            )
+
+        consts = (
+            self.const,
+            self.thrust.const,
+            self.drag.const,
+            Drag._wave(self.drag),
+            bool(fillna),
+        )
+        return _evaluate(
+            kernels.enroute, kernels.enroute_loops, consts, (mass, tas, alt, path_angle)
+        )
+
+
+class Emission(emission.Emission):
+    def __init__(self, ac, eng=None, **kwargs):
+        super(Emission, self).__init__(ac=ac, eng=eng, **kwargs)
+
+        self.ff_modes = np.array(self.ff_modes, dtype=float)
+        self.ei = {s: np.array(ei, dtype=float) for s, ei in self.ei.items()}
+
+    def _consts(self, species):
+        return (float(self.n_eng), self.ff_modes, self.ei[species])
+
+    def nox(self, ffac, tas, alt=0):
+        """Compute NOx emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: NOx emission from all engines (unit: g/s).
+
+        """
+        return _evaluate(
+            kernels.nox, kernels.nox_loops, self._consts("nox"), (ffac, tas, alt)
+        )
+
+    def co(self, ffac, tas, alt=0):
+        """Compute CO emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: CO emission from all engines (unit: g/s).
+
+        """
+        return _evaluate(
+            kernels.co_hc, kernels.co_hc_loops, self._consts("co"), (ffac, tas, alt)
+        )
+
+    def hc(self, ffac, tas, alt=0):
+        """Compute HC emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: HC emission from all engines (unit: g/s).
+
+        """
+        return _evaluate(
+            kernels.co_hc, kernels.co_hc_loops, self._consts("hc"), (ffac, tas, alt)
+        )
+
+
+def _axes(axes):
+    """Uniform axes as (start, 1 / step, number of points), or None."""
+    if not all(ax.uniform for ax in axes):
+        return None
+    return tuple((ax.start, ax.scale, len(ax.points)) for ax in axes)
+
+
+class FuelFlowTable(table.FuelFlowTable):
+    def __init__(self, ac, eng=None, **kwargs):
+        super(FuelFlowTable, self).__init__(ac, eng, **kwargs)
+        self.kernel_axes = _axes(self.axes)
+
+    def enroute(self, mass, tas, alt, path_angle=0, fillna=True):
+        """Compute the fuel flow during climb, cruise, or descent.
+
+        Args:
+            mass (int or ndarray): Aircraft mass (unit: kg).
+            tas (int or ndarray): Aircraft true airspeed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+            path_angle (float or ndarray): Flight path angle (unit: degrees).
+            fillna (bool): Set fuel flow to NaN when the required thrust exceeds
+                the maximum thrust by more than 20%. Defaults to True.
+
+        Returns:
+            float or ndarray: Fuel flow (unit: kg/s).
+
+        """
+        if getattr(self, "kernel_axes", None) is None:
+            return super(FuelFlowTable, self).enroute(
+                mass, tas, alt, path_angle, fillna
+            )
+
+        consts = (
+            self.fuelflow.const,
+            self.kernel_axes,
+            self.drag.flat[0],
+            self.thrust_max.flat[0],
+            bool(fillna),
+        )
+        fuelflow = _evaluate(
+            kernels.table_enroute,
+            kernels.table_enroute_loops,
+            consts,
+            (mass, tas, alt, path_angle),
+        )
+        mass_level = np.multiply(mass, np.cos(np.radians(path_angle)))
+        return self._fallback(
+            fuelflow,
+            table._outside(self.axes, (mass_level, tas, alt)),
+            lambda *a: self.fuelflow.enroute(*a, fillna=fillna),
+            (mass, tas, alt, path_angle),
+        )
+
+
+class EmissionTable(table.EmissionTable):
+    def __init__(self, ac, eng=None, **kwargs):
+        super(EmissionTable, self).__init__(ac, eng, **kwargs)
+        self.kernel_axes = _axes(self.axes)
+        self.kernel_ff = np.array(self.ff_modes, dtype=float)
+        self.kernel_ei = {s: np.array(ei, dtype=float) for s, ei in self.ei.items()}
+
+    def _table_emission(self, species, channel, ffac, tas, alt):
+        consts = (
+            self.kernel_axes,
+            self.values.flat,
+            self.kernel_ff,
+            self.kernel_ei[species],
+            channel,
+        )
+        result = _evaluate(
+            kernels.table_emission,
+            kernels.table_emission_loops,
+            consts,
+            (ffac, tas, alt),
+        )
+        return self._outside_grid(result, species, ffac, tas, alt)
+
+    def nox(self, ffac, tas, alt=0):
+        """Compute NOx emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: NOx emission from all engines (unit: g/s).
+
+        """
+        if getattr(self, "kernel_axes", None) is None:
+            return super(EmissionTable, self).nox(ffac, tas, alt)
+        return self._table_emission("nox", 2, ffac, tas, alt)
+
+    def co(self, ffac, tas, alt=0):
+        """Compute CO emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: CO emission from all engines (unit: g/s).
+
+        """
+        if getattr(self, "kernel_axes", None) is None:
+            return super(EmissionTable, self).co(ffac, tas, alt)
+        return self._table_emission("co", 1, ffac, tas, alt)
+
+    def hc(self, ffac, tas, alt=0):
+        """Compute HC emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: HC emission from all engines (unit: g/s).
+
+        """
+        if getattr(self, "kernel_axes", None) is None:
+            return super(EmissionTable, self).hc(ffac, tas, alt)
+        return self._table_emission("hc", 1, ffac, tas, alt)
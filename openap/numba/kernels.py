@@ -0,0 +1,448 @@
+"""Compiled kernels of the numba backend.
+
+The point kernels evaluate the models for one set of scalar inputs, with the
+same formulas as the numpy implementation. The loop kernels apply them over
+1-d arrays and are compiled twice: serial, and with ``parallel=True``.
+
+"""
+
+import math
+import types
+from numba import njit, prange
+from openap.extra import aero
+
+kts = aero.kts
+ft = aero.ft
+g0 = aero.g0
+R = aero.R
+p0 = aero.p0
+rho0 = aero.rho0
+gamma_air = aero.gamma
+
+
+def _loops(func):
+    """Compile a loop kernel as a serial and a parallel function."""
+    # a copy with a different name, to keep the on-disk caches separate
+    par = types.FunctionType(
+        func.__code__, func.__globals__, func.__name__ + "_parallel"
+    )
+    par.__qualname__ = func.__qualname__ + "_parallel"
+    return njit(cache=True)(func), njit(cache=True, parallel=True)(par)
+
+
+# ---------------------------------------------------------------------------
+# atmosphere
+# ---------------------------------------------------------------------------
+
+
+@njit(cache=True)
+def _maximum(x, y):
+    if x != x or x >= y:
+        return x
+    return y
+
+
+@njit(cache=True)
+def atmos(h):
+    T = _maximum(288.15 - 0.0065 * h, 216.65)
+    rhotrop = 1.225 * (T / 288.15) ** 4.256848030018761
+    dhstrat = _maximum(0.0, h - 11000.0)
+    rho = rhotrop * math.exp(-dhstrat / 6341.552161)
+    p = rho * R * T
+    return p, rho, T
+
+
+@njit(cache=True)
+def interp(x, xp, fp):
+    if x != x:
+        return x
+    n = xp.size
+    if x < xp[0]:
+        return fp[0]
+    if x >= xp[n - 1]:
+        return fp[n - 1]
+
+    j = 0
+    while xp[j + 1] <= x:
+        j += 1
+
+    if xp[j] == x:
+        return fp[j]
+
+    slope = (fp[j + 1] - fp[j]) / (xp[j + 1] - xp[j])
+    y = slope * (x - xp[j]) + fp[j]
+    if y != y:
+        y = slope * (x - xp[j + 1]) + fp[j + 1]
+        if y != y and fp[j] == fp[j + 1]:
+            y = fp[j]
+    return y
+
+
+# ---------------------------------------------------------------------------
+# thrust
+# ---------------------------------------------------------------------------
+
+
+@njit(cache=True)
+def mach_cas(tas, p, rho, T):
+    v = tas * kts
+    mach = v / math.sqrt(gamma_air * R * T)
+    qdyn = p * ((1.0 + rho * v * v / (7.0 * p)) ** 3.5 - 1.0)
+    vcas = math.sqrt(7.0 * p0 / rho0 * ((qdyn / p0 + 1.0) ** (2.0 / 7.0) - 1.0))
+    return mach, vcas
+
+
+@njit(cache=True)
+def climb_at(c, mach, vcas, P, alt, roc):
+    roc = abs(roc)
+
+    if alt > 30000:
+        mratio = mach / c.cruise_mach
+        d = -0.4204 * mratio + 1.0824
+        b = mratio ** (-0.11)
+        ratio = d * math.log(P / c.Pcr) + b
+    else:
+        vratio = vcas / c.vcas_ref
+        a = vratio ** (-0.1)
+        n = 2.667e-05 * roc + 0.8633
+
+        if alt > 10000:
+            ratio = a * (P / c.Pcr) ** (-0.355 * vratio + n)
+        else:
+            F10 = c.Fcr * a * (c.P10 / c.Pcr) ** (-0.355 * vratio + n)
+            m = -1.2043e-1 * vratio - 8.8889e-9 * roc ** 2 + 2.4444e-5 * roc + 4.7379e-1
+            ratio = m * (P / c.Pcr) + (F10 / c.Fcr - m * (c.P10 / c.Pcr))
+
+    return ratio * c.Fcr
+
+
+@njit(cache=True)
+def climb(c, tas, alt, roc):
+    if tas < 10:
+        tas = 10.0
+    p, rho, T = atmos(alt * ft)
+    mach, vcas = mach_cas(tas, p, rho, T)
+    return climb_at(c, mach, vcas, p, alt, roc)
+
+
+@njit(cache=True)
+def takeoff(c, sea_level, tas, alt):
+    mach = tas * kts / math.sqrt(gamma_air * R * 288.15)
+
+    if sea_level:
+        ratio = 1 - c.to_k1 * mach + c.to_k2 * mach ** 2
+    else:
+        p, rho, T = atmos(alt * ft)
+        dP = p / p0
+
+        A = -0.4327 * dP ** 2 + 1.3855 * dP + 0.0472
+        Z = 0.9106 * dP ** 3 - 1.7736 * dP ** 2 + 1.8697 * dP
+        X = 0.1377 * dP ** 3 - 0.4374 * dP ** 2 + 1.3003 * dP
+
+        ratio = A - c.to_k1 * Z * mach + c.to_k2 * X * mach ** 2
+
+    return ratio * c.eng_max_thrust * c.eng_number
+
+
+def climb_loop(c, tas, alt, roc, out):
+    for i in prange(out.size):
+        out[i] = climb(c, tas[i], alt[i], roc[i])
+
+
+def takeoff_loop(c, sea_level, tas, alt, out):
+    for i in prange(out.size):
+        out[i] = takeoff(c, sea_level, tas[i], alt[i])
+
+
+climb_loops = _loops(climb_loop)
+takeoff_loops = _loops(takeoff_loop)
+
+
+# ---------------------------------------------------------------------------
+# drag
+# ---------------------------------------------------------------------------
+
+
+@njit(cache=True)
+def cl_qs(c, mass, tas, rho, path_angle):
+    v = tas * kts
+    gamma = path_angle * math.pi / 180
+
+    qS = 0.5 * rho * v ** 2 * c.S
+    L = mass * g0 * math.cos(gamma)
+    if qS < 1e-3:
+        qS = 1e-3
+    return L / qS, qS
+
+
+@njit(cache=True)
+def drag_clean(c, w, mass, tas, path_angle, rho, T):
+    """Clean drag, w: (wave drag enabled 1.0 or 0.0, cos(sweep), t/c)."""
+    cl, qS = cl_qs(c, mass, tas, rho, path_angle)
+
+    cd0 = c.cd0
+    if w[0] != 0:
+        mach = tas * kts / math.sqrt(gamma_air * R * T)
+        cos_sweep = w[1]
+        mach_crit = (
+            0.87 - 0.108 / cos_sweep - 0.1 * cl / (cos_sweep ** 2) - w[2] / cos_sweep
+        ) / cos_sweep
+        dmach = mach - mach_crit
+        if dmach <= 0:
+            dmach = 0.0
+        if dmach != 0:
+            cd0 = cd0 + 20 * dmach ** 4
+
+    cd = cd0 + c.k * cl ** 2
+    return cd * qS
+
+
+@njit(cache=True)
+def drag_nonclean(c, landing_gear, mass, tas, alt, flap_angle, path_angle):
+    delta_cd_flap = c.flap_cd0_factor * math.sin(flap_angle * math.pi / 180) ** 2
+    delta_cd_gear = c.delta_cd_gear if landing_gear else 0.0
+    cd0_total = c.cd0 + delta_cd_flap + delta_cd_gear
+
+    delta_e_flap = c.flap_e_factor * flap_angle
+    k_total = 1 / (1 / c.k + math.pi * c.ar * delta_e_flap)
+
+    p, rho, T = atmos(alt * ft)
+    cl, qS = cl_qs(c, mass, tas, rho, path_angle)
+    cd = cd0_total + k_total * cl ** 2
+    return cd * qS
+
+
+@njit(cache=True)
+def clean(c, w, mass, tas, alt, path_angle):
+    p, rho, T = atmos(alt * ft)
+    return drag_clean(c, w, mass, tas, path_angle, rho, T)
+
+
+def clean_loop(c, w, mass, tas, alt, path_angle, out):
+    for i in prange(out.size):
+        out[i] = clean(c, w, mass[i], tas[i], alt[i], path_angle[i])
+
+
+def nonclean_loop(c, landing_gear, mass, tas, alt, flap_angle, path_angle, out):
+    for i in prange(out.size):
+        out[i] = drag_nonclean(
+            c, landing_gear, mass[i], tas[i], alt[i], flap_angle[i], path_angle[i]
+        )
+
+
+clean_loops = _loops(clean_loop)
+nonclean_loops = _loops(nonclean_loop)
+
+
+# ---------------------------------------------------------------------------
+# fuel flow
+# ---------------------------------------------------------------------------
+
+
+@njit(cache=True)
+def at_thrust(c, acthr, alt):
+    engthr = acthr / c.n_eng
+    ratio = acthr / c.maxthr
+    ff_sl = c.fuel_c3 * ratio ** 3 + c.fuel_c2 * ratio ** 2 + c.fuel_c1 * ratio
+    ff_corr_alt = c.fuel_ch * (engthr / 1000) * (alt * 0.3048)
+    return (ff_sl + ff_corr_alt) * c.n_eng
+
+
+@njit(cache=True)
+def fuel_takeoff(cf, ct, sea_level, tas, alt, throttle):
+    return throttle * at_thrust(cf, takeoff(ct, sea_level, tas, alt), 0.0)
+
+
+@njit(cache=True)
+def enroute(cf, ct, cd, w, fillna, mass, tas, alt, path_angle):
+    p, rho, T_air = atmos(alt * ft)
+
+    D = drag_clean(cd, w, mass, tas, path_angle, rho, T_air)
+    T = D + mass * 9.80665 * math.sin(path_angle * math.pi / 180)
+
+    tas_thr = 10.0 if tas < 10 else tas
+    mach, vcas = mach_cas(tas_thr, p, rho, T_air)
+    T_max = climb_at(ct, mach, vcas, p, alt, 0.0)
+
+    if T < 0:
+        T = 0.07 * T_max
+
+    fuelflow = at_thrust(cf, T, alt)
+
+    if fillna and T > 1.20 * T_max:
+        fuelflow = math.nan
+    return fuelflow
+
+
+def at_thrust_loop(c, acthr, alt, out):
+    for i in prange(out.size):
+        out[i] = at_thrust(c, acthr[i], alt[i])
+
+
+def fuel_takeoff_loop(cf, ct, sea_level, tas, alt, throttle, out):
+    for i in prange(out.size):
+        out[i] = fuel_takeoff(cf, ct, sea_level, tas[i], alt[i], throttle[i])
+
+
+def enroute_loop(cf, ct, cd, w, fillna, mass, tas, alt, path_angle, out):
+    for i in prange(out.size):
+        out[i] = enroute(cf, ct, cd, w, fillna, mass[i], tas[i], alt[i], path_angle[i])
+
+
+at_thrust_loops = _loops(at_thrust_loop)
+fuel_takeoff_loops = _loops(fuel_takeoff_loop)
+enroute_loops = _loops(enroute_loop)
+
+
+# ---------------------------------------------------------------------------
+# emission
+# ---------------------------------------------------------------------------
+
+
+@njit(cache=True)
+def fl2sl(n_eng, ffac, tas, alt):
+    p, rho, T = atmos(alt * ft)
+    M = tas * kts / math.sqrt(gamma_air * R * T)
+    beta = math.exp(0.2 * (M ** 2))
+    theta = (T / 288.15) / beta
+    delta = (1 - 0.0019812 * alt / 288.15) ** 5.255876 / beta ** 3.5
+    ratio = (theta ** 3.3) / (delta ** 1.02)
+
+    ff_sl = (ffac / n_eng) * theta ** 3.8 / delta * beta
+    return ff_sl, ratio
+
+
+@njit(cache=True)
+def nox(n_eng, ff, ei, ffac, tas, alt):
+    ff_sl, ratio = fl2sl(n_eng, ffac, tas, alt)
+    nox_sl = interp(ff_sl, ff, ei)
+
+    omega = 1e-3 * math.exp(-0.0001426 * (alt - 12900))
+    nox_fl = nox_sl * math.sqrt(1 / ratio) * math.exp(-19 * (omega - 0.00634))
+    return nox_fl * ffac
+
+
+@njit(cache=True)
+def co_hc(n_eng, ff, ei, ffac, tas, alt):
+    ff_sl, ratio = fl2sl(n_eng, ffac, tas, alt)
+    return interp(ff_sl, ff, ei) * ratio * ffac
+
+
+def nox_loop(n_eng, ff, ei, ffac, tas, alt, out):
+    for i in prange(out.size):
+        out[i] = nox(n_eng, ff, ei, ffac[i], tas[i], alt[i])
+
+
+def co_hc_loop(n_eng, ff, ei, ffac, tas, alt, out):
+    for i in prange(out.size):
+        out[i] = co_hc(n_eng, ff, ei, ffac[i], tas[i], alt[i])
+
+
+nox_loops = _loops(nox_loop)
+co_hc_loops = _loops(co_hc_loop)
+
+
+# ---------------------------------------------------------------------------
+# tables (openap.table), on uniform grids
+# ---------------------------------------------------------------------------
+
+
+@njit(cache=True)
+def locate(x, axis):
+    """Cell index and position in the cell, index 0 for nan.
+
+    The axis is given as (start, 1 / step, number of points).
+    """
+    start, scale, n = axis
+    u = min(max((x - start) * scale, 0.0), n - 1.0)
+    if u != u:
+        return 0, u
+    i = min(int(u), n - 2)
+    return i, u - i
+
+
+@njit(cache=True)
+def _lerp(a, b, t):
+    return a + t * (b - a)
+
+
+@njit(cache=True)
+def interp2(table, ax, ay, split, x, y):
+    """Bilinear interpolation, split: two values per cell along y."""
+    i, tx = locate(x, ax)
+    j, ty = locate(y, ay)
+
+    ny = ay[2]
+    if split:
+        ny = 2 * (ny - 1)
+        k = i * ny + 2 * j
+    else:
+        k = i * ny + j
+
+    v0 = _lerp(table[k], table[k + 1], ty)
+    v1 = _lerp(table[k + ny], table[k + ny + 1], ty)
+    return _lerp(v0, v1, tx)
+
+
+@njit(cache=True)
+def interp3(table, ax, ay, az, x, y, z):
+    """Trilinear interpolation."""
+    i, tx = locate(x, ax)
+    j, ty = locate(y, ay)
+    l, tz = locate(z, az)
+
+    ny, nz = ay[2], az[2]
+    k = (i * ny + j) * nz + l
+    sx = ny * nz
+
+    v00 = _lerp(table[k], table[k + 1], tz)
+    v01 = _lerp(table[k + nz], table[k + nz + 1], tz)
+    v10 = _lerp(table[k + sx], table[k + sx + 1], tz)
+    v11 = _lerp(table[k + sx + nz], table[k + sx + nz + 1], tz)
+    return _lerp(_lerp(v00, v01, ty), _lerp(v10, v11, ty), tx)
+
+
+@njit(cache=True)
+def table_enroute(cf, axes, drag, thrust_max, fillna, mass, tas, alt, path_angle):
+    gamma = path_angle * math.pi / 180
+    ax_mass, ax_tas, ax_alt = axes
+
+    D = interp3(drag, ax_mass, ax_tas, ax_alt, mass * math.cos(gamma), tas, alt)
+    T = D + mass * 9.80665 * math.sin(gamma)
+
+    T_max = interp2(thrust_max, ax_tas, ax_alt, True, tas, alt)
+    if T < 0:
+        T = 0.07 * T_max
+
+    fuelflow = at_thrust(cf, T, alt)
+
+    if fillna and T > 1.20 * T_max:
+        fuelflow = math.nan
+    return fuelflow
+
+
+@njit(cache=True)
+def table_emission(axes, values, ff, ei, channel, ffac, tas, alt):
+    """Emission with the tabulated conversion, values: (k_ff, ratio, nox)."""
+    ax_tas, ax_alt = axes
+    k_ff = interp2(values[0], ax_tas, ax_alt, False, tas, alt)
+    factor = interp2(values[channel], ax_tas, ax_alt, False, tas, alt)
+    return interp(ffac * k_ff, ff, ei) * factor * ffac
+
+
+def table_enroute_loop(
+    cf, axes, drag, thrust_max, fillna, mass, tas, alt, path_angle, out
+):
+    for i in prange(out.size):
+        out[i] = table_enroute(
+            cf, axes, drag, thrust_max, fillna, mass[i], tas[i], alt[i], path_angle[i]
+        )
+
+
+def table_emission_loop(axes, values, ff, ei, channel, ffac, tas, alt, out):
+    for i in prange(out.size):
+        out[i] = table_emission(axes, values, ff, ei, channel, ffac[i], tas[i], alt[i])
+
+
+table_enroute_loops = _loops(table_enroute_loop)
+table_emission_loops = _loops(table_emission_loop)
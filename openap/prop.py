@@ -1,17 +1,190 @@
 """Retrive properties of aircraft and engines."""
 
 import os
+import copy
 import glob
-import yaml
+import threading
+from collections import OrderedDict
 import numpy as np
-import pandas as pd
+from openap import snapshot
 
 curr_path = os.path.dirname(os.path.realpath(__file__))
+dir_data = curr_path + "/data/"
 dir_aircraft = curr_path + "/data/aircraft/"
 file_engine = curr_path + "/data/engine/engines.csv"
 file_synonym = curr_path + "/data/aircraft/_synonym.csv"
 
-aircraft_synonym = pd.read_csv(file_synonym) 
+
+class FrozenDict(dict):
+    """Read-only dictionary handed out by the property registry."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("OpenAP properties are read-only, make a copy first.")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = __ior__ = _readonly
+
+    def copy(self):
+        return dict(self)
+
+    def __reduce__(self):
+        # unpickling a dict subclass goes through __setitem__ otherwise
+        return (FrozenDict, (dict(self),))
+
+    def __deepcopy__(self, memo):
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+
+class FrozenList(list):
+    """Read-only list handed out by the property registry."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("OpenAP properties are read-only, make a copy first.")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def copy(self):
+        return list(self)
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(v, memo) for v in self]
+
+
+def freeze(obj):
+    """Recursively convert a parsed data structure to read-only containers.
+
+    Dictionaries and lists are converted to their read-only subclasses
+    (``FrozenDict`` and ``FrozenList``), tuples to tuples. Deep copies are
+    mutable.
+
+    """
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return FrozenList(freeze(v) for v in obj)
+    if isinstance(obj, tuple):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+class Registry(object):
+    """Process-wide, thread-safe LRU cache for parsed OpenAP data sources.
+
+    Each source (aircraft file, engine table, drag polar, ...) is parsed once
+    and shared between all model objects. Entries are addressed by a
+    ``(kind, key)`` pair and created on demand by a loader function.
+
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, kind, key, loader):
+        """Return a cached entry, calling ``loader()`` on a cache miss.
+
+        Args:
+            kind (string): Type of the data source, for example "aircraft".
+            key (hashable): Identifier of the entry within its kind.
+            loader (callable): Function without arguments producing the entry.
+
+        Returns:
+            object: The cached entry.
+
+        """
+        k = (kind, key)
+        with self._lock:
+            if k in self._data:
+                self.hits += 1
+                self._data.move_to_end(k)
+                return self._data[k]
+
+            self.misses += 1
+            value = loader()
+            self._data[k] = value
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+            return value
+
+    def resize(self, maxsize):
+        """Change the capacity, evicting the least recently used entries.
+
+        Args:
+            maxsize (int): Maximum number of entries, None for unbounded.
+
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            if maxsize is not None:
+                while len(self._data) > maxsize:
+                    self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Get cache statistics.
+
+        Returns:
+            dict: Number of hits, misses, current size, and maximum size.
+
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+registry = Registry()
+
+
+def _engine_table():
+    import pandas as pd
+
+    return registry.get("table", "engines", lambda: pd.read_csv(file_engine))
+
+
+def synonym(kind):
+    """Get the synonym table of a data source.
+
+    Args:
+        kind (string): Data source, one of "aircraft", "dragpolar", or "wrap".
+
+    Returns:
+        dict: Substitute aircraft type for each original aircraft type.
+
+    """
+    return registry.get("synonym", kind, lambda: _load_synonym(kind))
+
+
+def _load_synonym(kind):
+    snap = snapshot.get()
+    if snap is not None:
+        return freeze(snap.synonym(kind))
+
+    import pandas as pd
+
+    syno = pd.read_csv(dir_data + kind + "/_synonym.csv")
+    result = {}
+    for orig, new in zip(syno.orig, syno.new):
+        result.setdefault(orig, new)
+    return freeze(result)
+
 
 def available_aircraft(use_synonym=False):
     """Get available aircraft types in OpenAP model.
@@ -20,12 +193,17 @@ def available_aircraft(use_synonym=False):
         list of string: aircraft types.
 
     """
-    files = sorted(glob.glob(dir_aircraft + "*.yml"))
-    acs = [f[-8:-4] for f in files]
+    snap = snapshot.get()
+    if snap is not None:
+        acs = sorted(snap.aircraft_index)
+    else:
+        files = registry.get(
+            "files", "aircraft", lambda: sorted(glob.glob(dir_aircraft + "*.yml"))
+        )
+        acs = [f[-8:-4] for f in files]
 
     if use_synonym:
-        syno = aircraft_synonym.orig.to_list()
-        acs = acs + syno
+        acs = acs + list(synonym("aircraft"))
 
     return acs
 
@@ -37,25 +215,32 @@ def aircraft(ac, use_synonym=False):
         ac (string): ICAO aircraft type (for example: A320).
 
     Returns:
-        dict: Performance parameters related to the aircraft.
+        dict: Performance parameters related to the aircraft (read-only).
 
     """
     ac = ac.lower()
+    return registry.get(
+        "aircraft", (ac, use_synonym), lambda: _load_aircraft(ac, use_synonym)
+    )
 
-    files = glob.glob(dir_aircraft + ac + ".yml")
 
-    if len(files) == 0:
-        syno = aircraft_synonym.query('orig==@ac')
-        if use_synonym and syno.shape[0] > 0:
-            new_ac = syno.new.iloc[0]
-            files = glob.glob(dir_aircraft + new_ac + ".yml")
+def _load_aircraft(ac, use_synonym):
+    if ac not in available_aircraft():
+        if use_synonym and ac in synonym("aircraft"):
+            ac = synonym("aircraft")[ac]
         else:
             raise RuntimeError(f"Aircraft {ac} not avaiable in OpenAP.")
 
-    f = files[0]
-    acdict = yaml.safe_load(open(f))
+    snap = snapshot.get()
+    if snap is not None:
+        acdict = snap.aircraft(ac)
+    else:
+        import yaml
+
+        with open(dir_aircraft + ac + ".yml") as f:
+            acdict = yaml.safe_load(f)
 
-    return acdict
+    return freeze(acdict)
 
 
 def aircraft_engine_options(ac):
@@ -70,9 +255,9 @@ def aircraft_engine_options(ac):
     """
     acdict = aircraft(ac)
 
-    if type(acdict["engine"]["options"]) == dict:
+    if isinstance(acdict["engine"]["options"], dict):
         eng_options = list(acdict["engine"]["options"].values())
-    elif type(acdict["engine"]["options"]) == list:
+    elif isinstance(acdict["engine"]["options"], (list, tuple)):
         eng_options = list(acdict["engine"]["options"])
 
     return eng_options
@@ -89,9 +274,9 @@ def search_engine(eng):
 
     """
     ENG = eng.strip().upper()
-    engines = pd.read_csv(file_engine)
+    engines = _engine_table()
 
-    available_engines = engines.query("name.str.startswith(@ENG)", engine="python")
+    available_engines = engines[engines.name.str.startswith(ENG)]
 
     if available_engines.shape[0] == 0:
         print("Engine not found.")
@@ -111,20 +296,27 @@ def engine(eng):
         eng (string): Engine type (for example: CFM56-5B6).
 
     Returns:
-        dict: Engine parameters.
+        dict: Engine parameters (read-only).
 
     """
+    return registry.get("engine", eng, lambda: _load_engine(eng))
+
+
+def _load_engine(eng):
     ENG = eng.strip().upper()
-    engines = pd.read_csv(file_engine)
 
     # try to look for the unique engine
-    available_engines = engines.query(
-        "name.str.upper().str.startswith(@ENG)", engine="python"
-    )
-    if available_engines.shape[0] >= 1:
-        available_engines.index = available_engines.name
+    snap = snapshot.get()
+    if snap is not None:
+        available_engines = snap.engine_rows(ENG)
+    else:
+        engines = _engine_table()
+        available_engines = engines[
+            engines.name.str.upper().str.startswith(ENG)
+        ].to_dict(orient="records")
 
-        seleng = available_engines.to_dict(orient="records")[0]
+    if len(available_engines) >= 1:
+        seleng = available_engines[0]
         seleng["name"] = eng
 
         # compute fuel flow correction factor kg/s/N per meter
@@ -141,7 +333,7 @@ def engine(eng):
     else:
         raise RuntimeError(f"Data for engine {eng} not found.")
 
-    return seleng
+    return freeze(seleng)
 
 
 def func_fuel(c3, c2, c1):
@@ -0,0 +1,127 @@
+"""Scalar backend of the OpenAP models.
+
+Calling a numpy based model with single values converts every argument to a
+0-d array and runs the numpy ufunc machinery on it, which costs much more
+than the arithmetic itself. The models in this module are evaluated with
+python floats and the ``math`` module instead.
+
+``ndarrayconvert`` dispatches calls with only scalar arguments to the scalar
+twin of a model automatically (see ``openap.extra.set_scalar_fast_path``).
+A twin shares the attributes of the original model, so changes to the model
+are seen by its twin.
+
+Examples::
+
+    from openap import FuelFlow
+
+    fuelflow = FuelFlow("A320")
+    fuelflow.enroute(mass=60000, tas=230, alt=32000)  # scalar path
+    fuelflow.enroute(mass=[60000], tas=[230], alt=[32000])  # numpy path
+
+"""
+
+import weakref
+from .. import drag, thrust, fuel, emission
+from . import numpy_override as np
+from . import aero_override as aero
+
+# attributes of a model holding other models, which are replaced by twins
+SUBMODELS = ("thrust", "drag")
+
+
+def _submodel(name):
+    def get(self):
+        try:
+            return twin(self.__dict__[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def set(self, value):
+        self.__dict__[name] = value
+
+    return property(get, set)
+
+
+class ScalarMeta(type):
+    def __new__(cls, name, base, attr_dict):
+        # strip the ndarrayconvert decorator of all inherited methods,
+        # following the method resolution order of the base classes
+        seen = set(attr_dict)
+        for b in base:
+            for c in b.__mro__:
+                for elt, value in vars(c).items():
+                    if elt in seen:
+                        continue
+                    seen.add(elt)
+                    if hasattr(value, "orig_func"):
+                        attr_dict[elt] = value.orig_func
+
+        # properties take precedence over the (shared) instance attributes
+        attr_dict["np"] = property(lambda self: np)
+        attr_dict["aero"] = property(lambda self: aero)
+        for sub in SUBMODELS:
+            attr_dict[sub] = _submodel(sub)
+
+        return super().__new__(cls, name, base, attr_dict)
+
+
+class Drag(drag.Drag, metaclass=ScalarMeta):
+    pass
+
+
+class Thrust(thrust.Thrust, metaclass=ScalarMeta):
+    pass
+
+
+class FuelFlow(fuel.FuelFlow, metaclass=ScalarMeta):
+    pass
+
+
+class Emission(emission.Emission, metaclass=ScalarMeta):
+    pass
+
+
+_classes = {
+    drag.Drag: Drag,
+    thrust.Thrust: Thrust,
+    fuel.FuelFlow: FuelFlow,
+    emission.Emission: Emission,
+}
+
+# id(model) -> (twin, weak reference to the model), entries are removed
+# when the model is deleted
+_twins = {}
+
+
+def twin_class(cls):
+    """Get the scalar version of a model class."""
+    if isinstance(cls, ScalarMeta):
+        return cls
+
+    if cls not in _classes:
+        _classes[cls] = ScalarMeta(cls.__name__, (cls,), {"__module__": __name__})
+    return _classes[cls]
+
+
+def twin(model):
+    """Get the scalar twin of a model, sharing the attributes of the model.
+
+    Args:
+        model: Model object (for example: FuelFlow).
+
+    Returns:
+        Object of the scalar version of the model class.
+
+    """
+    if isinstance(type(model), ScalarMeta):
+        return model
+
+    key = id(model)
+    entry = _twins.get(key)
+    if entry is None:
+        cls = twin_class(type(model))
+        t = cls.__new__(cls)
+        t.__dict__ = model.__dict__
+        entry = (t, weakref.ref(model, lambda ref: _twins.pop(key, None)))
+        _twins[key] = entry
+    return entry[0]
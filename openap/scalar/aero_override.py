@@ -0,0 +1,126 @@
+"""aero.py adapted for python floats"""
+
+import math
+from openap.extra.aero import (
+    kts,
+    ft,
+    fpm,
+    inch,
+    sqft,
+    nm,
+    lbs,
+    g0,
+    R,
+    p0,
+    rho0,
+    T0,
+    gamma,
+    gamma1,
+    gamma2,
+    beta,
+    r_earth,
+    a0,
+)
+from . import numpy_override as np
+
+
+def atmos(h):
+    """Compute press, density and temperature at a given altitude.
+
+    Args:
+        h (float): Altitude (in meters).
+
+    Returns:
+        (float, float, float): Air pressure (Pa), density (kg/m3),
+            and temperature (K).
+
+    """
+    T = np.maximum(288.15 - 0.0065 * h, 216.65)
+    rhotrop = 1.225 * (T / 288.15) ** 4.256848030018761
+    dhstrat = np.maximum(0.0, h - 11000.0)
+    rho = rhotrop * np.exp(-dhstrat / 6341.552161)
+    p = rho * R * T
+    return p, rho, T
+
+
+def atmos_grad(h):
+    p, rho, T = atmos(h)
+    if h < 11000.0:
+        dT = -0.0065
+        drho = 4.256848030018761 * dT / T * rho
+    else:
+        dT = 0.0
+        drho = -rho / 6341.552161
+    dp = R * (drho * T + rho * dT)
+    return dp, drho, dT
+
+
+def temperature(h):
+    p, r, T = atmos(h)
+    return T
+
+
+def pressure(h):
+    p, r, T = atmos(h)
+    return p
+
+
+def density(h):
+    p, r, T = atmos(h)
+    return r
+
+
+def vsound(h):
+    T = temperature(h)
+    a = np.sqrt(gamma * R * T)
+    return a
+
+
+def tas2mach(v_tas, h):
+    a = vsound(h)
+    mach = v_tas / a
+    return mach
+
+
+def mach2tas(mach, h):
+    a = vsound(h)
+    v_tas = mach * a
+    return v_tas
+
+
+def eas2tas(v_eas, h):
+    rho = density(h)
+    v_tas = v_eas * math.sqrt(rho0 / rho)
+    return v_tas
+
+
+def tas2eas(v_tas, h):
+    rho = density(h)
+    v_eas = v_tas * math.sqrt(rho / rho0)
+    return v_eas
+
+
+def cas2tas(v_cas, h):
+    p, rho, T = atmos(h)
+    qdyn = p0 * ((1.0 + rho0 * v_cas * v_cas / (7.0 * p0)) ** 3.5 - 1.0)
+    v_tas = np.sqrt(7.0 * p / rho * (np.power(1.0 + qdyn / p, 2.0 / 7.0) - 1.0))
+    return v_tas
+
+
+def tas2cas(v_tas, h):
+    p, rho, T = atmos(h)
+    qdyn = p * ((1.0 + rho * v_tas * v_tas / (7.0 * p)) ** 3.5 - 1.0)
+    v_cas = np.sqrt(7.0 * p0 / rho0 * (np.power(qdyn / p0 + 1.0, 2.0 / 7.0) - 1.0))
+    return v_cas
+
+
+def mach2cas(mach, h):
+    v_tas = mach2tas(mach, h)
+    v_cas = tas2cas(v_tas, h)
+    return v_cas
+
+
+def cas2mach(v_cas, h):
+    v_tas = cas2tas(v_cas, h)
+    mach = tas2mach(v_tas, h)
+    return mach
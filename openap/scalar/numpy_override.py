@@ -0,0 +1,100 @@
+"""Subset of numpy used by the models, for python floats (math backed).
+
+Domain errors that numpy reports as NaN or infinity are returned the same
+way, so that a scalar evaluation matches the array evaluation.
+"""
+
+import math
+from bisect import bisect_right
+
+pi = math.pi
+nan = math.nan
+inf = math.inf
+
+sin = math.sin
+cos = math.cos
+tan = math.tan
+radians = math.radians
+degrees = math.degrees
+arcsin = math.asin
+arctan2 = math.atan2
+
+
+def abs(x):
+    return x if x >= 0 else -x
+
+
+def sqrt(x):
+    if x >= 0:
+        return math.sqrt(x)
+    return nan
+
+
+def exp(x):
+    try:
+        return math.exp(x)
+    except OverflowError:
+        return inf
+
+
+def log(x):
+    if x > 0:
+        return math.log(x)
+    if x == 0:
+        return -inf
+    return nan
+
+
+def power(x, y):
+    try:
+        return math.pow(x, y)
+    except OverflowError:
+        return inf
+    except ValueError:
+        return nan
+
+
+def where(cond, x, y):
+    return x if cond else y
+
+
+def maximum(x, y):
+    if x != x or x >= y:
+        return x
+    return y
+
+
+def minimum(x, y):
+    if x != x or x <= y:
+        return x
+    return y
+
+
+def logical_not(x):
+    return not x
+
+
+def isnan(x):
+    return x != x
+
+
+def interp(x, xp, fp):
+    """Same arithmetic as numpy.interp for a single point."""
+    if x != x:
+        return nan
+    if x < xp[0]:
+        return fp[0]
+    if x >= xp[-1]:
+        return fp[-1]
+
+    j = bisect_right(xp, x) - 1
+    if xp[j] == x:
+        return fp[j]
+
+    slope = (fp[j + 1] - fp[j]) / (xp[j + 1] - xp[j])
+    y = slope * (x - xp[j]) + fp[j]
+    if y != y:
+        y = slope * (x - xp[j + 1]) + fp[j + 1]
+        if y != y and fp[j] == fp[j + 1]:
+            y = fp[j]
+    return y
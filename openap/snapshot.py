@@ -0,0 +1,249 @@
+"""Compiled binary snapshot of the OpenAP performance database.
+
+Parsing the bundled YAML, fixed-width and CSV files takes a large part of
+the start-up time of a fresh process. This module compiles all of them into
+one versioned ``.npz`` file (typed arrays plus name indices), which is loaded
+with a single ``np.load`` call. When the snapshot file exists, ``prop``,
+``Drag``, ``WRAP`` and ``Thrust`` read from it instead of the source files.
+
+The snapshot is built with::
+
+    python -m openap.snapshot
+
+The modification times and sizes of the source files are stored in the
+snapshot; when any of them differ, or a file is added or removed, the
+snapshot is ignored until it is rebuilt.
+
+"""
+
+import os
+import glob
+import json
+import numpy as np
+
+SNAPSHOT_VERSION = 2
+
+curr_path = os.path.dirname(os.path.realpath(__file__))
+dir_data = curr_path + "/data/"
+file_snapshot = dir_data + "openap.snapshot.npz"
+
+
+class Snapshot(object):
+    """Read-only view on a compiled snapshot file."""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+        self.aircraft_index = self._index("aircraft")
+        self.dragpolar_index = self._index("dragpolar")
+        self.wrap_index = self._index("wrap")
+
+        self.engine_columns = [str(c) for c in arrays["engine_columns"]]
+        self.engine_names_upper = arrays["engine_names_upper"]
+
+    def _index(self, kind):
+        names = self.arrays[kind + "_names"]
+        return {str(n): i for i, n in enumerate(names)}
+
+    def _blob(self, kind, i):
+        offsets = self.arrays[kind + "_offsets"]
+        raw = self.arrays[kind + "_blob"][offsets[i] : offsets[i + 1]]
+        return json.loads(raw.tobytes().decode("utf-8"))
+
+    def aircraft(self, ac):
+        """Get the aircraft dictionary, or None if not in the snapshot."""
+        i = self.aircraft_index.get(ac)
+        return None if i is None else self._blob("aircraft", i)
+
+    def dragpolar(self, ac):
+        """Get the drag polar dictionary, or None if not in the snapshot."""
+        i = self.dragpolar_index.get(ac)
+        return None if i is None else self._blob("dragpolar", i)
+
+    def synonym(self, kind):
+        """Get synonym table as a dictionary {orig: new}."""
+        orig = self.arrays[kind + "_synonym_orig"]
+        new = self.arrays[kind + "_synonym_new"]
+        synonym = {}
+        for o, n in zip(orig, new):
+            synonym.setdefault(str(o), str(n))
+        return synonym
+
+    def wrap(self, ac):
+        """Get WRAP table columns of an aircraft, or None if not available."""
+        i = self.wrap_index.get(ac)
+        if i is None:
+            return None
+
+        offsets = self.arrays["wrap_offsets"]
+        rows = slice(offsets[i], offsets[i + 1])
+        return {
+            col: self.arrays["wrap_col_" + col][rows] for col in WRAP_COLUMNS
+        }
+
+    def engine_rows(self, prefix):
+        """Get engine records whose upper-case names start with prefix."""
+        match = np.flatnonzero(np.char.startswith(self.engine_names_upper, prefix))
+        records = []
+        for i in match:
+            records.append(
+                {
+                    col: self.arrays["engine_col_" + col][i].item()
+                    for col in self.engine_columns
+                }
+            )
+        return records
+
+
+WRAP_COLUMNS = [
+    "variable",
+    "flight phase",
+    "name",
+    "opt",
+    "min",
+    "max",
+    "model",
+    "parameters",
+]
+
+
+def _sources():
+    """Source files of the snapshot, relative to the data directory."""
+    files = []
+    for pattern in ["aircraft/*", "dragpolar/*", "wrap/*", "engine/engines.csv"]:
+        files.extend(glob.glob(dir_data + pattern))
+    return sorted(os.path.relpath(f, dir_data) for f in files)
+
+
+def _stamps(sources):
+    """Modification times (unit: ns) and sizes of the source files."""
+    stamps = np.zeros((len(sources), 2), dtype=np.int64)
+    for i, f in enumerate(sources):
+        st = os.stat(dir_data + f)
+        stamps[i] = st.st_mtime_ns, st.st_size
+    return stamps
+
+
+def _pack_dicts(names, dicts):
+    blobs = [json.dumps(d).encode("utf-8") for d in dicts]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in blobs])
+    blob = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+    return np.array(names, dtype=str), blob, offsets
+
+
+def _pack_column(values):
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = values.astype(str)
+    return values
+
+
+def build(path=None):
+    """Compile all bundled data files into a snapshot file.
+
+    Args:
+        path (string): Output file. Defaults to the snapshot file location
+            inside the OpenAP data directory.
+
+    Returns:
+        string: Path of the written snapshot.
+
+    """
+    import yaml
+    import pandas as pd
+
+    if path is None:
+        path = file_snapshot
+
+    sources = _sources()
+    arrays = {
+        "version": np.array([SNAPSHOT_VERSION]),
+        "sources": np.array(sources, dtype=str),
+        "source_stamps": _stamps(sources),
+    }
+
+    for kind in ["aircraft", "dragpolar"]:
+        files = sorted(glob.glob(dir_data + kind + "/*.yml"))
+        names = [os.path.basename(f)[:-4].lower() for f in files]
+        dicts = []
+        for f in files:
+            with open(f) as fh:
+                dicts.append(yaml.safe_load(fh))
+        n, blob, offsets = _pack_dicts(names, dicts)
+        arrays[kind + "_names"] = n
+        arrays[kind + "_blob"] = blob
+        arrays[kind + "_offsets"] = offsets
+
+    for kind in ["aircraft", "dragpolar", "wrap"]:
+        syno = pd.read_csv(dir_data + kind + "/_synonym.csv")
+        arrays[kind + "_synonym_orig"] = _pack_column(syno.orig.values)
+        arrays[kind + "_synonym_new"] = _pack_column(syno.new.values)
+
+    files = sorted(glob.glob(dir_data + "wrap/*.txt"))
+    tables = [pd.read_fwf(f) for f in files]
+    arrays["wrap_names"] = np.array(
+        [os.path.basename(f)[:-4].lower() for f in files], dtype=str
+    )
+    offsets = np.zeros(len(tables) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([t.shape[0] for t in tables])
+    arrays["wrap_offsets"] = offsets
+    wrap = pd.concat(tables, ignore_index=True)
+    for col in WRAP_COLUMNS:
+        arrays["wrap_col_" + col] = _pack_column(wrap[col].values)
+
+    engines = pd.read_csv(dir_data + "engine/engines.csv")
+    arrays["engine_columns"] = np.array(engines.columns, dtype=str)
+    arrays["engine_names_upper"] = _pack_column(engines.name.str.upper().values)
+    for col in engines.columns:
+        arrays["engine_col_" + col] = _pack_column(engines[col].values)
+
+    np.savez(path, **arrays)
+    return path
+
+
+def load(path=None):
+    """Load a snapshot file.
+
+    Args:
+        path (string): Snapshot file. Defaults to the bundled location.
+
+    Returns:
+        Snapshot or None: None if the file does not exist, the snapshot
+            was built by an incompatible version of OpenAP, or the data files
+            were modified after it was built.
+
+    """
+    if path is None:
+        path = file_snapshot
+
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path, allow_pickle=False) as npz:
+        arrays = {k: npz[k] for k in npz.files}
+
+    if arrays["version"][0] != SNAPSHOT_VERSION:
+        return None
+
+    sources = _sources()
+    if arrays["sources"].tolist() != sources:
+        return None
+    if not np.array_equal(arrays["source_stamps"], _stamps(sources)):
+        return None
+
+    return Snapshot(arrays)
+
+
+def get():
+    """Get the snapshot shared by the current process (cached)."""
+    from openap import prop
+
+    if os.environ.get("OPENAP_NO_SNAPSHOT"):
+        return None
+
+    return prop.registry.get("snapshot", file_snapshot, load)
+
+
+if __name__ == "__main__":
+    print("Snapshot written to", build())
@@ -0,0 +1,496 @@
+"""Tabulated fuel flow and emission models.
+
+A table evaluates the costly parts of a model once on a grid, and answers the
+queries by linear interpolation in the grid, followed by the cheap algebra
+of the model. This is useful when the same model is called many times, for
+example in optimizers or Monte Carlo simulations.
+
+- ``FuelFlowTable`` tabulates the clean drag over mass, true airspeed and
+  altitude, and the maximum climb thrust over true airspeed and altitude. The
+  path angle is exact: the drag at path angle gamma is the drag of the mass
+  times cos(gamma) at level flight. The fuel flow is then computed from the
+  required thrust as in ``FuelFlow.enroute``.
+- ``EmissionTable`` tabulates the sea-level conversion of the fuel flow
+  (``Emission._fl2sl``) over true airspeed and altitude, and applies the
+  ICAO emission indices exactly.
+
+The tables are stored in ``cache_dir`` as ``.npz`` files, and reused as long
+as the grids, the constants of the models, and ``TABLE_VERSION`` are the same.
+
+The interpolation error is measured against the model when a table is built,
+at the centers of the grid cells (where the error of a linear interpolation
+of a smooth function is the largest), and given in the ``error`` attribute
+of the table: largest absolute error, and largest relative error of values
+above 1% of the largest value. With the default grids, the relative error of
+the fuel flow is about 1% above 100 kt, and reaches 5 to 10% below 100 kt,
+where the induced drag varies quickly with the speed. In steep descents, the
+required thrust is a small difference of large terms, and the relative error
+close to idle can reach a few percent for fuel flows of a few g/s. The
+relative error of the emissions is below 1% for most engines, a few percent
+at most.
+
+The points out of the grids (for example, a mass above the MTOW, or an
+altitude above the ceiling) are evaluated with the model, and reported as
+``out_of_grid`` to ``openap.diagnostics``.
+
+With numpy, the tables are not faster than the models on arrays (the
+interpolation costs about as much as the fused numpy algebra it replaces),
+and are slower for scalar calls, see ``benchmark/bench_table.py``. The
+compiled tables of ``openap.numba`` are faster than the models.
+
+Examples::
+
+    from openap.table import FuelFlowTable
+
+    fuelflow = FuelFlowTable("A320")
+    fuelflow.enroute(mass=masses, tas=speeds, alt=altitudes)
+    fuelflow.error  # {'abs': ..., 'rel': ...}
+
+"""
+
+import os
+import re
+import importlib
+import bisect
+import hashlib
+import numpy as np
+from openap import bundle, diagnostics
+from openap.extra import ndarrayconvert, aero
+
+TABLE_VERSION = 1
+
+cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "openap", "tables")
+
+
+class Axis(object):
+    """Breakpoints of a grid dimension.
+
+    When split is True, the table stores the values at both ends of each cell
+    instead of one value per breakpoint, to keep the discontinuities of a
+    model located at the breakpoints.
+    """
+
+    def __init__(self, breakpoints, split=False):
+        self.points = np.asarray(breakpoints, dtype=float)
+        self.split = split
+
+        step = np.diff(self.points)
+        self.uniform = bool(np.allclose(step, step[0]))
+        self.start = float(self.points[0])
+        self.scale = float(1 / step[0])
+
+    @property
+    def size(self):
+        """Number of values of the table along the axis."""
+        n = len(self.points)
+        return 2 * (n - 1) if self.split else n
+
+    def cells(self):
+        """Breakpoints at the two ends of each cell, and cell centers."""
+        left, right = self.points[:-1], self.points[1:]
+        ends = np.stack([left, right], axis=-1).reshape(-1)
+        return ends, np.repeat((left + right) / 2, 2)
+
+    def locate(self, x):
+        """Cell index (as float) and position in the cell of the points x."""
+        n = len(self.points)
+        if self.uniform:
+            u = np.minimum(np.maximum((x - self.start) * self.scale, 0), n - 1)
+            i = np.minimum(np.floor(u), n - 2)
+            return i, u - i
+
+        x = np.minimum(np.maximum(x, self.points[0]), self.points[-1])
+        i = np.minimum(np.searchsorted(self.points, x, side="right") - 1, n - 2)
+        return i, (x - self.points[i]) / (self.points[i + 1] - self.points[i])
+
+    def locate_point(self, x):
+        """Cell index and position in the cell of a single point x."""
+        n = len(self.points)
+        if self.uniform:
+            u = min(max((x - self.start) * self.scale, 0.0), n - 1.0)
+            i = min(int(u), n - 2)
+            return i, u - i
+
+        points = self.points.tolist()
+        x = min(max(x, points[0]), points[-1])
+        i = min(bisect.bisect_right(points, x) - 1, n - 2)
+        return i, (x - points[i]) / (points[i + 1] - points[i])
+
+
+class Grid(object):
+    """Table of values on a rectilinear grid, with multilinear interpolation.
+
+    Args:
+        axes (list): Axis of each dimension.
+        values (ndarray): Table of shape (channels, size of each axis).
+
+    """
+
+    def __init__(self, axes, values):
+        self.axes = axes
+        self.values = values
+        self.flat = values.reshape(len(values), -1)
+        self.strides = np.cumprod([1] + [ax.size for ax in axes[::-1]])[-2::-1].tolist()
+        self.steps = [2 * s if ax.split else s for ax, s in zip(axes, self.strides)]
+
+        # flat offsets of the cell corners, the last dimension varies fastest
+        self.offsets = [0]
+        for stride in self.strides:
+            self.offsets = [o + c * stride for o in self.offsets for c in (0, 1)]
+
+        self._lists = None
+
+    def __call__(self, *points):
+        """Interpolated values of each channel at the points."""
+        if not isinstance(points[0], np.ndarray):
+            return self._interp_point(points)
+
+        index = 0
+        fractions = []
+        for ax, x, step in zip(self.axes, points, self.steps):
+            i, t = ax.locate(x)
+            index = index + i * step
+            fractions.append(t)
+
+        # index 0 for nan inputs, whose fraction is nan
+        index = np.where(index >= 0, index, 0).astype(np.intp)
+        corners = [index + o for o in self.offsets]
+
+        results = []
+        for table in self.flat:
+            v = [table[k] for k in corners]
+            for t in fractions[::-1]:
+                v = [a + t * (b - a) for a, b in zip(v[::2], v[1::2])]
+            results.append(v[0])
+        return results
+
+    def _interp_point(self, point):
+        if self._lists is None:
+            self._lists = [table.tolist() for table in self.flat]
+
+        index = 0
+        fractions = []
+        for ax, x, step in zip(self.axes, point, self.steps):
+            i, t = ax.locate_point(x)
+            index += i * step
+            fractions.append(t)
+        fractions.reverse()
+
+        corners = [index + o for o in self.offsets]
+        results = []
+        for table in self._lists:
+            v = [table[k] for k in corners]
+            for t in fractions:
+                v = [v[j] + t * (v[j + 1] - v[j]) for j in range(0, len(v), 2)]
+            results.append(v[0])
+        return results
+
+
+def _error(ref, est, threshold=0.01):
+    """Largest absolute and relative differences of the finite values."""
+    ok = np.isfinite(ref) & np.isfinite(est)
+    ok[ok] = np.abs(ref[ok]) > threshold * np.abs(ref[ok]).max()
+    err = np.abs(est - ref)[ok]
+    return {"abs": float(err.max()), "rel": float((err / np.abs(ref[ok])).max())}
+
+
+def _centers(axis):
+    return (axis.points[1:] + axis.points[:-1]) / 2
+
+
+def _outside(axes, points):
+    """Points out of the breakpoints of the axes (False for NaN)."""
+    outside = False
+    for ax, x in zip(axes, points):
+        outside = outside | (x < ax.points[0]) | (x > ax.points[-1])
+    return outside
+
+
+class _Table(object):
+    """Tables of a model, built once and stored on disk."""
+
+    kind = None
+
+    def _load(self, name, key, build):
+        """Load the tables from the cache, or build and store them."""
+        h = hashlib.sha1(repr((TABLE_VERSION, key)).encode())
+        for ax in self.axes:
+            h.update(ax.points.tobytes())
+
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        fname = f"{self.kind}_{name}_{h.hexdigest()[:16]}.npz"
+        fname = os.path.join(cache_dir, fname)
+
+        if os.path.exists(fname):
+            with np.load(fname) as f:
+                return {k: f[k] for k in f.files}
+
+        tables = build()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{fname}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, **tables)
+        os.replace(tmp, fname)
+        return tables
+
+    def _fallback(self, result, outside, func, args):
+        """Result of the model instead of the table at the points out of the
+        grid."""
+        if diagnostics.active():
+            diagnostics.record("out_of_grid", outside, type(self).__name__)
+
+        if not isinstance(outside, np.ndarray):
+            return func(*args) if outside else result
+        if not outside.any():
+            return result
+
+        shape = np.shape(result)
+        outside = np.broadcast_to(outside, shape)
+        result = np.array(result, dtype=float)
+        result[outside] = func(*[np.broadcast_to(a, shape)[outside] for a in args])
+        return result
+
+
+class FuelFlowTable(_Table):
+    """Tabulated en-route fuel flow model."""
+
+    kind = "fuelflow"
+
+    def __init__(self, ac, eng=None, mass=None, tas=None, alt=None, **kwargs):
+        """Initialize FuelFlowTable object.
+
+        Args:
+            ac (string): ICAO aircraft type (for example: A320).
+            eng (string): Engine type (for example: CFM56-5A3).
+                Leave empty to use the default engine specified
+                by in the aircraft database.
+            mass (ndarray): Mass breakpoints (unit: kg). Defaults to
+                17 points between 80% of OEW and MTOW.
+            tas (ndarray): True airspeed breakpoints (unit: kt). Defaults to
+                10 to 600 kt, every 10 kt.
+            alt (ndarray): Altitude breakpoints (unit: ft). Defaults to sea
+                level to above the ceiling, every 1000 ft.
+            **kwargs: Options passed to the models, such as use_synonym
+                and wave_drag.
+
+        """
+        if not hasattr(self, "np"):
+            self.np = importlib.import_module("numpy")
+
+        self.fuelflow = bundle.models(ac, eng, **kwargs).fuelflow
+        limits = self.fuelflow.aircraft["limits"]
+
+        if mass is None:
+            mass = np.linspace(0.8 * limits["OEW"], limits["MTOW"], 17)
+        if tas is None:
+            tas = np.arange(10, 601, 10)
+        if alt is None:
+            alt = np.arange(0, limits["ceiling"] / aero.ft + 2000, 1000)
+
+        self.axes = [Axis(mass), Axis(tas), Axis(alt)]
+
+        f = self.fuelflow
+        key = (f.const, f.thrust.const, f.drag.const, f.drag.wave_drag)
+        tables = self._load(f"{ac}_{f.engine['name']}", key, self._build)
+
+        self._grids(tables)
+        self.error = dict(zip(["abs", "rel"], tables["error"].tolist()))
+
+    def _grids(self, tables):
+        tas, alt = self.axes[1:]
+        self.drag = Grid(self.axes, tables["drag"])
+        alt = Axis(alt.points, split=True)
+        self.thrust_max = Grid([tas, alt], tables["thrust_max"])
+
+    def _build(self):
+        # clean drag at level flight, one value per breakpoint
+        points = np.meshgrid(*[ax.points for ax in self.axes], indexing="ij")
+        drag = self.fuelflow.drag.clean(*points, 0)
+
+        # maximum climb thrust at the ends of the altitude cells, with the
+        # segment of the thrust model of the cell
+        tas, alt = self.axes[1:]
+        ends, centers = alt.cells()
+        v, h = np.meshgrid(tas.points, ends, indexing="ij")
+        p, rho, T = aero.atmos(h * aero.ft)
+        mach, vcas = self.fuelflow.thrust._mach_cas(v, p, rho, T)
+        thrust_max = self.fuelflow.thrust._climb(mach, vcas, p, centers, 0)
+
+        tables = {"drag": drag[None], "thrust_max": thrust_max[None]}
+        self._grids(tables)
+
+        # error of the feasible points
+        m, v, h = np.meshgrid(*[_centers(ax) for ax in self.axes], indexing="ij")
+        error = _error(self.fuelflow.enroute(m, v, h), self.enroute(m, v, h))
+        tables["error"] = np.array([error["abs"], error["rel"]])
+        return tables
+
+    @ndarrayconvert
+    def enroute(self, mass, tas, alt, path_angle=0, fillna=True):
+        """Compute the fuel flow during climb, cruise, or descent.
+
+        Args:
+            mass (int or ndarray): Aircraft mass (unit: kg).
+            tas (int or ndarray): Aircraft true airspeed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+            path_angle (float or ndarray): Flight path angle (unit: degrees).
+            fillna (bool): Set fuel flow to NaN when the required thrust exceeds
+                the maximum thrust by more than 20%. Defaults to True.
+
+        Returns:
+            float or ndarray: Fuel flow (unit: kg/s).
+
+        """
+        gamma = path_angle * self.np.pi / 180
+        mass_level = mass * self.np.cos(gamma)
+
+        (D,) = self.drag(mass_level, tas, alt)
+        T = D + mass * 9.80665 * self.np.sin(gamma)
+
+        (T_max,) = self.thrust_max(tas, alt)
+        T = self.np.where(T < 0, 0.07 * T_max, T)
+
+        fuelflow = self.fuelflow.at_thrust(T, alt)
+
+        if fillna:
+            fuelflow = self.np.where(T > 1.20 * T_max, self.np.nan, fuelflow)
+
+        return self._fallback(
+            fuelflow,
+            _outside(self.axes, (mass_level, tas, alt)),
+            lambda *a: self.fuelflow.enroute(*a, fillna=fillna),
+            (mass, tas, alt, path_angle),
+        )
+
+
+class EmissionTable(_Table):
+    """Tabulated NOx, CO and HC emission models."""
+
+    kind = "emission"
+
+    def __init__(self, ac, eng=None, tas=None, alt=None, **kwargs):
+        """Initialize EmissionTable object.
+
+        Args:
+            ac (string): ICAO aircraft type (for example: A320).
+            eng (string): Engine type (for example: CFM56-5A3).
+                Leave empty to use the default engine specified
+                by in the aircraft database.
+            tas (ndarray): True airspeed breakpoints (unit: kt). Defaults to
+                0 to 600 kt, every 10 kt.
+            alt (ndarray): Altitude breakpoints (unit: ft). Defaults to sea
+                level to above the ceiling, every 1000 ft.
+            **kwargs: Options passed to the models, such as use_synonym.
+
+        """
+        if not hasattr(self, "np"):
+            self.np = importlib.import_module("numpy")
+
+        self.emission = bundle.models(ac, eng, **kwargs).emission
+        limits = self.emission.ac["limits"]
+
+        if tas is None:
+            tas = np.arange(0, 601, 10)
+        if alt is None:
+            alt = np.arange(0, limits["ceiling"] / aero.ft + 2000, 1000)
+
+        self.axes = [Axis(tas), Axis(alt)]
+
+        e = self.emission
+        self.ff_modes = e.ff_modes
+        self.ei = e.ei
+
+        key = e.n_eng
+        tables = self._load(f"{ac}_{e.engine['name']}", key, self._build)
+
+        self.values = Grid(self.axes, tables["values"])
+        self.error = dict(zip(["abs", "rel"], tables["error"].tolist()))
+
+    def _build(self):
+        def tabulate(tas, alt):
+            # sea-level fuel flow per unit of fuel flow, pressure ratio, and
+            # NOx correction of the flight level
+            ff_sl, ratio = self.emission._fl2sl(1, tas, alt)
+            omega = 1e-3 * np.exp(-0.0001426 * (alt - 12900))
+            nox = np.sqrt(1 / ratio) * np.exp(-19 * (omega - 0.00634))
+            return np.stack([ff_sl, ratio, nox])
+
+        points = np.meshgrid(*[ax.points for ax in self.axes], indexing="ij")
+        values = tabulate(*points)
+        self.values = Grid(self.axes, values)
+
+        # error at the cell centers, for fuel flows between idle and takeoff
+        tas, alt = np.meshgrid(*[_centers(ax) for ax in self.axes], indexing="ij")
+        ff_max = self.ff_modes[-1] * self.emission.n_eng
+        errors = [
+            _error(getattr(self.emission, s)(ffac, tas, alt), est(ffac, tas, alt))
+            for ffac in np.linspace(0.1, 1, 4) * ff_max
+            for s, est in [("nox", self.nox), ("co", self.co), ("hc", self.hc)]
+        ]
+        error = [max(e["abs"] for e in errors), max(e["rel"] for e in errors)]
+
+        return {"values": values, "error": np.array(error)}
+
+    def _outside_grid(self, result, species, ffac, tas, alt):
+        """Emission of the model at the points out of the grid."""
+        return self._fallback(
+            result,
+            _outside(self.axes, (tas, alt)),
+            getattr(self.emission, species),
+            (ffac, tas, alt),
+        )
+
+    def _fl2sl(self, ffac, tas, alt):
+        k_ff, ratio, nox = self.values(tas, alt)
+        return ffac * k_ff, ratio, nox
+
+    @ndarrayconvert
+    def nox(self, ffac, tas, alt=0):
+        """Compute NOx emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: NOx emission from all engines (unit: g/s).
+
+        """
+        ff_sl, ratio, nox = self._fl2sl(ffac, tas, alt)
+        result = self.np.interp(ff_sl, self.ff_modes, self.ei["nox"]) * nox * ffac
+        return self._outside_grid(result, "nox", ffac, tas, alt)
+
+    @ndarrayconvert
+    def co(self, ffac, tas, alt=0):
+        """Compute CO emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: CO emission from all engines (unit: g/s).
+
+        """
+        ff_sl, ratio, nox = self._fl2sl(ffac, tas, alt)
+        result = self.np.interp(ff_sl, self.ff_modes, self.ei["co"]) * ratio * ffac
+        return self._outside_grid(result, "co", ffac, tas, alt)
+
+    @ndarrayconvert
+    def hc(self, ffac, tas, alt=0):
+        """Compute HC emission with given fuel flow, speed, and altitude.
+
+        Args:
+            ffac (float or ndarray): Fuel flow for all engines (unit: kg/s).
+            tas (float or ndarray): Speed (unit: kt).
+            alt (int or ndarray): Aircraft altitude (unit: ft).
+
+        Returns:
+            float: HC emission from all engines (unit: g/s).
+
+        """
+        ff_sl, ratio, nox = self._fl2sl(ffac, tas, alt)
+        result = self.np.interp(ff_sl, self.ff_modes, self.ei["hc"]) * ratio * ffac
+        return self._outside_grid(result, "hc", ffac, tas, alt)
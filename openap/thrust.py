@@ -9,20 +9,53 @@ Simplified two-shaft turbonfan model base on:
 
 """
 
+import math
 import importlib
+from collections import namedtuple
+import numpy
 from openap import prop
-from openap.extra import ndarrayconvert
+from openap.extra import ndarrayconvert, aero
+
+ThrustConstants = namedtuple(
+    "ThrustConstants",
+    [
+        "eng_number",  # number of engines
+        "eng_bpr",  # bypass ratio
+        "eng_max_thrust",  # maximum static thrust per engine (N)
+        "cruise_mach",  # reference cruise Mach number
+        "cruise_alt",  # reference cruise altitude (ft)
+        "G0",  # gas generator function
+        "to_k1",  # takeoff thrust coefficient of the Mach term
+        "to_k2",  # takeoff thrust coefficient of the Mach squared term
+        "Fcr",  # total thrust at top of climb (N)
+        "P10",  # pressure at 10000 ft (Pa)
+        "Pcr",  # pressure at cruise altitude (Pa)
+        "vcas_ref",  # CAS at cruise altitude and Mach (m/s)
+    ],
+)
+
+# minimum number of points for the segment-wise evaluation of the climb
+# thrust, where each altitude segment is only computed on its own points
+# (numpy backend only). None (default) computes all the segments for all the
+# points. The results are identical; the segment-wise evaluation is faster
+# when most inputs fall in one segment (cruise data), or when the power and
+# logarithm functions of numpy are not vectorized on the platform. See
+# benchmark/bench_climb.py.
+masked_threshold = None
 
 
 class Thrust(object):
     """Simplified two-shaft turbonfan model."""
 
-    def __init__(self, ac, eng=None, **kwargs):
+    def __init__(self, ac, eng=None, atmosphere=None, **kwargs):
         """Initialize Thrust object.
 
         Args:
             ac (string): ICAO aircraft type (for example: A320).
             eng (string): Engine type (for example: CFM56-5A3).
+            atmosphere (TrajectoryAtmosphere): Non-standard atmosphere at
+                the points of a trajectory (see ``openap.weather``). Defaults
+                to the ISA.
 
         """
         if not hasattr(self, "np"):
@@ -38,9 +71,9 @@ class Thrust(object):
 
         engine = prop.engine(eng)
 
-        if type(aircraft["engine"]["options"]) == dict:
+        if isinstance(aircraft["engine"]["options"], dict):
             eng_options = list(aircraft["engine"]["options"].values())
-        elif type(aircraft["engine"]["options"]) == list:
+        elif isinstance(aircraft["engine"]["options"], (list, tuple)):
             eng_options = list(aircraft["engine"]["options"])
         if engine["name"] not in eng_options:
             raise RuntimeError(
@@ -60,7 +93,33 @@ class Thrust(object):
         else:
             self.cruise_mach = aircraft["cruise"]["mach"]
             self.eng_cruise_thrust = 0.2 * self.eng_max_thrust + 890
-            
+
+        self.const = self._constants()
+
+        if atmosphere is not None:
+            self.aero = atmosphere
+
+    def _constants(self):
+        """Compute the invariants of the aircraft and engine combination."""
+        G0 = 0.0606 * self.eng_bpr + 0.6337
+        h_cr = self.cruise_alt * aero.ft
+
+        return ThrustConstants(
+            eng_number=self.eng_number,
+            eng_bpr=self.eng_bpr,
+            eng_max_thrust=self.eng_max_thrust,
+            cruise_mach=self.cruise_mach,
+            cruise_alt=self.cruise_alt,
+            G0=G0,
+            to_k1=0.377
+            * (1 + self.eng_bpr)
+            / math.sqrt((1 + 0.82 * self.eng_bpr) * G0),
+            to_k2=0.23 + 0.19 * math.sqrt(self.eng_bpr),
+            Fcr=self.eng_cruise_thrust * self.eng_number,
+            P10=float(aero.pressure(10000 * aero.ft)),
+            Pcr=float(aero.pressure(h_cr)),
+            vcas_ref=float(aero.mach2cas(self.cruise_mach, h_cr)),
+        )
 
     def _dfunc(self, mratio):
         d = -0.4204 * mratio + 1.0824
@@ -87,45 +146,25 @@ class Thrust(object):
             float or ndarray: Total thrust (unit: N).
 
         """
+        c = self.const
         mach = self.aero.tas2mach(tas * self.aero.kts, 0)
 
-
-        eng_bpr = self.eng_bpr
-        G0 = 0.0606 * self.eng_bpr + 0.6337
-
         if alt is None:
             # at sea level
-            ratio = (
-                1
-                - 0.377 * (1 + eng_bpr) / self.np.sqrt((1 + 0.82 * eng_bpr) * G0) * mach
-                + (0.23 + 0.19 * self.np.sqrt(eng_bpr)) * mach ** 2
-            )
-
-           
+            ratio = 1 - c.to_k1 * mach + c.to_k2 * mach ** 2
 
         else:
-            
             # at certain altitude
             P = self.aero.pressure(alt * self.aero.ft)
             dP = P / self.aero.p0
 
-            
-
             A = -0.4327 * dP ** 2 + 1.3855 * dP + 0.0472
             Z = 0.9106 * dP ** 3 - 1.7736 * dP ** 2 + 1.8697 * dP
             X = 0.1377 * dP ** 3 - 0.4374 * dP ** 2 + 1.3003 * dP
 
-            ratio = (
-                A
-                - 0.377
-                * (1 + eng_bpr)
-                / self.np.sqrt((1 + 0.82 * eng_bpr) * G0)
-                * Z
-                * mach
-                + (0.23 + 0.19 * self.np.sqrt(eng_bpr)) * X * mach ** 2
-            )
+            ratio = A - c.to_k1 * Z * mach + c.to_k2 * X * mach ** 2
 
-        F = ratio * self.eng_max_thrust * self.eng_number
+        F = ratio * c.eng_max_thrust * c.eng_number
         return F
 
     @ndarrayconvert
@@ -156,45 +195,248 @@ class Thrust(object):
             float or ndarray: Total thrust (unit: N).
 
         """
-        roc = self.np.abs(roc)
-
         h = alt * self.aero.ft
         tas = self.np.where(tas < 10, 10, tas)
 
-        mach = self.aero.tas2mach(tas * self.aero.kts, h)
-        vcas = self.aero.tas2cas(tas * self.aero.kts, h)
+        p, rho, T = self.aero.atmos(h)
+        mach, vcas = self._mach_cas(tas, p, rho, T)
 
-        P = self.aero.pressure(h)
-        P10 = self.aero.pressure(10000 * self.aero.ft)
-        Pcr = self.aero.pressure(self.cruise_alt * self.aero.ft)
+        F = self._climb(mach, vcas, p, alt, roc)
+        return F
 
-        # approximate thrust at top of climb (REF 2)
-        Fcr = self.eng_cruise_thrust * self.eng_number
-        vcas_ref = self.aero.mach2cas(self.cruise_mach, self.cruise_alt * self.aero.ft)
+    @ndarrayconvert
+    def cruise_grad(self, tas, alt):
+        """Calculate thrust at the cruise, and its partial derivatives.
+
+        Args:
+            tas (float or ndarray): True airspeed (kt).
+            alt (float or ndarray): Altitude (ft).
+
+        Returns:
+            (float or ndarray, dict): Total thrust (unit: N), and its partial
+                derivatives with respect to tas (N/kt) and alt (N/ft).
+
+        """
+        F, grad = self.climb_grad(tas, alt, roc=0)
+        del grad["roc"]
+        return F, grad
+
+    @ndarrayconvert
+    def climb_grad(self, tas, alt, roc):
+        """Calculate thrust during the climb, and its partial derivatives.
+
+        The derivatives are closed-form, exact up to the rounding errors,
+        within the altitude segments of the model.
+
+        Args:
+            tas (float or ndarray): True airspeed (kt).
+            alt (float or ndarray): Altitude(ft)
+            roc (float or ndarray): Vertical rate (ft/min).
+
+        Returns:
+            (float or ndarray, dict): Total thrust (unit: N), and its partial
+                derivatives with respect to tas (N/kt), alt (N/ft) and
+                roc (N/(ft/min)).
+
+        """
+        h = alt * self.aero.ft
+        p, rho, T = self.aero.atmos(h)
+        dp, drho, dT = [d * self.aero.ft for d in self.aero.atmos_grad(h)]
+        return self._climb_grad(tas, alt, roc, p, rho, T, dp, drho, dT)
+
+    def _climb_grad(self, tas, alt, roc, p, rho, T, dp, drho, dT):
+        """Climb thrust and its partial derivatives, for a given atmosphere
+        and its derivatives with the altitude (per ft)."""
+        c = self.const
+
+        tas_clip = tas < 10
+        tas = self.np.where(tas_clip, 10, tas)
+        v = tas * self.aero.kts
+        v_tas = self.np.where(tas_clip, 0, self.aero.kts)
+
+        # Mach number
+        a = self.np.sqrt(self.aero.gamma * self.aero.R * T)
+        mach = v / a
+        mach_tas = v_tas / a
+        mach_alt = -mach * dT / (2 * T)
+
+        # calibrated airspeed, through the impact pressure
+        p0, rho0 = self.aero.p0, self.aero.rho0
+        u = 1.0 + rho * v * v / (7.0 * p)
+        qdyn = p * (u ** 3.5 - 1.0)
+        qdyn_tas = u ** 2.5 * rho * v * v_tas
+        qdyn_alt = dp * (u ** 3.5 - 1.0) + 0.5 * u ** 2.5 * v * v * (drho - rho * dp / p)
+        w = qdyn / p0 + 1.0
+        vcas = self.np.sqrt(7.0 * p0 / rho0 * (w ** (2.0 / 7.0) - 1.0))
+        vcas_q = w ** (-5.0 / 7.0) / (rho0 * vcas)
+        vcas_tas = vcas_q * qdyn_tas
+        vcas_alt = vcas_q * qdyn_alt
+
+        # partial derivatives of the thrust ratio of each segment with the
+        # Mach number, CAS, pressure and rate of climb
+        roc_sign = self.np.where(roc < 0, -1, 1)
+        roc = self.np.abs(roc)
+        vr = vcas / c.vcas_ref
+        log_p = self.np.log(p / c.Pcr)
 
         # segment 3: alt > 30000:
-        d = self._dfunc(mach / self.cruise_mach)
-        b = (mach / self.cruise_mach) ** (-0.11)
-        ratio_seg3 = d * self.np.log(P / Pcr) + b
+        mr = mach / c.cruise_mach
+        r3 = self._ratio_seg3(c, mach, p)
+        r3_mach = (-0.4204 * log_p - 0.11 * mr ** (-1.11)) / c.cruise_mach
+        r3_p = self._dfunc(mr) / p
 
         # segment 2: 10000 < alt <= 30000:
-        a = (vcas / vcas_ref) ** (-0.1)
+        a = vr ** (-0.1)
         n = self._nfunc(roc)
-        ratio_seg2 = a * (P / Pcr) ** (-0.355 * (vcas / vcas_ref) + n)
+        r2 = self._ratio_seg2(c, a, n, vcas, p)
+        r2_vcas = r2 * (-0.1 / vr - 0.355 * log_p) / c.vcas_ref
+        r2_p = r2 * (-0.355 * vr + n) / p
+        r2_roc = r2 * log_p * 2.667e-05
+
+        # segment 1: alt <= 10000:
+        r1 = self._ratio_seg1(c, a, n, vcas, p, roc)
+        m = self._mfunc(vr, roc)
+        log_p10 = self.np.log(c.P10 / c.Pcr)
+        r10 = a * (c.P10 / c.Pcr) ** (-0.355 * vr + n)
+        dp10 = (p - c.P10) / c.Pcr
+        r1_vcas = (-1.2043e-1 * dp10 + r10 * (-0.1 / vr - 0.355 * log_p10)) / c.vcas_ref
+        r1_p = m / c.Pcr
+        r1_roc = (-1.77778e-8 * roc + 2.4444e-5) * dp10 + r10 * log_p10 * 2.667e-05
+
+        def segments(x3, x2, x1):
+            return self.np.where(alt > 30000, x3, self.np.where(alt > 10000, x2, x1))
+
+        ratio = segments(r3, r2, r1)
+        r_mach = segments(r3_mach, 0, 0)
+        r_vcas = segments(0, r2_vcas, r1_vcas)
+        r_p = segments(r3_p, r2_p, r1_p)
+        r_roc = segments(0, r2_roc, r1_roc)
+
+        F = ratio * c.Fcr
+        grad = {
+            "tas": (r_mach * mach_tas + r_vcas * vcas_tas) * c.Fcr,
+            "alt": (r_mach * mach_alt + r_vcas * vcas_alt + r_p * dp) * c.Fcr,
+            "roc": r_roc * roc_sign * c.Fcr,
+        }
+        return F, grad
+
+    def _mach_cas(self, tas, p, rho, T):
+        """Mach number and calibrated airspeed (m/s) for a given atmosphere."""
+        v = tas * self.aero.kts
+        mach = v / self.np.sqrt(self.aero.gamma * self.aero.R * T)
+
+        p0, rho0 = self.aero.p0, self.aero.rho0
+        qdyn = p * ((1.0 + rho * v * v / (7.0 * p)) ** 3.5 - 1.0)
+        vcas = self.np.sqrt(7.0 * p0 / rho0 * ((qdyn / p0 + 1.0) ** (2.0 / 7.0) - 1.0))
+        return mach, vcas
+
+    def _climb(self, mach, vcas, P, alt, roc):
+        """Climb thrust from Mach number, CAS (m/s), and air pressure (Pa)."""
+        c = self.const
+        roc = self.np.abs(roc)
+
+        if self.np is numpy and masked_threshold is not None:
+            shape = numpy.broadcast_shapes(
+                *[numpy.shape(x) for x in (mach, vcas, P, alt, roc, *c)]
+            )
+            if numpy.prod(shape) >= masked_threshold:
+                return self._climb_masked(shape, c, mach, vcas, P, alt, roc)
+
+        # segment 3: alt > 30000:
+        ratio_seg3 = self._ratio_seg3(c, mach, P)
 
+        # segment 2: 10000 < alt <= 30000:
+        a = (vcas / c.vcas_ref) ** (-0.1)
+        n = self._nfunc(roc)
+        ratio_seg2 = self._ratio_seg2(c, a, n, vcas, P)
 
         # segment 1: alt <= 10000:
-        F10 = Fcr * a * (P10 / Pcr) ** (-0.355 * (vcas / vcas_ref) + n)
-        m = self._mfunc(vcas / vcas_ref, roc)
-        ratio_seg1 = m * (P / Pcr) + (F10 / Fcr - m * (P10 / Pcr))
+        ratio_seg1 = self._ratio_seg1(c, a, n, vcas, P, roc)
 
         ratio = self.np.where(
             alt > 30000, ratio_seg3, self.np.where(alt > 10000, ratio_seg2, ratio_seg1)
         )
 
-        F = ratio * Fcr
+        F = ratio * c.Fcr
         return F
 
+    def _climb_masked(self, shape, c, mach, vcas, P, alt, roc):
+        """Climb thrust, with each segment computed on its own points only."""
+
+        def flat(x):
+            if isinstance(x, numpy.ndarray) and x.ndim > 0:
+                return numpy.broadcast_to(x, shape).ravel()
+            return x
+
+        def sub(x):
+            if isinstance(x, numpy.ndarray) and x.ndim > 0:
+                return x[index]
+            return x
+
+        # all the inputs, including the scalars (a constant altitude), are
+        # broadcast to the points
+        mach, vcas, P, alt, roc = [
+            numpy.broadcast_to(x, shape).ravel() for x in (mach, vcas, P, alt, roc)
+        ]
+
+        # per-point constants (fleet models) are gathered as well
+        per_point = any(numpy.ndim(v) > 0 for v in c)
+        if per_point:
+            c = c._replace(**{k: flat(v) for k, v in c._asdict().items()})
+
+        above_10k = alt > 10000
+        above_30k = alt > 30000
+
+        F = numpy.empty(int(numpy.prod(shape)))
+        for segment, mask in [
+            (3, above_30k),
+            (2, above_10k & ~above_30k),
+            (1, ~above_10k),  # including nan altitudes
+        ]:
+            # index arrays are much faster than boolean masks
+            index = numpy.flatnonzero(mask)
+            if index.size == 0:
+                continue
+            if index.size == F.size:
+                # a single segment, evaluated without gathering the points
+                index = slice(None)
+
+            cs = c
+            if per_point:
+                cs = c._replace(**{k: sub(v) for k, v in c._asdict().items()})
+            vcas_s, P_s = sub(vcas), sub(P)
+
+            if segment == 3:
+                ratio = self._ratio_seg3(cs, sub(mach), P_s)
+            else:
+                roc_s = sub(roc)
+                a = (vcas_s / cs.vcas_ref) ** (-0.1)
+                n = self._nfunc(roc_s)
+                if segment == 2:
+                    ratio = self._ratio_seg2(cs, a, n, vcas_s, P_s)
+                else:
+                    ratio = self._ratio_seg1(cs, a, n, vcas_s, P_s, roc_s)
+
+            F[index] = ratio * cs.Fcr
+
+        return F.reshape(shape)
+
+    def _ratio_seg3(self, c, mach, P):
+        """Thrust ratio above 30000 ft."""
+        d = self._dfunc(mach / c.cruise_mach)
+        b = (mach / c.cruise_mach) ** (-0.11)
+        return d * self.np.log(P / c.Pcr) + b
+
+    def _ratio_seg2(self, c, a, n, vcas, P):
+        """Thrust ratio between 10000 and 30000 ft."""
+        return a * (P / c.Pcr) ** (-0.355 * (vcas / c.vcas_ref) + n)
+
+    def _ratio_seg1(self, c, a, n, vcas, P, roc):
+        """Thrust ratio below 10000 ft."""
+        F10 = c.Fcr * a * (c.P10 / c.Pcr) ** (-0.355 * (vcas / c.vcas_ref) + n)
+        m = self._mfunc(vcas / c.vcas_ref, roc)
+        return m * (P / c.Pcr) + (F10 / c.Fcr - m * (c.P10 / c.Pcr))
+
     def descent_idle(self, tas, alt):
         """Idle thrust during the descent.
 
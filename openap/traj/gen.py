@@ -25,7 +25,7 @@ Examples::
 
 """
 
-from openap import aero, prop, WRAP
+from openap import aero, prop, diagnostics, WRAP
 import numpy as np
 
 
@@ -161,10 +161,7 @@ class Generator(object):
         h_const_cas = self.wrap.climb_cross_alt_concas()["default"] * 1000
 
         h_const_mach = aero.crossover_alt(vcas_const, mach_const)
-        if h_const_mach > h_cr:
-            print(
-                "Warning: const mach crossover altitude higher than cruise altitude, altitude clipped."
-            )
+        diagnostics.record("crossover_clipped", h_const_mach > h_cr, "Generator")
 
         data = []
 
@@ -319,10 +316,7 @@ class Generator(object):
         h_const_cas = self.wrap.descent_cross_alt_concas()["default"] * 1000
 
         h_const_mach = aero.crossover_alt(vcas_const, mach_const)
-        if h_const_mach > h_cr:
-            print(
-                "Warning: const mach crossover altitude higher than cruise altitude, altitude clipped."
-            )
+        diagnostics.record("crossover_clipped", h_const_mach > h_cr, "Generator")
 
         data = []
 
@@ -1,7 +1,6 @@
 import numpy as np
 from openap import aero, prop, Thrust, Drag, FuelFlow
 from scipy.optimize import minimize
-from numdifftools import Jacobian
 
 def calc_normfactor(x):
     return 1 / x
@@ -42,6 +41,21 @@ class CruiseOptimizer(object):
         ]) * self.normfactor.reshape(2, -1)
 
 
+    def _speed(self, x):
+        """Mach number, altitude, true airspeed and its derivatives."""
+        mach, h = denormalize(x, self.normfactor)
+        a = aero.vsound(h)
+        dp, drho, dT = aero.atmos_grad(h)
+        va = mach * a
+        dva = np.array([a, va * dT / (2 * aero.temperature(h))])
+        return mach, h, va, dva
+
+    def _chain(self, grad, dva):
+        """Gradient with respect to x, from the derivatives of a model with
+        respect to tas (kt) and alt (ft)."""
+        d = grad['tas'] * dva / aero.kts + np.array([0, grad['alt'] / aero.ft])
+        return d / self.normfactor
+
     def func_fuel(self, x, mass):
         mach, h = denormalize(x, self.normfactor)
         va = aero.mach2tas(mach, h)
@@ -50,6 +64,12 @@ class CruiseOptimizer(object):
         # print("%.03f" % mach, "%d" % (h/aero.ft), "%.05f" % ff_m)
         return ff_m
 
+    def jac_fuel(self, x, mass):
+        mach, h, va, dva = self._speed(x)
+        ff, grad = self.fuelflow.enroute_grad(mass, va/aero.kts, h/aero.ft)
+        dff = self._chain(grad, dva)
+        return 1000 * (dff / (va+1e-3) - ff * dva / self.normfactor / (va+1e-3)**2)
+
     def func_time(self, x, mass):
         mach, h = denormalize(x, self.normfactor)
         va = aero.mach2tas(mach, h)
@@ -57,6 +77,10 @@ class CruiseOptimizer(object):
         # print("%.03f" % mach, "%d" % (h/aero.ft), "%.02f" % va)
         return va_inv
 
+    def jac_time(self, x, mass):
+        mach, h, va, dva = self._speed(x)
+        return -1000 / (va+1e-4)**2 * dva / self.normfactor
+
     def func_cons_lift(self, x, mass):
         mach, h = denormalize(x, self.normfactor)
         va = aero.mach2tas(mach, h)
@@ -67,13 +91,43 @@ class CruiseOptimizer(object):
         cd0 = self.drag.polar['clean']['cd0']
         k = self.drag.polar['clean']['k']
 
-        mach_crit = self.drag.polar['mach_crit']
-        if mach > mach_crit:
+        # no compressibility term unless the polar gives a critical Mach
+        mach_crit = self.drag.polar.get('mach_crit')
+        if mach_crit is not None and mach > mach_crit:
             cd0 += 20*(mach-mach_crit)**4
 
         dL2 = qS**2 * (1/k * (Tmax/(qS+1e-3) - cd0)) - (mass * aero.g0)**2
         return dL2
 
+    def jac_cons_lift(self, x, mass):
+        mach, h, va, dva = self._speed(x)
+        S = self.aircraft['wing']['area']
+
+        Tmax, grad = self.thrust.cruise_grad(va/aero.kts, h/aero.ft)
+        dTmax = self._chain(grad, dva)
+
+        rho = aero.density(h)
+        dp, drho, dT = aero.atmos_grad(h)
+        qS = 0.5 * rho * va**2 * S
+        dqS = S * (rho * va * dva + np.array([0, 0.5 * va**2 * drho]))
+        dqS = dqS / self.normfactor
+
+        cd0 = self.drag.polar['clean']['cd0']
+        k = self.drag.polar['clean']['k']
+        dcd0 = np.zeros(2)
+
+        # no compressibility term unless the polar gives a critical Mach
+        mach_crit = self.drag.polar.get('mach_crit')
+        if mach_crit is not None and mach > mach_crit:
+            cd0 += 20*(mach-mach_crit)**4
+            dcd0[0] = 80*(mach-mach_crit)**3 / self.normfactor[0]
+
+        q = qS + 1e-3
+        return (
+            2 * qS * dqS / k * (Tmax/q - cd0)
+            + qS**2 / k * (dTmax/q - Tmax * dqS / q**2 - dcd0)
+        )
+
     def func_cons_thrust(self, x, mass):
         mach, h = denormalize(x, self.normfactor)
         va = aero.mach2tas(mach, h)
@@ -84,29 +138,35 @@ class CruiseOptimizer(object):
         dT = Tmax - D
         return dT
 
+    def jac_cons_thrust(self, x, mass):
+        mach, h, va, dva = self._speed(x)
+        D, grad_D = self.drag.clean_grad(mass, va/aero.kts, h/aero.ft)
+        Tmax, grad_T = self.thrust.cruise_grad(va/aero.kts, h/aero.ft)
+        return self._chain(grad_T, dva) - self._chain(grad_D, dva)
+
     def optimize(self, goal, mass):
         if goal == 'fuel':
-            func = self.func_fuel
+            func, jac = self.func_fuel, self.jac_fuel
         elif goal == 'time':
-            func = self.func_time
+            func, jac = self.func_time, self.jac_time
         else:
             raise RuntimeError('Optimization goal [%s] not avaiable.' % goal)
 
         x0 = self.x0 * self.normfactor
         res = minimize(
             func, x0, args=(mass,), bounds=self.bounds,
-            jac=lambda x, m: Jacobian(lambda x: func(x, m))(x),
+            jac=jac,
             options={'maxiter': 200},
             constraints=(
                 {
                     'type': 'ineq', 'args': (mass,),
-                    'fun': lambda x, m: self.func_cons_thrust(x, m),
-                    'jac': lambda x, m: Jacobian(lambda x: self.func_cons_thrust(x, m))(x)
+                    'fun': self.func_cons_thrust,
+                    'jac': self.jac_cons_thrust,
                 },
                 {
                     'type': 'ineq', 'args': (mass,),
-                    'fun': lambda x, m: self.func_cons_lift(x, m),
-                    'jac': lambda x, m: Jacobian(lambda x: self.func_cons_lift(x, m))(x)
+                    'fun': self.func_cons_lift,
+                    'jac': self.jac_cons_lift,
                 },
             )
         )
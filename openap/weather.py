@@ -0,0 +1,464 @@
+"""Gridded non-standard atmosphere and wind.
+
+The models assume the International Standard Atmosphere (ISA) without wind
+(see ``openap.extra.aero``). ``GriddedAtmosphere`` provides the temperature,
+pressure and wind of gridded weather data instead, such as reanalysis or
+forecast data, over latitude, longitude, altitude level and time.
+
+The fields are stored as ``.npy`` files in a directory and memory-mapped
+when loaded, so that only the parts of the grid visited by the queries are
+read from the disk. All fields have the shape (time, level, lat, lon).
+
+Queries are vectorized over whole trajectories in two steps:
+
+- ``GriddedAtmosphere.along(lat, lon, time)`` locates the positions in the
+  horizontal and time axes once, and keeps the indices and weights of the
+  eight surrounding grid columns of each point.
+- The returned ``TrajectoryAtmosphere`` answers the queries at the altitudes
+  of the points, with the same functions as ``openap.extra.aero`` (atmos,
+  atmos_grad, temperature, pressure, density, vsound, and the speed
+  conversions), and ``wind``. The values are interpolated linearly in
+  latitude, longitude and time, and between the two surrounding levels:
+  linearly for the temperature and wind, and log-linearly for the pressure.
+  The level interpolation is cached for the last altitudes, since the models
+  query the atmosphere several times at the same altitudes.
+
+``Thrust``, ``Drag``, ``FuelFlow`` and ``Emission`` accept a
+``TrajectoryAtmosphere`` with the ``atmosphere`` argument, or with
+``bind``. The inputs of the models are then the points of the trajectory
+(or broadcast to them), and are neither chunked nor evaluated with the
+scalar backend. The constants of the models (such as the reference thrust
+at cruise) remain those of the ISA. The casadi, numba and tabulated models
+do not use the provider.
+
+Positions out of the grid are clamped to the grid borders, except the
+longitudes of a global grid, which wrap around.
+
+Examples::
+
+    from openap import FuelFlow, weather
+
+    grid = weather.GriddedAtmosphere.load("era5_2024-06-01")
+    atm = grid.along(lat, lon, time)
+
+    fuelflow = FuelFlow("A320", atmosphere=atm)
+    fuelflow.enroute(mass, tas, alt)
+
+    u, v = atm.wind(alt * 0.3048)
+
+"""
+
+import os
+import copy
+import numpy as np
+from openap.extra import aero
+
+FIELDS = ("temperature", "pressure", "u", "v")
+
+
+def _seconds(t):
+    """Times as float seconds, from numbers or datetime64 values."""
+    t = np.asarray(t)
+    if np.issubdtype(t.dtype, np.datetime64):
+        seconds = t.astype("datetime64[ns]").astype(np.int64) / 1e9
+        return np.where(np.isnat(t), np.nan, seconds)
+    return t.astype(float)
+
+
+class _Axis(object):
+    """Coordinates of a grid dimension, in ascending or descending order."""
+
+    def __init__(self, points, period=None):
+        points = np.asarray(points, dtype=float)
+        if points.ndim != 1 or points.size == 0:
+            raise RuntimeError("Grid axes must be non-empty 1-d arrays.")
+
+        # descending axes are located on the opposite coordinates
+        self.sign = -1.0 if points.size > 1 and points[0] > points[-1] else 1.0
+        self.points = points
+        self.n = points.size
+
+        # global longitudes wrap around, with a cell from the last to the
+        # first point
+        self.period = None
+        if period is not None and self.n > 1:
+            step = abs(points[1] - points[0])
+            if abs(abs(points[-1] - points[0]) + step - period) < 1e-6 * period:
+                self.period = period
+
+        coords = points * self.sign
+        if self.period is not None:
+            coords = np.append(coords, coords[0] + period)
+        step = np.diff(coords)
+        if np.any(step <= 0):
+            raise RuntimeError("Grid axes must be strictly monotonic.")
+        self.coords = coords
+
+        # regular axes are located without search
+        self.uniform = bool(step.size > 0 and np.allclose(step, step[0]))
+        self.scale = float(1 / step[0]) if step.size > 0 else 0.0
+
+    def locate(self, x):
+        """Indices of the two surrounding points, and weight of the second.
+
+        Non-finite coordinates are located at the first point, with a NaN
+        weight, so that the interpolated values are NaN as with the ISA.
+        """
+        x = np.asarray(x, dtype=float) * self.sign
+        coords = self.coords
+        missing = ~np.isfinite(x)
+        if missing.any():
+            x = np.where(missing, coords[0], x)
+        if self.n == 1:
+            i = np.zeros(x.shape, dtype=np.intp)
+            return i, i, np.where(missing, np.nan, 0.0)
+
+        if self.period is not None:
+            x = (x - coords[0]) % self.period + coords[0]
+
+        m = coords.size
+        if self.uniform:
+            u = (x - coords[0]) * self.scale
+            np.clip(u, 0, m - 1, out=u)
+            i = u.astype(np.intp)
+            np.minimum(i, m - 2, out=i)
+            w = u - i
+        else:
+            i = np.searchsorted(coords, x, side="right") - 1
+            np.clip(i, 0, m - 2, out=i)
+            w = (x - coords[i]) / (coords[i + 1] - coords[i])
+            np.clip(w, 0.0, 1.0, out=w)
+
+        j = i + 1
+        if self.period is not None:
+            j[j == self.n] = 0
+        if missing.any():
+            w = np.where(missing, np.nan, w)
+        return i, j, w
+
+
+class GriddedAtmosphere(object):
+    """Temperature, pressure and wind on a (time, level, lat, lon) grid.
+
+    Args:
+        lat (ndarray): Latitudes of the grid (unit: degrees).
+        lon (ndarray): Longitudes of the grid (unit: degrees).
+        level (ndarray): Altitudes of the levels (unit: m).
+        time (ndarray): Times of the grid, in seconds or as datetime64.
+        temperature (ndarray): Air temperature (unit: K).
+        pressure (ndarray): Air pressure (unit: Pa).
+        u (ndarray): Eastward wind (unit: m/s). Optional, no wind if None.
+        v (ndarray): Northward wind (unit: m/s). Optional, no wind if None.
+
+    Fields have the shape (time, level, lat, lon), and may be memory-mapped
+    arrays. Non-contiguous fields are copied.
+
+    """
+
+    def __init__(self, lat, lon, level, time, temperature, pressure, u=None, v=None):
+        self.lat = _Axis(lat)
+        self.lon = _Axis(lon, period=360.0)
+        self.level = _Axis(level)
+        self.time = _Axis(_seconds(time))
+
+        self.shape = (self.time.n, self.level.n, self.lat.n, self.lon.n)
+
+        self.fields = {}
+        for name, value in zip(FIELDS, (temperature, pressure, u, v)):
+            if value is None:
+                continue
+            value = np.asarray(value)
+            if value.shape != self.shape:
+                raise RuntimeError(
+                    f"Field {name} has shape {value.shape}, expected {self.shape}."
+                )
+            if not value.flags.c_contiguous:
+                value = np.ascontiguousarray(value)
+            # flat views, gathered with the indices of the grid points
+            self.fields[name] = value.reshape(-1)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Load the grid from a directory of .npy files.
+
+        The directory holds the axes (``lat.npy``, ``lon.npy``, ``level.npy``,
+        ``time.npy``) and the fields (``temperature.npy``, ``pressure.npy``,
+        and optionally ``u.npy`` and ``v.npy``), see ``save``.
+
+        Args:
+            path (str): Directory of the grid.
+            mmap_mode (str): Memory-map mode of the fields, passed to
+                ``numpy.load``. Defaults to "r", None to read the fields
+                in memory.
+
+        Returns:
+            GriddedAtmosphere: Gridded atmosphere.
+
+        """
+
+        def read(name, mmap_mode=None):
+            fname = os.path.join(path, f"{name}.npy")
+            if not os.path.exists(fname):
+                return None
+            return np.load(fname, mmap_mode=mmap_mode)
+
+        axes = [read(name) for name in ("lat", "lon", "level", "time")]
+        fields = [read(name, mmap_mode) for name in FIELDS]
+        if any(a is None for a in axes) or any(f is None for f in fields[:2]):
+            raise RuntimeError(f"Incomplete atmosphere grid in {path}.")
+
+        return cls(*axes, *fields)
+
+    def save(self, path):
+        """Save the grid to a directory of .npy files, see ``load``.
+
+        Args:
+            path (str): Directory of the grid, created if needed.
+
+        """
+        os.makedirs(path, exist_ok=True)
+        axes = (self.lat, self.lon, self.level, self.time)
+        for name, axis in zip(("lat", "lon", "level", "time"), axes):
+            np.save(os.path.join(path, f"{name}.npy"), axis.points)
+        for name, value in self.fields.items():
+            np.save(os.path.join(path, f"{name}.npy"), value.reshape(self.shape))
+
+    def along(self, lat, lon, time):
+        """Locate the points of a trajectory in the grid.
+
+        Args:
+            lat (float or ndarray): Latitudes (unit: degrees).
+            lon (float or ndarray): Longitudes (unit: degrees).
+            time (float or ndarray): Times, in seconds or as datetime64.
+
+        Returns:
+            TrajectoryAtmosphere: Atmosphere at the points of the trajectory.
+
+        """
+        lat, lon, time = np.broadcast_arrays(lat, lon, _seconds(time))
+        return TrajectoryAtmosphere(self, lat, lon, time)
+
+
+class TrajectoryAtmosphere(object):
+    """Atmosphere at the points of a trajectory, see ``GriddedAtmosphere``.
+
+    Provides the functions of ``openap.extra.aero`` which depend on the
+    atmosphere, evaluated at the points of the trajectory, and the constants
+    of ``openap.extra.aero``.
+
+    """
+
+    # the queries are aligned with the points of the trajectory, see
+    # openap.extra.ndarrayconvert
+    pointwise = True
+
+    def __init__(self, grid, lat, lon, time):
+        self.grid = grid
+        self.shape = lat.shape
+
+        nt, nk, ny, nx = grid.shape
+        t0, t1, wt = grid.time.locate(time.reshape(-1))
+        y0, y1, wy = grid.lat.locate(lat.reshape(-1))
+        x0, x1, wx = grid.lon.locate(lon.reshape(-1))
+
+        # flat indices (at level 0) and weights of the 8 surrounding columns,
+        # one row per column, written in place
+        n = t0.size
+        self.index = np.empty((8, n), dtype=np.intp)
+        self.weight = np.empty((8, n))
+        corner = 0
+        for t, a in ((t0, 1 - wt), (t1, wt)):
+            for y, b in ((y0, 1 - wy), (y1, wy)):
+                ty = t * (nk * ny * nx) + y * nx
+                ab = a * b
+                for x, c in ((x0, 1 - wx), (x1, wx)):
+                    np.add(ty, x, out=self.index[corner])
+                    np.multiply(ab, c, out=self.weight[corner])
+                    corner += 1
+        self.stride = ny * nx
+
+        self._h = None
+        self._cache = {}
+
+    def __getattr__(self, name):
+        # constants and ISA functions (such as crossover_alt) of aero
+        return getattr(aero, name)
+
+    def _columns(self, h):
+        """Level indices of the altitudes h, cached for the last altitudes."""
+        h = np.asarray(h, dtype=float)
+        last = self._h
+        if last is not None and last.shape == h.shape:
+            if np.array_equal(last, h, equal_nan=True):
+                return self._cache
+
+        k0, k1, wk = self.grid.level.locate(np.broadcast_to(h, self.shape).reshape(-1))
+        levels = self.grid.level.points
+        self._cache = {
+            "lower": self.index + k0 * self.stride,
+            "upper": self.index + k1 * self.stride,
+            "wk": wk,
+            "dz": np.where(np.isnan(wk), np.nan, levels[k1] - levels[k0]),
+        }
+        self._h = h.copy()
+        return self._cache
+
+    def _levels(self, name, h):
+        """Field at the two surrounding levels of h, interpolated in lat,
+        lon and time, and the position between the levels."""
+        cache = self._columns(h)
+        key = f"levels_{name}"
+        if key not in cache:
+            field = self.grid.fields[name]
+            lower = np.einsum("ij,ij->j", field.take(cache["lower"]), self.weight)
+            upper = np.einsum("ij,ij->j", field.take(cache["upper"]), self.weight)
+            cache[key] = (lower, upper)
+        return cache[key] + (cache["wk"],)
+
+    def _field(self, name, h):
+        cache = self._columns(h)
+        if name not in cache:
+            if name not in self.grid.fields:
+                value = np.zeros(cache["wk"].shape)
+            elif name == "pressure":
+                lower, upper, wk = self._levels(name, h)
+                value = lower * (upper / lower) ** wk
+            else:
+                lower, upper, wk = self._levels(name, h)
+                value = lower + wk * (upper - lower)
+            cache[name] = value.reshape(self.shape)
+        return cache[name]
+
+    def atmos(self, h):
+        """Compute press, density and temperature at a given altitude.
+
+        Args:
+            h (float or ndarray): Altitude (in meters).
+
+        Returns:
+            (ndarray, ndarray, ndarray): Air pressure (Pa), density (kg/m3),
+                and temperature (K).
+
+        """
+        p = self._field("pressure", h)
+        T = self._field("temperature", h)
+        return p, p / (aero.R * T), T
+
+    def atmos_grad(self, h):
+        """Compute the derivatives of press, density and temperature with
+        altitude, constant between two levels.
+
+        Args:
+            h (float or ndarray): Altitude (in meters).
+
+        Returns:
+            (ndarray, ndarray, ndarray): Derivatives of air pressure (Pa/m),
+                density (kg/m4), and temperature (K/m).
+
+        """
+        cache = self._columns(h)
+        if "grad" not in cache:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                inv_dz = np.where(cache["dz"] == 0, 0.0, 1 / cache["dz"])
+            p, rho, T = self.atmos(h)
+            lower, upper, wk = self._levels("temperature", h)
+            dT = ((upper - lower) * inv_dz).reshape(self.shape)
+            lower, upper, wk = self._levels("pressure", h)
+            dp = p * (np.log(upper / lower) * inv_dz).reshape(self.shape)
+            cache["grad"] = (dp, rho * (dp / p - dT / T), dT)
+        return cache["grad"]
+
+    def temperature(self, h):
+        """Compute air temperature (K) at a given altitude (m)."""
+        return self._field("temperature", h)
+
+    def pressure(self, h):
+        """Compute air pressure (Pa) at a given altitude (m)."""
+        return self._field("pressure", h)
+
+    def density(self, h):
+        """Compute air density (kg/m3) at a given altitude (m)."""
+        return self.atmos(h)[1]
+
+    def vsound(self, h):
+        """Compute speed of sound (m/s) at a given altitude (m)."""
+        return np.sqrt(aero.gamma * aero.R * self._field("temperature", h))
+
+    def wind(self, h):
+        """Compute the wind at a given altitude.
+
+        Args:
+            h (float or ndarray): Altitude (in meters).
+
+        Returns:
+            (ndarray, ndarray): Eastward and northward wind (m/s), zero when
+                the grid has no wind.
+
+        """
+        return self._field("u", h), self._field("v", h)
+
+    def tas2mach(self, v_tas, h):
+        """True airspeed (m/s) to Mach number."""
+        return v_tas / self.vsound(h)
+
+    def mach2tas(self, mach, h):
+        """Mach number to true airspeed (m/s)."""
+        return mach * self.vsound(h)
+
+    def eas2tas(self, v_eas, h):
+        """Equivalent airspeed to true airspeed (m/s)."""
+        return v_eas * np.sqrt(aero.rho0 / self.density(h))
+
+    def tas2eas(self, v_tas, h):
+        """True airspeed to equivalent airspeed (m/s)."""
+        return v_tas * np.sqrt(self.density(h) / aero.rho0)
+
+    def cas2tas(self, v_cas, h):
+        """Calibrated airspeed to true airspeed (m/s)."""
+        p, rho, T = self.atmos(h)
+        p0, rho0 = aero.p0, aero.rho0
+        qdyn = p0 * ((1.0 + rho0 * v_cas * v_cas / (7.0 * p0)) ** 3.5 - 1.0)
+        return np.sqrt(7.0 * p / rho * ((1.0 + qdyn / p) ** (2.0 / 7.0) - 1.0))
+
+    def tas2cas(self, v_tas, h):
+        """True airspeed to calibrated airspeed (m/s)."""
+        p, rho, T = self.atmos(h)
+        p0, rho0 = aero.p0, aero.rho0
+        qdyn = p * ((1.0 + rho * v_tas * v_tas / (7.0 * p)) ** 3.5 - 1.0)
+        return np.sqrt(7.0 * p0 / rho0 * ((qdyn / p0 + 1.0) ** (2.0 / 7.0) - 1.0))
+
+    def mach2cas(self, mach, h):
+        """Mach number to calibrated airspeed (m/s)."""
+        return self.tas2cas(self.mach2tas(mach, h), h)
+
+    def cas2mach(self, v_cas, h):
+        """Calibrated airspeed (m/s) to Mach number."""
+        return self.tas2mach(self.cas2tas(v_cas, h), h)
+
+    def bind(self, model):
+        """Copy of a model using this atmosphere, see ``bind``."""
+        return bind(model, self)
+
+
+def bind(model, atmosphere):
+    """Get a copy of a model using an atmosphere, sharing its constants.
+
+    Cheaper than creating a new model for each trajectory. The thrust and
+    drag models of a fuel flow model use the atmosphere as well.
+
+    Args:
+        model: Model object (Thrust, Drag, FuelFlow or Emission).
+        atmosphere (TrajectoryAtmosphere): Atmosphere of the trajectory.
+            None for the ISA.
+
+    Returns:
+        Copy of the model.
+
+    """
+    view = copy.copy(model)
+    view.aero = aero if atmosphere is None else atmosphere
+    for name in ("thrust", "drag"):
+        sub = model.__dict__.get(name)
+        if sub is not None:
+            setattr(view, name, bind(sub, atmosphere))
+    return view
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from openap import aero
+
+h = np.linspace(0, 20000, 100003)
+
+
+@pytest.fixture
+def table():
+    aero.set_atmos_table()
+    yield
+    aero.set_atmos_table(None)
+
+
+def test_atmos_table(table):
+    p, rho, T = aero.atmos(h)
+    aero.set_atmos_table(None)
+    p_ref, rho_ref, T_ref = aero.atmos(h)
+
+    np.testing.assert_allclose(p, p_ref, rtol=1e-8)
+    np.testing.assert_allclose(rho, rho_ref, rtol=1e-8)
+    assert np.array_equal(T, T_ref)
+
+
+def test_atmos_table_fallback(table):
+    # out of the table, nan, and scalars use the formulas
+    for alt in [np.array([-100, 1000]), np.array([1000, 25000]), np.array([np.nan, 0])]:
+        result = aero.atmos(alt)
+        aero.set_atmos_table(None)
+        expected = aero.atmos(alt)
+        aero.set_atmos_table()
+        for a, b in zip(result, expected):
+            assert np.array_equal(a, b, equal_nan=True)
+
+    assert aero.density(1234.5) == aero._isa(1234.5)[1]
+
+
+def test_atmos_table_conversions(table):
+    v = np.full(h.shape, 200.0)
+    cas = aero.tas2cas(v, h)
+    aero.set_atmos_table(None)
+    np.testing.assert_allclose(cas, aero.tas2cas(v, h), rtol=1e-8)
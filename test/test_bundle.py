@@ -0,0 +1,28 @@
+import openap
+from openap import bundle
+
+
+def test_models_shared():
+    m1 = openap.models("A320")
+    m2 = openap.models("A320", "CFM56-5B4")
+    assert m1 is m2
+    assert m1.fuelflow.thrust is m1.thrust
+    assert m1.fuelflow.drag is m1.drag
+
+    ff = m1.fuelflow.enroute(mass=60000, tas=230, alt=32000)
+    assert ff == openap.FuelFlow("A320").enroute(mass=60000, tas=230, alt=32000)
+    assert m1.emission.nox(ff, tas=230, alt=32000) > 0
+
+
+def test_models_lru():
+    capacity = bundle.cache.maxsize
+    bundle.set_capacity(2)
+    try:
+        m = openap.models("A320")
+        openap.models("A321")
+        openap.models("A320")
+        openap.models("B738")
+        assert openap.models("A320") is m
+        assert bundle.cache.stats()["size"] == 2
+    finally:
+        bundle.set_capacity(capacity)
@@ -0,0 +1,90 @@
+import shutil
+import numpy as np
+import pytest
+import openap
+
+casadi = pytest.importorskip("casadi")
+from openap import casadi as oc  # noqa: E402
+from openap.casadi import cache  # noqa: E402
+
+rng = np.random.default_rng(0)
+n = 100
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+
+
+def value(expr, symbols, values):
+    f = casadi.Function("f", symbols, [expr])
+    return np.array([float(f(*v)) for v in zip(*values)])
+
+
+@pytest.mark.parametrize("sym", [casadi.SX, casadi.MX])
+def test_cached_calls(sym, monkeypatch):
+    fuelflow = oc.FuelFlow("A320")
+    m, v, h = sym.sym("m"), sym.sym("v"), sym.sym("h")
+
+    expr = fuelflow.enroute(m, v, h)
+    assert isinstance(expr, sym)
+    assert fuelflow.enroute(m, v, h).shape == (1, 1)
+    assert len(cache._functions[fuelflow]) == 1
+
+    # a new function for other flags
+    fuelflow.enroute(m, v, h, fillna=False)
+    assert len(cache._functions[fuelflow]) == 2
+
+    monkeypatch.setattr(cache, "enabled", False)
+    ref = fuelflow.enroute(m, v, h)
+
+    values = (mass[:5], tas[:5], alt[:5])
+    np.testing.assert_allclose(
+        value(expr, [m, v, h], values), value(ref, [m, v, h], values), rtol=1e-14
+    )
+
+
+def test_structured_outputs():
+    thrust = oc.Thrust("A320")
+    v, h = casadi.MX.sym("v"), casadi.MX.sym("h")
+    out = thrust.climb(v, h, 2000.0)
+    assert isinstance(out, casadi.MX)
+
+    f = cache.function(thrust, "climb", v, h, 2000.0)
+    assert f.n_in() == 3 and f.n_out() == 1
+
+
+def test_evaluate(monkeypatch):
+    fuelflow = oc.FuelFlow("A320")
+    ref = openap.FuelFlow("A320").enroute(mass, tas, alt)
+    ff = cache.evaluate(fuelflow, "enroute", mass, tas, alt, n_threads=1)
+    np.testing.assert_allclose(ff, ref, rtol=1e-12)
+
+    # scalars are repeated
+    ff = cache.evaluate(fuelflow, "enroute", 60000.0, tas, alt, n_threads=2)
+    ref = openap.FuelFlow("A320").enroute(60000.0, tas, alt)
+    np.testing.assert_allclose(ff, ref, rtol=1e-12)
+
+    # bounded cache of the mapped functions, for varying numbers of points
+    monkeypatch.setattr(cache, "max_maps", 3)
+    ref = openap.FuelFlow("A320").enroute(mass, tas, alt)
+    for k in range(1, 8):
+        ff = cache.evaluate(fuelflow, "enroute", mass[:k], tas[:k], alt[:k])
+        np.testing.assert_allclose(ff, ref[:k], rtol=1e-12)
+    assert len(cache._maps[fuelflow]) == 3
+
+
+@pytest.mark.skipif(shutil.which(cache.compiler) is None, reason="no C compiler")
+def test_compile(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "cache_dir", str(tmp_path))
+    fuelflow = oc.FuelFlow("A320")
+
+    ref = cache.evaluate(fuelflow, "enroute", mass, tas, alt, n_threads=1)
+    ff = cache.evaluate(fuelflow, "enroute", mass, tas, alt, n_threads=1, compile=True)
+    np.testing.assert_allclose(ff, ref, rtol=1e-12)
+
+    libs = list(tmp_path.glob("*.so"))
+    assert len(libs) == 1 and not list(tmp_path.glob("*.c"))
+
+    # reused by new models
+    f = cache.function(oc.FuelFlow("A320"), "enroute", 0.0, 0.0, 0.0, compile=True)
+    assert list(tmp_path.glob("*.so")) == libs
+    assert float(f(mass[0], tas[0], alt[0])) == pytest.approx(ref[0], rel=1e-12)
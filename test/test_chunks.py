@@ -0,0 +1,45 @@
+import numpy as np
+from openap import FuelFlow, extra
+
+fuelflow = FuelFlow(ac="A320", eng="CFM56-5B4")
+
+rng = np.random.default_rng(0)
+mass = rng.uniform(50000, 75000, 10001)
+tas = rng.uniform(150, 480, 10001)
+alt = rng.uniform(0, 40000, 10001)
+
+
+def test_chunks_identical():
+    ff = fuelflow.enroute(mass, tas, alt, chunk_size=None)
+    ff_chunks = fuelflow.enroute(mass, tas, alt, chunk_size=999)
+    np.testing.assert_array_equal(ff, ff_chunks)
+
+    res = fuelflow.enroute(mass, tas, alt, chunk_size=None, intermediates=True)
+    res_chunks = fuelflow.enroute(mass, tas, alt, chunk_size=999, intermediates=True)
+    for key in res:
+        np.testing.assert_array_equal(res[key], res_chunks[key])
+
+
+def test_chunks_global():
+    chunk_size = extra._chunk_size
+    extra.set_chunk_size(1000)
+    try:
+        ff = fuelflow.enroute(mass.reshape(-1, 1), tas[:7], 32000)
+    finally:
+        extra.set_chunk_size(chunk_size)
+    assert ff.shape == (10001, 7)
+    np.testing.assert_array_equal(ff, fuelflow.enroute(mass.reshape(-1, 1), tas[:7], 32000))
+
+
+def test_chunks_pandas():
+    import pandas as pd
+    from openap.extra import aero
+
+    # large pandas inputs are not chunked unless asked for
+    h = pd.Series(np.tile(alt, 2) * aero.ft)
+    p, rho, T = aero.atmos(h)
+    assert isinstance(p, pd.Series) and p.index.equals(h.index)
+    assert isinstance(aero.tas2cas(h / 100, h), pd.Series)
+
+    p_chunks, _, _ = aero.atmos(h, chunk_size=1000)
+    np.testing.assert_array_equal(p_chunks, p)
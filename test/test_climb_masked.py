@@ -0,0 +1,39 @@
+import numpy as np
+import openap
+from openap import thrust
+from openap.fleet import FleetFuelFlow
+
+rng = np.random.default_rng(0)
+n = 5000
+tas = rng.uniform(0, 500, n)
+alt = rng.uniform(-1000, 45000, n)
+roc = rng.uniform(-3000, 3000, n)
+mass = rng.uniform(50000, 75000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+# segment borders and missing values
+alt[::50] = 10000
+alt[1::50] = 30000
+alt[::97] = np.nan
+
+
+def evaluate():
+    models = openap.models("B738")
+    fleet = FleetFuelFlow(["A320", "B738"])
+    return [
+        models.thrust.climb(tas, alt, roc),
+        models.thrust.descent_idle(tas, alt),
+        models.thrust.climb(tas[:100, None], alt[None, :100], 1000),
+        models.thrust.cruise(tas, np.full(n, 35000)),
+        models.thrust.climb(tas, 32000, 0),
+        models.fuelflow.enroute(60000, tas, 35000),
+        models.fuelflow.enroute(mass, tas, alt, path_angle),
+        fleet.enroute(np.arange(n) % 2, mass, tas, alt, path_angle),
+    ]
+
+
+def test_climb_masked_identical(monkeypatch):
+    dense = evaluate()
+    monkeypatch.setattr(thrust, "masked_threshold", 1)
+    for a, b in zip(evaluate(), dense):
+        assert np.array_equal(a, b, equal_nan=True)
@@ -0,0 +1,51 @@
+import numpy as np
+import openap
+from openap import diagnostics
+from openap.traj.gen import Generator
+
+mass = np.array([60000, 60000, 80000])
+tas = np.array([150, 300, 100])
+alt = np.array([2000, 30000, 40000])
+
+
+def test_negative_lift():
+    drag = openap.Drag("A320")
+
+    # no branching on the values, arrays with several elements are fine
+    D = drag.nonclean(mass, tas, alt, 10, path_angle=np.array([0, 100, 0]))
+    assert D.shape == (3,)
+
+    with diagnostics.collect(masks=True) as diag:
+        drag.nonclean(mass, tas, alt, 10, path_angle=np.array([0, 100, 0]))
+        drag.clean(60000, 300, 30000)
+
+    assert diag.counts == {"negative_lift": 1}
+    assert diag.points == {"negative_lift": 4}
+    assert np.array_equal(diag.masks["negative_lift"][0], [False, True, False])
+
+
+def test_fuelflow():
+    fuelflow = openap.FuelFlow("A320")
+
+    with diagnostics.collect() as diag:
+        ff = fuelflow.enroute(mass, tas, alt, np.array([0, 0, 5]))
+        fuelflow.enroute(mass, tas, alt, fillna=False)
+
+    assert np.isnan(ff[2])
+    assert diag.counts["thrust_exceeded"] == 2
+    assert diag.counts["nan_fuel"] == 1
+    assert diag.masks == {}
+
+    # nothing is collected outside of the with block
+    fuelflow.enroute(mass, tas, alt)
+    assert diag.counts["nan_fuel"] == 1
+    assert not diagnostics.active()
+
+
+def test_crossover_clipped():
+    trajgen = Generator("A320")
+    with diagnostics.collect() as diag:
+        trajgen.climb(dt=10, cas_const_cl=250, mach_const_cl=0.78, alt_cr=20000)
+        trajgen.descent(dt=10, cas_const_de=300, mach_const_de=0.78, alt_cr=35000)
+    assert diag.counts == {"crossover_clipped": 1}
+    assert diag.points == {"crossover_clipped": 2}
@@ -0,0 +1,47 @@
+import numpy as np
+import openap
+from openap.fleet import FleetEmission
+
+rng = np.random.default_rng(0)
+ffac = rng.uniform(0.2, 3, 1000)
+tas = rng.uniform(0, 480, 1000)
+alt = rng.uniform(0, 40000, 1000)
+
+species = ["co2", "h2o", "nox", "co", "hc", "sox", "soot"]
+
+
+def separate(emission, ffac, tas, alt):
+    return {
+        s: getattr(emission, s)(ffac, tas, alt)
+        if s in ["nox", "co", "hc"]
+        else getattr(emission, s)(ffac)
+        for s in species
+    }
+
+
+def test_emission_all():
+    emission = openap.Emission("A320")
+
+    result = emission.all(ffac, tas, alt)
+    assert list(result) == species
+    for s, ref in separate(emission, ffac, tas, alt).items():
+        assert np.array_equal(result[s], ref)
+
+    result = emission.all(1.2, 300, 30000)
+    assert result == separate(emission, 1.2, 300, 30000)
+
+    result = emission.all(ffac, tas, alt, chunk_size=100)
+    for s, ref in separate(emission, ffac, tas, alt).items():
+        assert np.array_equal(result[s], ref)
+
+
+def test_fleet_emission_all():
+    fleet = FleetEmission(["A320", "B738"])
+    index = rng.integers(0, 2, 1000)
+
+    result = fleet.all(index, ffac, tas, alt)
+    for i, ac in enumerate(fleet.types):
+        rows = index == i
+        ref = openap.Emission(ac).all(ffac[rows], tas[rows], alt[rows])
+        for s in species:
+            assert np.array_equal(result[s][rows], ref[s])
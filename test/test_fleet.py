@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import openap
+from openap.fleet import FleetFuelFlow, FleetEmission
+
+types = ["A320", "B738", "E190", "A388"]
+
+n = 20000
+rng = np.random.default_rng(0)
+index = rng.integers(0, len(types), n)
+typecode = np.array(types)[index]
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+path_angle = rng.uniform(-3, 3, n)
+mtow = np.array([openap.prop.aircraft(ac)["limits"]["MTOW"] for ac in types])
+mass = rng.uniform(0.6, 0.9, n) * mtow[index]
+
+
+def test_fleet_fuelflow():
+    fleet = FleetFuelFlow(types)
+
+    ff = fleet.enroute(typecode, mass, tas, alt, path_angle)
+    ff2 = fleet.enroute(index, mass, tas, alt, path_angle)
+    assert np.array_equal(ff, ff2, equal_nan=True)
+    to = fleet.takeoff(typecode, tas, alt=alt / 10)
+
+    for i, ac in enumerate(types):
+        rows = index == i
+        fuelflow = openap.models(ac).fuelflow
+        ref = fuelflow.enroute(mass[rows], tas[rows], alt[rows], path_angle[rows])
+        assert np.array_equal(ff[rows], ref, equal_nan=True)
+        assert np.array_equal(to[rows], fuelflow.takeoff(tas[rows], alt[rows] / 10))
+
+    ref = openap.models("B738").fuelflow
+    assert fleet.enroute("B738", 60000, 300, 30000) == ref.enroute(60000, 300, 30000)
+    assert fleet.takeoff("B738", 150) == ref.takeoff(150.0)
+
+    with pytest.raises(RuntimeError):
+        fleet.enroute(["A320", "C172"], 60000, 300, 30000)
+
+
+def test_fleet_emission():
+    fleet = FleetEmission(types)
+    ff = rng.uniform(0.1, 5, n)
+
+    nox = fleet.nox(typecode, ff, tas, alt)
+    co = fleet.co(index, ff, tas, alt)
+
+    for i, ac in enumerate(types):
+        rows = index == i
+        emission = openap.models(ac).emission
+        assert np.array_equal(nox[rows], emission.nox(ff[rows], tas[rows], alt[rows]))
+        assert np.array_equal(co[rows], emission.co(ff[rows], tas[rows], alt[rows]))
@@ -32,3 +32,41 @@ FF = fuel.enroute(mass=[60000], tas=[230], alt=[32000], path_angle=[0])
 print("fuel.enroute(mass=[60000], tas=[230], alt=[32000], path_angle=[0])")
 print(FF)
 print('-'*70)
+
+FF = fuel.enroute(mass=60000, tas=230, alt=32000, path_angle=0, intermediates=True)
+print("fuel.enroute(mass=60000, tas=230, alt=32000, path_angle=0, intermediates=True)")
+print(FF)
+print('-'*70)
+
+
+def test_enroute_intermediates():
+    import numpy as np
+    from openap import aero
+
+    # the last point climbs too steeply, beyond the maximum thrust
+    mass = np.array([60000.0, 65000.0, 70000.0, 70000.0])
+    tas = np.array([230.0, 300.0, 450.0, 250.0])
+    alt = np.array([5000.0, 20000.0, 36000.0, 30000.0])
+    path_angle = np.array([3.0, 0.0, -2.0, 15.0])
+
+    res = fuel.enroute(mass, tas, alt, path_angle, intermediates=True)
+
+    ff = fuel.enroute(mass, tas, alt, path_angle)
+    np.testing.assert_array_equal(res["fuelflow"], ff)
+    np.testing.assert_allclose(
+        res["drag"], fuel.drag.clean(mass, tas, alt, path_angle), rtol=1e-12
+    )
+    np.testing.assert_allclose(
+        res["thrust_max"], fuel.thrust.climb(tas, alt, 0), rtol=1e-12
+    )
+    np.testing.assert_allclose(res["thrust_idle"], 0.07 * res["thrust_max"])
+
+    h = alt * aero.ft
+    np.testing.assert_allclose(res["mach"], aero.tas2mach(tas * aero.kts, h))
+    np.testing.assert_allclose(res["cas"], aero.tas2cas(tas * aero.kts, h) / aero.kts)
+    for key, value in zip(["pressure", "density", "temperature"], aero.atmos(h)):
+        np.testing.assert_allclose(res[key], value)
+
+    np.testing.assert_array_equal(res["feasible"], [True, True, True, False])
+    np.testing.assert_array_equal(res["feasible"], ~np.isnan(ff))
+    assert np.isfinite(fuel.enroute(mass, tas, alt, path_angle, fillna=False)).all()
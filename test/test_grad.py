@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+import openap
+from openap import aero
+
+rng = np.random.default_rng(0)
+n = 1000
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+path_angle = rng.uniform(-3, 3, n)
+roc = rng.uniform(-3000, 3000, n)
+
+# away from the altitude segments of the thrust model, and the tropopause
+for boundary in [10000, 30000, 11000 / aero.ft]:
+    alt[np.abs(alt - boundary) < 10] += 20
+
+
+def check(func, grad_func, args, steps):
+    value, grad = grad_func(*args)
+    np.testing.assert_allclose(value, func(*args), rtol=1e-12)
+
+    for i, (name, step) in enumerate(steps.items()):
+        up, down = list(args), list(args)
+        up[i] = up[i] + step
+        down[i] = down[i] - step
+        num = (func(*up) - func(*down)) / (2 * step)
+        ok = np.isfinite(num)
+        scale = np.nanmean(np.abs(num))
+        np.testing.assert_allclose(grad[name][ok], num[ok], rtol=1e-5, atol=1e-6 * scale)
+
+
+def test_atmos_grad():
+    h = np.linspace(5, 20005, 101)  # not at the tropopause
+    up, down = aero.atmos(h + 1e-3), aero.atmos(h - 1e-3)
+    for u, d, grad in zip(up, down, aero.atmos_grad(h)):
+        np.testing.assert_allclose((u - d) / 2e-3, grad, rtol=1e-6, atol=1e-12)
+
+
+@pytest.mark.parametrize("wave_drag", [False, True])
+def test_drag_grad(wave_drag):
+    drag = openap.Drag("A320", wave_drag=wave_drag)
+    steps = {"mass": 1.0, "tas": 1e-3, "alt": 1e-2, "path_angle": 1e-5}
+    check(drag.clean, drag.clean_grad, [mass, tas, alt, path_angle], steps)
+
+
+def test_thrust_grad():
+    thrust = openap.Thrust("A320")
+    steps = {"tas": 1e-3, "alt": 1e-2, "roc": 1e-2}
+    check(thrust.climb, thrust.climb_grad, [tas, alt, roc], steps)
+    check(thrust.cruise, thrust.cruise_grad, [tas, alt], {"tas": 1e-3, "alt": 1e-2})
+
+
+def test_fuelflow_grad():
+    fuelflow = openap.FuelFlow("A320")
+    steps = {"mass": 1.0, "tas": 1e-3, "alt": 1e-2, "path_angle": 1e-5}
+    check(fuelflow.enroute, fuelflow.enroute_grad, [mass, tas, alt, path_angle], steps)
+
+    # scalar evaluation
+    ff, grad = fuelflow.enroute_grad(60000, 300, 30000, 1.0)
+    ffa, grada = fuelflow.enroute_grad([60000], [300], [30000], [1.0])
+    assert ff == pytest.approx(ffa[0], rel=1e-12)
+    for k in grad:
+        assert grad[k] == pytest.approx(grada[k][0], rel=1e-12)
+
+
+def test_cruise_optimizer():
+    pytest.importorskip("scipy")
+    from openap.traj.opt import CruiseOptimizer
+
+    opt = CruiseOptimizer("A320")
+    opt.update_bounds(hmin=30000 * aero.ft, hmax=37000 * aero.ft)
+    for goal in ["fuel", "time"]:
+        res = opt.optimize(goal, mass=60000)
+        assert res.success
@@ -0,0 +1,50 @@
+import os
+import sys
+import subprocess
+
+root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+script = """
+import sys, time
+t0 = time.perf_counter()
+from openap import FuelFlow
+print(time.perf_counter() - t0)
+print(" ".join(sorted(sys.modules)))
+"""
+
+heavy_modules = ["pandas", "scipy", "matplotlib", "skfuzzy"]
+
+# import-time budget for `from openap import FuelFlow` (unit: s)
+import_budget = 1.0
+
+
+def test_import_budget():
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+
+    import_time = float(out[0])
+    modules = out[1].split()
+
+    print("from openap import FuelFlow: %.3f s" % import_time)
+    assert import_time < import_budget
+
+    for m in heavy_modules:
+        assert m not in modules, f"{m} imported eagerly"
+
+
+def test_submodule_attributes():
+    # the submodules are attributes of the package on a fresh import, as they
+    # were with the eager imports
+    check = (
+        "import openap\n"
+        "for name in ['prop', 'thrust', 'drag', 'fuel', 'emission', 'kinematic',"
+        " 'phase', 'extra', 'bundle']:\n"
+        "    assert getattr(openap, name).__name__ == 'openap.' + name\n"
+        "assert openap.extra.aero is openap.aero\n"
+    )
+    subprocess.run([sys.executable, "-c", check], cwd=root, check=True)
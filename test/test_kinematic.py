@@ -6,3 +6,17 @@ for func in dir(wrap):
     if callable(getattr(wrap, func)):
         if not func.startswith('_'):
             print(getattr(wrap, func)())
+
+
+def test_df():
+    df = wrap.df
+    assert wrap.df is df
+    assert df["variable"].iloc[0] == "to_v_lof"
+
+
+def test_mutable_records():
+    res = wrap.cruise_mach()
+    assert type(res) is dict and type(res["statmodel_params"]) is list
+    res["default"] = 0
+    res["statmodel_params"].append(0)
+    assert wrap.cruise_mach() == WRAP("A320").cruise_mach() != res
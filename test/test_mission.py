@@ -0,0 +1,258 @@
+import numpy as np
+import pytest
+import openap
+from openap import mission
+
+n = 500
+t = np.linspace(0, 1, n)
+alt = 36000 * np.clip(np.minimum(t, 1 - t) / 0.45, 0, 1)
+tas = 250 + 180 * alt / 36000
+dt = np.full(n, 10.0)
+path_angle = np.degrees(np.arctan(np.gradient(alt, 10.0) * 0.3048 / (tas * 0.5144)))
+
+
+def reference(fuelflow, mass, takeoff=None):
+    ff = np.zeros(n)
+    for i in range(n):
+        if takeoff is not None and takeoff[i]:
+            ff[i] = fuelflow.takeoff(tas[i], alt[i])
+        else:
+            ff[i] = fuelflow.enroute(mass, tas[i], alt[i], path_angle[i])
+        mass = mass - ff[i] * dt[i]
+    return ff, mass
+
+
+@pytest.fixture(params=[True, False], ids=["numba", "python"])
+def use_numba(request, monkeypatch):
+    if request.param:
+        pytest.importorskip("numba")
+    monkeypatch.setattr(mission, "use_numba", request.param)
+
+
+@pytest.mark.parametrize("wave_drag", [False, True])
+@pytest.mark.filterwarnings("ignore:Performance warning")
+def test_integrate(use_numba, wave_drag):
+    drag = openap.Drag("A320", wave_drag=wave_drag)
+    m = mission.Mission("A320", fuelflow=openap.FuelFlow("A320", drag=drag))
+    result = m.integrate(60000, dt, tas, alt, path_angle)
+
+    ff, final_mass = reference(m.fuelflow, 60000)
+    np.testing.assert_allclose(result["fuelflow"], ff, rtol=1e-12)
+    assert result["final_mass"] == pytest.approx(final_mass, rel=1e-12)
+    assert result["mass"][0] == 60000
+    np.testing.assert_allclose(np.diff(result["mass"]), -result["fuel"][:-1])
+
+    rates = openap.Emission("A320").all(ff, tas, alt)
+    for k, v in rates.items():
+        np.testing.assert_allclose(result[k], v * dt, rtol=1e-11)
+
+
+def test_takeoff(use_numba):
+    takeoff = (alt < 3000) & (path_angle > 0)
+    m = mission.Mission("A320")
+    result = m.integrate(70000, dt, tas, alt, path_angle, takeoff=takeoff)
+
+    ff, final_mass = reference(m.fuelflow, 70000, takeoff)
+    np.testing.assert_allclose(result["fuelflow"], ff, rtol=1e-12)
+    assert result["final_mass"] == pytest.approx(final_mass, rel=1e-12)
+
+
+def test_infeasible(use_numba):
+    m = mission.Mission("A320")
+    steep = np.where(t < 0.1, 20.0, path_angle)
+    result = m.integrate(70000, dt, tas, alt, steep, emissions=False)
+    assert not result["feasible"][0]
+    assert np.isnan(result["mass"][1:]).all()
+    assert "co2" not in result
+
+    result = m.integrate(70000, dt, tas, alt, steep, fillna=False)
+    assert np.isfinite(result["final_mass"])
+
+
+@pytest.mark.parametrize("contingency", [0, 0.05])
+def test_trip_fuel(use_numba, contingency):
+    m = mission.Mission("A320")
+    solution = m.trip_fuel(
+        15000, dt, tas, alt, path_angle, reserve=2000, contingency=contingency
+    )
+    assert solution["status"] == mission.SUCCESS
+    assert solution["iterations"] == (1 if contingency == 0 else 3)
+
+    trip = solution["trip_fuel"]
+    landing = 42600 + 15000 + 2000 + contingency * trip
+    assert solution["landing_mass"] == pytest.approx(landing, abs=0.01)
+    assert solution["takeoff_mass"] == pytest.approx(landing + trip, abs=0.01)
+
+    result = m.integrate(solution["takeoff_mass"], dt, tas, alt, path_angle)
+    assert result["final_mass"] == pytest.approx(landing, abs=0.01)
+    assert solution["co2"].sum() == pytest.approx(result["co2"].sum())
+
+    forward = m.trip_fuel(
+        15000, dt, tas, alt, path_angle, reserve=2000, contingency=contingency,
+        backward=False,
+    )
+    assert forward["status"] == mission.SUCCESS
+    assert forward["trip_fuel"] == pytest.approx(trip, abs=0.02)
+
+
+def test_trip_fuel_status():
+    m = mission.Mission("A320")
+    args = (dt, tas, alt, path_angle)
+
+    status = m.trip_fuel(15000, *args, mtow=60000)["status"]
+    assert status == mission.MTOW_EXCEEDED
+    status = m.trip_fuel(15000, *args, reserve=2000, max_fuel=4000)["status"]
+    assert status == mission.CAPACITY_EXCEEDED
+    status = m.trip_fuel(15000, *args, reserve=10000)["status"]
+    assert status == mission.MLW_EXCEEDED
+
+    steep = np.where(t < 0.1, 20.0, path_angle)
+    solution = m.trip_fuel(15000, dt, tas, alt, steep)
+    assert solution["status"] == mission.INFEASIBLE
+    assert np.isfinite(solution["trip_fuel"])
+    assert solution["message"] == mission.STATUS_MESSAGES[mission.INFEASIBLE]
+
+
+def test_backward(use_numba):
+    takeoff = (alt < 3000) & (path_angle > 0)
+    m = mission.Mission("A320")
+    forward = m.integrate(70000, dt, tas, alt, path_angle, takeoff=takeoff)
+    backward = m.integrate(
+        forward["final_mass"], dt, tas, alt, path_angle, takeoff=takeoff,
+        backward=True,
+    )
+    assert backward["initial_mass"] == pytest.approx(70000, rel=1e-12)
+    np.testing.assert_allclose(backward["mass"], forward["mass"], rtol=1e-12)
+    np.testing.assert_allclose(backward["fuel"], forward["fuel"], rtol=1e-9)
+
+    # NaN before the infeasible points
+    steep = np.where((t > 0.2) & (t < 0.25), 20.0, path_angle)
+    result = m.integrate(60000, dt, tas, alt, steep, backward=True)
+    assert np.isnan(result["initial_mass"])
+    assert np.isfinite(result["mass"][t > 0.25]).all()
+
+
+def test_batch(use_numba):
+    m = mission.Mission("A320")
+    masses = np.array([60000.0, 65000.0, 70000.0])
+    tas2 = tas * np.array([[1.0], [0.95], [1.05]])
+
+    for backward in (False, True):
+        batch = m.integrate(masses, dt, tas2, alt, path_angle, backward=backward)
+        assert batch["mass"].shape == (3, n) and batch["final_mass"].shape == (3,)
+        for i in range(3):
+            single = m.integrate(
+                masses[i], dt, tas2[i], alt, path_angle, backward=backward
+            )
+            np.testing.assert_allclose(batch["fuel"][i], single["fuel"])
+            np.testing.assert_allclose(batch["co2"][i], single["co2"])
+            assert batch["initial_mass"][i] == single["initial_mass"]
+
+    payload = np.array([10000.0, 15000.0, 30000.0])
+    solution = m.trip_fuel(payload, np.tile(dt, (3, 1)), tas2, alt, path_angle)
+    assert solution["iterations"] == 1
+    status = [mission.SUCCESS, mission.SUCCESS, mission.INFEASIBLE]
+    assert list(solution["status"]) == status
+    single = m.trip_fuel(15000, dt, tas2[1], alt, path_angle)
+    assert solution["trip_fuel"][1] == pytest.approx(single["trip_fuel"])
+
+
+@pytest.mark.parametrize("mode", ["compiled", "python", "lockstep"])
+def test_ragged(mode, monkeypatch):
+    if mode == "compiled":
+        pytest.importorskip("numba")
+    monkeypatch.setattr(mission, "use_numba", mode == "compiled")
+    monkeypatch.setattr(mission, "lockstep_threshold", 1 if mode == "lockstep" else 100)
+
+    # flights of different lengths, and an empty one
+    sizes = [n, 0, 300, 120]
+    flights = [slice(0, s) for s in sizes]
+    offsets = np.cumsum([0] + sizes)
+    masses = np.array([60000.0, 61000.0, 62000.0, 63000.0])
+    concat = [
+        np.concatenate([a[f] for f in flights]) for a in (dt, tas, alt, path_angle)
+    ]
+    takeoff = (concat[2] < 3000) & (concat[3] > 0)
+
+    m = mission.Mission("A320")
+    for backward in (False, True):
+        batch = m.integrate(
+            masses, *concat, takeoff=takeoff, backward=backward, offsets=offsets
+        )
+        assert batch["fuel"].shape == (offsets[-1],)
+        assert batch["final_mass"].shape == (4,)
+        assert batch["totals"]["fuel"][1] == 0
+        assert batch["initial_mass"][1] == batch["final_mass"][1] == 61000
+
+        for i, f in enumerate(flights):
+            if sizes[i] == 0:
+                continue
+            args = [a[f] for a in (dt, tas, alt, path_angle)]
+            single = m.integrate(
+                masses[i], *args, takeoff=takeoff[offsets[i] : offsets[i + 1]],
+                backward=backward,
+            )
+            part = slice(offsets[i], offsets[i + 1])
+            np.testing.assert_allclose(batch["mass"][part], single["mass"], rtol=1e-12)
+            np.testing.assert_allclose(
+                np.diff(batch["mass"][part]), -batch["fuel"][part][:-1], rtol=1e-9
+            )
+            np.testing.assert_allclose(batch["nox"][part], single["nox"], rtol=1e-12)
+            for k in ("fuel", "co2"):
+                assert batch["totals"][k][i] == pytest.approx(single["totals"][k])
+            assert batch["final_mass"][i] == pytest.approx(single["final_mass"])
+
+    solution = m.trip_fuel(15000, *concat, takeoff=takeoff, offsets=offsets)
+    assert list(solution["status"]) == [mission.SUCCESS] * 4
+    assert solution["trip_fuel"][1] == 0
+    np.testing.assert_allclose(solution["totals"]["fuel"], solution["trip_fuel"])
+
+    with pytest.raises(RuntimeError):
+        m.integrate(masses, *concat, offsets=offsets[:-1])
+
+
+@pytest.mark.parametrize("mode", ["compiled", "python", "lockstep"])
+@pytest.mark.filterwarnings("ignore:Performance warning")
+def test_breguet(mode, monkeypatch):
+    if mode == "compiled":
+        pytest.importorskip("numba")
+    monkeypatch.setattr(mission, "use_numba", mode == "compiled")
+    monkeypatch.setattr(mission, "lockstep_threshold", 1 if mode == "lockstep" else 100)
+
+    # mostly level cruise, at a constant airspeed
+    cruise_alt = 36000 * np.clip(np.minimum(t, 1 - t) / 0.1, 0, 1)
+    cruise_tas = 250 + 200 * cruise_alt / 36000
+    cruise_dt = np.full(n, 60.0)
+    gradient = np.gradient(cruise_alt, 60.0) * 0.3048 / (cruise_tas * 0.5144)
+    args = (cruise_dt, cruise_tas, cruise_alt, np.degrees(np.arctan(gradient)))
+
+    m = mission.Mission("A320")
+    ref = m.integrate(65000, *args)
+    result = m.integrate(65000, *args, breguet=1e-3)
+
+    report = result["breguet"]
+    assert report["runs"] == 1 and report["points"] == 398
+    assert report["steps"] == n - report["points"] + 1
+    assert 0 < report["sfc_variation"] < 0.01
+
+    # same points before the run
+    climb = t < 0.09
+    np.testing.assert_allclose(result["fuel"][climb], ref["fuel"][climb], rtol=1e-12)
+    assert result["totals"]["fuel"] == pytest.approx(ref["totals"]["fuel"], rel=1e-3)
+    np.testing.assert_allclose(np.diff(result["mass"]), -result["fuel"][:-1])
+    np.testing.assert_allclose(result["fuelflow"], ref["fuelflow"], rtol=0.01)
+
+    backward = m.integrate(result["final_mass"], *args, backward=True, breguet=1e-3)
+    assert backward["initial_mass"] == pytest.approx(65000, rel=1e-12)
+    np.testing.assert_allclose(backward["mass"], result["mass"], rtol=1e-12)
+
+    solution = m.trip_fuel(10000, *args, breguet=1e-3)
+    assert solution["status"] == mission.SUCCESS
+    assert solution["trip_fuel"] == pytest.approx(
+        m.trip_fuel(10000, *args)["trip_fuel"], rel=1e-3
+    )
+
+    # no runs with the wave drag
+    drag = openap.Drag("A320", wave_drag=True)
+    m = mission.Mission("A320", fuelflow=openap.FuelFlow("A320", drag=drag))
+    assert m.integrate(65000, *args, breguet=1e-3)["breguet"]["runs"] == 0
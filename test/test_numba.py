@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import openap
+
+pytest.importorskip("numba")
+from openap import numba as onb
+
+rng = np.random.default_rng(0)
+mass = rng.uniform(50000, 75000, 1000)
+tas = rng.uniform(150, 480, 1000)
+alt = rng.uniform(0, 40000, 1000)
+
+
+def test_numba_fuelflow():
+    ff = onb.FuelFlow("A320").enroute(mass, tas, alt)
+    ff_ref = openap.FuelFlow("A320").enroute(mass, tas, alt)
+    np.testing.assert_allclose(ff, ff_ref, rtol=1e-12)
+
+    ff = onb.FuelFlow("A320").enroute(60000, 230, 32000)
+    ff_ref = openap.FuelFlow("A320").enroute(60000, 230, 32000)
+    np.testing.assert_allclose(ff, ff_ref, rtol=1e-12)
+
+
+def test_numba_parallel(monkeypatch):
+    fuelflow = onb.FuelFlow("A320")
+    ref = fuelflow.enroute(mass, tas, alt)
+    monkeypatch.setattr(onb, "parallel_threshold", 0)
+    ff = fuelflow.enroute(mass, tas, alt)
+    np.testing.assert_allclose(ff, ref, rtol=1e-15)
+
+
+def test_numba_emission():
+    ffac = rng.uniform(0.2, 3, 1000)
+    em, em_ref = onb.Emission("A320"), openap.Emission("A320")
+    np.testing.assert_allclose(em.nox(ffac, tas, alt), em_ref.nox(ffac, tas, alt), rtol=1e-12)
+    np.testing.assert_allclose(em.co(ffac, tas, alt), em_ref.co(ffac, tas, alt), rtol=1e-12)
@@ -8,3 +8,78 @@ pprint(ac)
 eng = prop.engine("CFM56-5B4")
 
 pprint(eng)
+
+
+def test_registry():
+    from openap import FuelFlow
+
+    prop.registry.clear()
+    FuelFlow("A320")
+    misses = prop.registry.stats()["misses"]
+
+    FuelFlow("A320")
+    stats = prop.registry.stats()
+    assert stats["misses"] == misses
+    assert stats["hits"] > 0
+
+    assert prop.aircraft("A320") is prop.aircraft("a320")
+    try:
+        prop.aircraft("A320")["wing"]["area"] = 0
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("aircraft properties should be read-only")
+
+
+def test_snapshot(tmp_path):
+    from openap import snapshot
+
+    path = snapshot.build(str(tmp_path / "openap.snapshot.npz"))
+    snap = snapshot.load(path)
+
+    assert snap.aircraft("a320") == dict(prop.aircraft("A320"))
+    assert snap.engine_rows("CFM56-5B4")[0]["max_thrust"] == 117900
+
+
+def test_snapshot_stale(tmp_path, monkeypatch):
+    import os
+    import shutil
+    from openap import snapshot
+
+    data = tmp_path / "data"
+    for kind in ["aircraft", "dragpolar", "wrap", "engine"]:
+        shutil.copytree(snapshot.dir_data + kind, data / kind)
+    monkeypatch.setattr(snapshot, "dir_data", str(data) + "/")
+
+    path = snapshot.build(str(tmp_path / "openap.snapshot.npz"))
+    assert snapshot.load(path) is not None
+
+    # modified source file
+    f = data / "aircraft" / "a320.yml"
+    st = f.stat()
+    os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert snapshot.load(path) is None
+
+    # added source file
+    path = snapshot.build(str(tmp_path / "openap.snapshot.npz"))
+    shutil.copy(f, data / "aircraft" / "a999.yml")
+    assert snapshot.load(path) is None
+
+
+def test_frozen_copies():
+    import copy
+    import pickle
+    from openap import WRAP
+
+    ac = prop.aircraft("B734")
+    assert isinstance(ac["engine"]["options"], list)
+
+    loaded = pickle.loads(pickle.dumps(ac))
+    assert loaded == ac and isinstance(loaded, prop.FrozenDict)
+    assert isinstance(loaded["engine"]["options"], prop.FrozenList)
+    assert pickle.loads(pickle.dumps(WRAP("A320"))).cruise_mach()["default"] > 0
+
+    # deep copies are mutable
+    mutable = copy.deepcopy(ac)
+    mutable["engine"]["options"].append("test")
+    assert type(mutable) is dict and "test" not in ac["engine"]["options"]
@@ -0,0 +1,32 @@
+import numpy as np
+from openap import FuelFlow, Emission, extra
+
+fuelflow = FuelFlow(ac="A320", eng="CFM56-5B4")
+emission = Emission(ac="A320", eng="CFM56-5B4")
+
+
+def test_scalar_matches_array():
+    for mass, tas, alt, path_angle in [
+        (60000, 230, 32000, 0),
+        (70000, 150, 5000, 3),
+        (50000, 250, 20000, -3),
+        (60000, 5, 0, 0),
+    ]:
+        ff = fuelflow.enroute(mass, tas, alt, path_angle)
+        ff_array = fuelflow.enroute([mass], [tas], [alt], [path_angle])
+        assert isinstance(ff, np.float64)
+        np.testing.assert_allclose(ff, ff_array[0], rtol=1e-12)
+
+        nox = emission.nox(0.8, tas, alt)
+        nox_array = emission.nox([0.8], [tas], [alt])
+        np.testing.assert_allclose(nox, nox_array[0], rtol=1e-12)
+
+
+def test_scalar_switch():
+    enabled = extra._scalar_fast_path
+    extra.set_scalar_fast_path(False)
+    try:
+        ff = fuelflow.enroute(60000, 230, 32000)
+    finally:
+        extra.set_scalar_fast_path(enabled)
+    assert isinstance(ff, np.ndarray) and ff.ndim == 0
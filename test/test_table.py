@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import pytest
+import openap
+from openap import table
+
+rng = np.random.default_rng(0)
+mass = rng.uniform(50000, 75000, 1000)
+tas = rng.uniform(150, 480, 1000)
+alt = rng.uniform(0, 40000, 1000)
+ffac = rng.uniform(0.3, 2, 1000)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(table, "cache_dir", str(tmp_path))
+    return tmp_path
+
+
+def test_fuelflow_table(cache_dir):
+    fuelflow = table.FuelFlowTable("A320")
+    assert fuelflow.error["rel"] < 0.1
+    assert len(os.listdir(cache_dir)) == 1
+
+    ff = fuelflow.enroute(mass, tas, alt)
+    ref = openap.FuelFlow("A320").enroute(mass, tas, alt)
+    np.testing.assert_allclose(ff, ref, rtol=0.01)
+
+    ff = fuelflow.enroute(60000, 300, 30000, 1.5)
+    ref = openap.FuelFlow("A320").enroute(60000, 300, 30000, 1.5)
+    assert ff == pytest.approx(ref, rel=0.01)
+
+    # loaded from the cache
+    cached = table.FuelFlowTable("A320")
+    assert cached.error == fuelflow.error
+    ff = cached.enroute(mass, tas, alt)
+    assert np.array_equal(ff, fuelflow.enroute(mass, tas, alt), equal_nan=True)
+
+
+def test_emission_table():
+    emission = table.EmissionTable("A320")
+    assert emission.error["rel"] < 0.01
+
+    ref = openap.Emission("A320")
+    for species in ["nox", "co", "hc"]:
+        e = getattr(emission, species)(ffac, tas, alt)
+        np.testing.assert_allclose(e, getattr(ref, species)(ffac, tas, alt), rtol=0.02)
+
+
+def test_numba_table():
+    pytest.importorskip("numba")
+    from openap import numba as onb
+
+    fuelflow = table.FuelFlowTable("A320")
+    ff = onb.FuelFlowTable("A320").enroute(mass, tas, alt, 1.0)
+    np.testing.assert_allclose(ff, fuelflow.enroute(mass, tas, alt, 1.0), rtol=1e-12)
+
+    emission = table.EmissionTable("A320")
+    nox = onb.EmissionTable("A320").nox(ffac, tas, alt)
+    np.testing.assert_allclose(nox, emission.nox(ffac, tas, alt), rtol=1e-12)
+
+
+def test_out_of_grid():
+    from openap import diagnostics
+
+    # above the MTOW, above the ceiling, and below the speed breakpoints
+    m = np.array([60000.0, 90000.0, 60000.0, 60000.0])
+    v = np.array([300.0, 300.0, 300.0, 5.0])
+    h = np.array([30000.0, 30000.0, 50000.0, 30000.0])
+
+    fuelflow = table.FuelFlowTable("A320")
+    ref = openap.FuelFlow("A320").enroute(m, v, h, fillna=False)
+    with diagnostics.collect(masks=True) as diag:
+        ff = fuelflow.enroute(m, v, h, fillna=False)
+    assert diag.counts["out_of_grid"] == 3
+    np.testing.assert_array_equal(ff[1:], ref[1:])
+    assert ff[0] == pytest.approx(ref[0], rel=0.01)
+    assert fuelflow.enroute(90000, 300, 30000) == openap.FuelFlow("A320").enroute(
+        90000, 300, 30000
+    )
+
+    emission = table.EmissionTable("A320", tas=np.arange(100, 601, 10))
+    nox = emission.nox(1.0, v, h)
+    np.testing.assert_array_equal(
+        nox[2:], openap.Emission("A320").nox(1.0, v[2:], h[2:])
+    )
+
+    pytest.importorskip("numba")
+    from openap import numba as onb
+
+    ff = onb.FuelFlowTable("A320").enroute(m, v, h, fillna=False)
+    np.testing.assert_allclose(ff[1:], ref[1:], rtol=1e-12)
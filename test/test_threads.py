@@ -0,0 +1,91 @@
+import numpy as np
+import openap
+from openap import FuelFlow, Emission
+from openap.extra import aero
+
+n = 50000
+rng = np.random.default_rng(0)
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(150, 480, n)
+alt = rng.uniform(0, 40000, n)
+path_angle = rng.uniform(-3, 3, n)
+
+
+def test_threads_identical():
+    fuelflow = FuelFlow("A320")
+    emission = Emission("A320")
+
+    ref = fuelflow.enroute(mass, tas, alt, path_angle, n_threads=1)
+    ff = fuelflow.enroute(mass, tas, alt, path_angle, n_threads=4, chunk_size=4096)
+    assert np.array_equal(ff, ref, equal_nan=True)
+
+    ref = emission.nox(ff, tas, alt)
+    nox = emission.nox(ff, tas, alt, n_threads=3, chunk_size=1000)
+    assert np.array_equal(nox, ref, equal_nan=True)
+
+    # threads without chunk size, split evenly between the threads
+    ref = aero.atmos(alt * aero.ft)
+    res = aero.atmos(alt * aero.ft, n_threads=4, chunk_size=None)
+    assert all(np.array_equal(a, b) for a, b in zip(res, ref))
+
+
+def test_threads_global():
+    fuelflow = FuelFlow("A320")
+    ref = fuelflow.enroute(mass, tas, alt, path_angle)
+
+    openap.extra.set_n_threads(4)
+    try:
+        ff = fuelflow.enroute(mass, tas, alt, path_angle)
+        cas = aero.tas2cas(tas * aero.kts, alt * aero.ft)
+    finally:
+        openap.extra.set_n_threads(1)
+
+    assert np.array_equal(ff, ref, equal_nan=True)
+    assert np.array_equal(cas, aero.tas2cas(tas * aero.kts, alt * aero.ft))
+
+
+def test_threads_concurrent():
+    # calls with different numbers of threads, from several threads
+    import threading
+
+    fuelflow = FuelFlow("A320")
+    ref = fuelflow.enroute(mass, tas, alt, path_angle)
+    errors, results = [], {}
+
+    def run(k):
+        try:
+            for _ in range(20):
+                results[k] = fuelflow.enroute(
+                    mass, tas, alt, path_angle, n_threads=k, chunk_size=2000
+                )
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in (2, 3, 4, 5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    for ff in results.values():
+        assert np.array_equal(ff, ref, equal_nan=True)
+
+
+def test_threads_pool():
+    import gc
+    import weakref
+
+    # a single pool, grown to the largest number of threads
+    fuelflow = FuelFlow("A320")
+    ref = fuelflow.enroute(mass, tas, alt, path_angle)
+    pools = []
+    for k in (2, 5, 3, 7, 4):
+        ff = fuelflow.enroute(mass, tas, alt, path_angle, n_threads=k, chunk_size=2000)
+        assert np.array_equal(ff, ref, equal_nan=True)
+        pools.append(weakref.ref(openap.extra._executor))
+
+    # the smaller pools are released
+    gc.collect()
+    assert openap.extra._executor_size >= 7
+    assert all(p() in (None, openap.extra._executor) for p in pools)
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+import openap
+from openap import weather, aero
+
+lat = np.arange(60, 29.5, -0.5)
+lon = np.arange(0, 360, 1.0)
+level = np.arange(0, 14001, 250.0)
+time = np.array(["2024-06-01T00", "2024-06-01T06"], dtype="datetime64[s]")
+shape = (len(time), len(level), len(lat), len(lon))
+
+rng = np.random.default_rng(0)
+n = 1000
+points = dict(
+    lat=rng.uniform(30, 60, n),
+    lon=rng.uniform(-180, 180, n),
+    time=np.datetime64("2024-06-01T00") + rng.integers(0, 6 * 3600, n).astype("m8[s]"),
+)
+mass = rng.uniform(50000, 75000, n)
+tas = rng.uniform(300, 480, n)
+alt = rng.uniform(1000, 40000, n)
+
+
+def isa_grid(dT=0.0, **wind):
+    p, rho, T = aero.atmos(level)
+    T = np.broadcast_to(T[:, None, None] + dT, shape)
+    p = np.broadcast_to(p[:, None, None], shape)
+    return weather.GriddedAtmosphere(lat, lon, level, time, T, p, **wind)
+
+
+def test_isa_grid():
+    atm = isa_grid().along(**points)
+    h = alt * aero.ft
+
+    for ref, value in zip(aero.atmos(h), atm.atmos(h)):
+        np.testing.assert_allclose(value, ref, rtol=1e-4)
+    np.testing.assert_allclose(atm.cas2tas(150, h), aero.cas2tas(150, h), rtol=1e-4)
+    assert np.all(atm.wind(h)[0] == 0)
+
+    # constant between the levels
+    h = (np.floor(h / 250) + 0.5) * 250
+    up, down = atm.atmos(h + 1), atm.atmos(h - 1)
+    for u, d, grad in zip(up, down, atm.atmos_grad(h)):
+        np.testing.assert_allclose((u - d) / 2, grad, rtol=1e-6)
+
+    ref = openap.FuelFlow("A320").enroute(mass, tas, alt)
+    ff = openap.FuelFlow("A320", atmosphere=atm).enroute(mass, tas, alt)
+    np.testing.assert_allclose(ff, ref, rtol=1e-3)
+
+    ref = openap.Emission("A320").nox(1.0, tas, alt)
+    nox = openap.Emission("A320", atmosphere=atm).nox(1.0, tas, alt)
+    np.testing.assert_allclose(nox, ref, rtol=1e-3)
+
+
+def test_temperature_deviation():
+    atm = isa_grid(dT=15.0).along(**points)
+    h = alt * aero.ft
+    np.testing.assert_allclose(atm.temperature(h), aero.temperature(h) + 15)
+
+    drag = openap.Drag("A320")
+    warm = weather.bind(drag, atm)
+    assert warm.aero is atm and drag.aero is aero
+
+    # same pressure, lower density
+    assert np.all(atm.density(h) < aero.density(h))
+    ratio = warm.clean(mass, tas, alt) / drag.clean(mass, tas, alt)
+    assert np.mean(np.abs(ratio - 1)) > 0.01
+
+    # scalar inputs are broadcast to the points of the trajectory
+    thrust = openap.Thrust("A320", atmosphere=atm)
+    assert thrust.cruise(300, 35000).shape == (n,)
+
+
+def test_interpolation():
+    # linear fields are interpolated exactly, across the date line and the
+    # time steps
+    t = (time - time[0]).astype(float)
+    T, k, y, x = np.meshgrid(t, level, lat, lon, indexing="ij")
+    xw = np.minimum(x, 360 - x)  # continuous across the date line, linear
+    u = 0.001 * T / 3600 + 0.5 * y
+    v = 0.01 * k + xw
+    p = np.broadcast_to(aero.pressure(level)[:, None, None], shape)
+    grid = weather.GriddedAtmosphere(lat, lon, level, time, 250 + 0 * T, p, u, v)
+
+    lon_pt = np.array([-0.25, 0.5, 179.5, 359.75, 720.5])
+    lat_pt = np.array([45.2, 30.1, 59.9, 44.0, 70.0])  # last one clamped
+    atm = grid.along(lat_pt, lon_pt, time[0] + np.timedelta64(3, "h"))
+    u, v = atm.wind(5100.0)
+
+    np.testing.assert_allclose(u, 0.001 * 3 + 0.5 * np.minimum(lat_pt, 60))
+    np.testing.assert_allclose(v, 51 + np.array([0.25, 0.5, 179.5, 0.25, 0.5]))
+
+
+def test_load(tmp_path):
+    grid = isa_grid(dT=5.0, u=np.full(shape, 10.0), v=np.zeros(shape))
+    grid.save(tmp_path)
+
+    loaded = weather.GriddedAtmosphere.load(tmp_path)
+    assert isinstance(np.load(tmp_path / "temperature.npy", mmap_mode="r"), np.memmap)
+
+    a, b = grid.along(**points), loaded.along(**points)
+    h = alt * aero.ft
+    np.testing.assert_array_equal(a.atmos(h), b.atmos(h))
+    np.testing.assert_allclose(b.wind(h)[0], 10.0)
+
+    (tmp_path / "pressure.npy").unlink()
+    with pytest.raises(RuntimeError):
+        weather.GriddedAtmosphere.load(tmp_path)
+
+
+def test_nan_waypoints():
+    # missing altitudes and positions give NaN, as with the ISA
+    lat_pt = np.array([45.0, np.nan, 45.0, 45.0])
+    lon_pt = np.array([10.0, 10.0, np.nan, 10.0])
+    atm = isa_grid(u=np.full(shape, 10.0), v=np.zeros(shape)).along(
+        lat_pt, lon_pt, time[0]
+    )
+    h = np.array([5000.0, 5000.0, 5000.0, np.nan])
+
+    for value, ref in zip(atm.atmos(h), aero.atmos(h)):
+        assert np.isnan(value[1:]).all() and np.isnan(ref[3])
+        assert value[0] == pytest.approx(ref[0], rel=1e-4)
+    assert np.isnan(atm.wind(h)[0][1:]).all()
+    assert np.isnan(atm.atmos_grad(h)[2][1:]).all()
+
+    ff = openap.FuelFlow("A320", atmosphere=atm).enroute(60000, 450, h / aero.ft)
+    assert np.isfinite(ff[0]) and np.isnan(ff[1:]).all()
+
+    atm = isa_grid().along(45.0, 10.0, np.datetime64("NaT"))
+    assert np.isnan(atm.temperature(5000.0)).all()
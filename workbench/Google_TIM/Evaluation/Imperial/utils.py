@@ -1,5 +1,6 @@
 import pandas as pd
-from openap import prop, FuelFlow, Emission
+import openap
+from openap import prop
 import numpy as np
 import sys
 from datetime import datetime
@@ -219,13 +220,71 @@ def processFlightdata(matching_rows):
 
 
 
+def missionInputs(trajectory):
+    """Trajectory arrays of the segments without missing data.
+
+    Below 3000 ft, climbing segments are flown at takeoff thrust.
+    """
+    dt = np.asarray(trajectory.elapsed_time_seconds, dtype=float)
+    tas = np.asarray(trajectory.true_airspeed_knots, dtype=float)
+    alt = np.asarray(trajectory.altitude_ft, dtype=float)
+    pa = np.asarray(trajectory.path_angle_radians, dtype=float)
+
+    valid = ~np.isnan(dt) & ~np.isnan(tas) & ~np.isnan(alt) & ~np.isnan(pa)
+    for i in np.flatnonzero(~valid):
+        print(f"Skipping index {i} due to missing data.")
+
+    # If in LTO mode, use takeoff fuelflow setting
+    takeoff = (alt < 3000) & (pa > 0.001)
+
+    return valid, dt[valid], tas[valid], alt[valid], pa[valid], takeoff[valid]
+
+
+def missionOutputs(emission, valid, result):
+    """Fuel burn and emission rates (g/s) of all segments, zero when skipped."""
+    fuel = np.zeros(len(valid))
+    fuel[valid] = result["fuel"]
+
+    # emission rates of each segment, all species at once
+    tas, alt = result["tas"], result["alt"]
+    rates = emission.all(result["fuelflow"], tas, alt)
+    emissions = {}
+    for species in ["co2", "h2o", "nox", "co", "hc"]:
+        emissions[species] = np.zeros(len(valid))
+        emissions[species][valid] = rates[species]
+
+    return fuel, emissions
+
+
+def integrateMission(actype, ff, emission, trajectory, mass, debug):
+    """Integrate the fuel burn and emissions along the trajectory.
+
+    Segments with missing data are skipped. Returns the fuel burn and the
+    emission rates of each segment, and the mass after each segment.
+    """
+    valid, dt, tas, alt, pa, takeoff = missionInputs(trajectory)
+
+    mission = openap.mission.Mission(actype, fuelflow=ff, emission=emission)
+    result = mission.integrate(mass, dt, tas, alt, pa, takeoff=takeoff, emissions=False)
+    result.update(tas=tas, alt=alt)
+
+    if debug and np.isnan(result["fuel"]).any():
+        raise ValueError("Fuel burn calculation resulted in NaN")
+
+    fuel, emissions = missionOutputs(emission, valid, result)
+
+    # mass after each segment
+    masses = np.append(result["mass"][1:], result["final_mass"])
+
+    return fuel, emissions, masses
+
 def getfuelBurn(actype, payload_factor, trajectory,MTOW, MFC, MLW, OEW, fuel_factor, Payload_weight, debug):
 
    
-    ff = FuelFlow(actype)
-
-    # Define emissions object
-    emission = Emission(actype)
+    # Shared (cached) fuel flow and emission models
+    models = openap.models(actype)
+    ff = models.fuelflow
+    emission = models.emission
 
     # Fuel weight breakdown
     Trip_Fuel = MFC * fuel_factor
@@ -254,65 +313,20 @@ def getfuelBurn(actype, payload_factor, trajectory,MTOW, MFC, MLW, OEW, fuel_fac
     if Trip_Fuel > MFC:
         raise ValueError("Required trip fuel is greater than maximum fuel capacity")
 
-    # Compute path angles from trajectory
-    path_angles = trajectory.path_angle_radians
-
-    # Time spent over each segment (in-between waypoints)
-    time_deltas = trajectory.elapsed_time_seconds
+    # Fuel burn and emissions of all segments, in a single integration
+    fuel_consumption_array, emissions, masses = integrateMission(
+        actype, ff, emission, trajectory, Mass_ini, debug
+    )
+    mass = masses[-1] if len(masses) else Mass_ini
 
-    # Determine the number of segments
-    n = len(time_deltas)
+    if np.any(masses < (OEW + Payload_weight + Reserve_Fuel)):
+        raise ValueError("Not enough trip fuel to complete the mission")
 
-    # Initialize a NumPy array of zeros with size n to store fuelflow*dt values
-    fuel_consumption_array = np.zeros(n)
-
-    # Initialize emissions array
-    CO2_emissions_array = np.zeros(n)
-    H2O_emissions_array = np.zeros(n)
-    Nox_emissions_array = np.zeros(n)
-    CO_emissions_array = np.zeros(n)
-    HC_emissions_array = np.zeros(n)
-
-    for i, (dt, tas, alt, pa) in enumerate(zip(time_deltas, trajectory.true_airspeed_knots, trajectory.altitude_ft, path_angles)):
-            
-        if None in (dt, tas, alt, pa):
-            print(f"Skipping index {i} due to missing data.")
-            continue
-
-        # If in LTO mode, use takeoff fuelflow setting
-        if ((alt < 3000) and (pa > 0.001)):
-            fuelflow = ff.takeoff(tas, alt, throttle = 1)
-
-        if (alt > 3000):
-            fuelflow = ff.enroute(mass, tas, alt, pa)
-
-        # If in LTO mode, use takeoff fuelflow setting
-        if ((alt < 3000) and (pa < 0.001)):
-            #fuelflow = ff.takeoff(tas, alt, throttle = 0.25)
-            fuelflow = ff.enroute(mass, tas, alt, pa)
-    
-        # Here fuelflow is change in mass (fuel burn) over a segment (Kg/s over segment)
-        mass -= fuelflow * dt
-
-        if mass < (OEW + Payload_weight + Reserve_Fuel):
-            #print("Current mission weight: ", mass)
-            #print("Current Fuel weight: ", (OEW + Payload_weight + Reserve_Fuel)-mass )
-            #print("Trip fuel weight: ", Trip_Fuel)
-            raise ValueError("Not enough trip fuel to complete the mission")
-
-        if debug:
-            if pd.isna(fuelflow * dt):
-                raise ValueError("Fuel burn calculation resulted in NaN")
-
-        # If all checks passed, append the fuel_consumption array     
-        fuel_consumption_array[i] = fuelflow * dt
-
-        # Compute emissions
-        CO2_emissions_array[i] = emission.co2(fuelflow)
-        H2O_emissions_array[i] = emission.h2o(fuelflow)
-        Nox_emissions_array[i] = emission.nox(fuelflow, tas, alt)
-        CO_emissions_array[i] = emission.co(fuelflow, tas, alt)
-        HC_emissions_array[i] =  emission.hc(fuelflow, tas, alt)
+    CO2_emissions_array = emissions["co2"]
+    H2O_emissions_array = emissions["h2o"]
+    Nox_emissions_array = emissions["nox"]
+    CO_emissions_array = emissions["co"]
+    HC_emissions_array = emissions["hc"]
 
     # Fuel burn Caclulation ends
 
@@ -341,13 +355,13 @@ def getfuelBurn_specific_Airframe(actype, payload_factor, trajectory,MTOW, MFC,
     # For now, target A319 only and switch engine to CFM56-5B5
     if actype =="A319":
         #print("Setting user-defined engine for A319")
-        ff = FuelFlow(actype, eng = 'V2527M-A5')
+        ff = openap.models(actype, eng = 'V2527M-A5').fuelflow
 
     else: # Use the most common engine configuration
-        ff = FuelFlow(actype)
+        ff = openap.models(actype).fuelflow
 
     # Define emissions object
-    emission = Emission(actype)
+    emission = openap.models(actype).emission
 
     # Fuel weight breakdown
     Trip_Fuel = MFC * fuel_factor
@@ -375,66 +389,20 @@ def getfuelBurn_specific_Airframe(actype, payload_factor, trajectory,MTOW, MFC,
     if Trip_Fuel > MFC:
         raise ValueError("Required trip fuel is greater than maximum fuel capacity")
 
-    # Compute path angles from trajectory
-    path_angles = trajectory.path_angle_radians
-
-    # Time spent over each segment (in-between waypoints)
-    time_deltas = trajectory.elapsed_time_seconds
-
-    # Determine the number of segments
-    n = len(time_deltas)
+    # Fuel burn and emissions of all segments, in a single integration
+    fuel_consumption_array, emissions, masses = integrateMission(
+        actype, ff, emission, trajectory, Mass_ini, debug
+    )
+    mass = masses[-1] if len(masses) else Mass_ini
 
-    # Initialize a NumPy array of zeros with size n to store fuelflow*dt values
-    fuel_consumption_array = np.zeros(n)
+    if np.any(masses < (OEW + Payload_weight + Reserve_Fuel)):
+        raise ValueError("Not enough trip fuel to complete the mission")
 
-    # Initialize emissions array
-    CO2_emissions_array = np.zeros(n)
-    H2O_emissions_array = np.zeros(n)
-    Nox_emissions_array = np.zeros(n)
-    CO_emissions_array = np.zeros(n)
-    HC_emissions_array = np.zeros(n)
-
-    
-    for i, (dt, tas, alt, pa) in enumerate(zip(time_deltas, trajectory.true_airspeed_knots, trajectory.altitude_ft, path_angles)):
-            
-        if None in (dt, tas, alt, pa):
-            print(f"Skipping index {i} due to missing data.")
-            continue
-
-        # If in LTO mode, use takeoff fuelflow setting
-        if ((alt < 3000) and (pa > 0.001)):
-            fuelflow = ff.takeoff(tas, alt, throttle = 1)
-
-        if (alt > 3000):
-            fuelflow = ff.enroute(mass, tas, alt, pa)
-
-        # If in LTO mode, use takeoff fuelflow setting
-        if ((alt < 3000) and (pa < 0.001)):
-            #fuelflow = ff.takeoff(tas, alt, throttle = 0.25)
-            fuelflow = ff.enroute(mass, tas, alt, pa)
-    
-        # Here fuelflow is change in mass (fuel burn) over a segment (Kg/s over segment)
-        mass -= fuelflow * dt
-
-        if mass < (OEW + Payload_weight + Reserve_Fuel):
-            #print("Current mission weight: ", mass)
-            #print("Current Fuel weight: ", (OEW + Payload_weight + Reserve_Fuel)-mass )
-            #print("Trip fuel weight: ", Trip_Fuel)
-            raise ValueError("Not enough trip fuel to complete the mission")
-
-        if debug:
-            if pd.isna(fuelflow * dt):
-                raise ValueError("Fuel burn calculation resulted in NaN")
-
-        # If all checks passed, append the fuel_consumption array     
-        fuel_consumption_array[i] = fuelflow * dt
-
-        # Compute emissions
-        CO2_emissions_array[i] = emission.co2(fuelflow)
-        H2O_emissions_array[i] = emission.h2o(fuelflow)
-        Nox_emissions_array[i] = emission.nox(fuelflow, tas, alt)
-        CO_emissions_array[i] = emission.co(fuelflow, tas, alt)
-        HC_emissions_array[i] =  emission.hc(fuelflow, tas, alt)
+    CO2_emissions_array = emissions["co2"]
+    H2O_emissions_array = emissions["h2o"]
+    Nox_emissions_array = emissions["nox"]
+    CO_emissions_array = emissions["co"]
+    HC_emissions_array = emissions["hc"]
 
     # Fuel burn Caclulation ends
 
@@ -458,9 +426,6 @@ def getfuelBurn_specific_Airframe(actype, payload_factor, trajectory,MTOW, MFC,
     return fuelBurn, CO2, H2O, NOX, CO, HC, Reserve_Fuel, Trip_Fuel, Payload_weight, fuel_consumption_array, CO2_emissions_array, H2O_emissions_array, Nox_emissions_array
 
 def compute_emissions_beta(trajectory, actype, payload_factor, debug):
-    # Define fuel flow object with default engine (TODO add specifici with Cirium)
-    ff = FuelFlow(actype)
-
     # Get aircraft type
     ac1 = prop.aircraft(actype)
 
@@ -486,27 +451,56 @@ def compute_emissions_beta(trajectory, actype, payload_factor, debug):
     # Payload weight is some fraction of total payload capacity
     Payload_weight = MPW * payload_factor
 
-    # Set initial fuel_factor/ fraction
-    fuel_factor = 0.1
-
-    max_tries = 100  # Maximum number of tries including the initial attempt
-    increment = 0.01
+    # Reserve fuel (assume 5 % of maximum fuel capacity)
+    Reserve_fuel = MFC * 0.05
 
+    # For now, target A319 only and switch engine to CFM56-5B5
+    if actype == "A319":
+        ff = openap.models(actype, eng="V2527M-A5").fuelflow
+    else:  # Use the most common engine configuration
+        ff = openap.models(actype).fuelflow
+    emission = openap.models(actype).emission
+
+    # Minimum trip fuel to land with the reserve fuel, in a few integrations
+    valid, dt, tas, alt, pa, takeoff = missionInputs(trajectory)
+    mission = openap.mission.Mission(actype, fuelflow=ff, emission=emission)
+    solution = mission.trip_fuel(
+        Payload_weight,
+        dt,
+        tas,
+        alt,
+        pa,
+        takeoff=takeoff,
+        reserve=Reserve_fuel,
+        oew=OEW,
+        mtow=MTOW,
+        mlw=MLW,
+        max_fuel=MFC + Reserve_fuel,
+        emissions=False,
+    )
+    solution.update(tas=tas, alt=alt)
+
+    status = solution["status"]
+    if status == openap.mission.INFEASIBLE:
+        if debug:
+            raise ValueError("Fuel burn calculation resulted in NaN")
+    elif status != openap.mission.SUCCESS:
+        raise ValueError(solution["message"])
 
-    for attempt in range(max_tries):
-        try:
-            #print(f"Attempt {attempt + 1} with fuel factor {fuel_factor:.2f}")
-            fuel_burn, CO2, H2O, NOX, CO, HC, Reserve_fuel, Trip_fuel, Pyload_weight, fuel_consumption_array, CO2_emissions_array, H2O_emissions_array, Nox_emissions_array  =  getfuelBurn_specific_Airframe(actype, payload_factor, trajectory, MTOW, MFC, MLW, OEW, fuel_factor, Payload_weight, debug)
-            return fuel_burn, CO2, H2O, NOX, CO, HC, Reserve_fuel, Trip_fuel, Pyload_weight, fuel_consumption_array, CO2_emissions_array, H2O_emissions_array, Nox_emissions_array
-        except ValueError as e:
-            #print(f"Attempt {attempt + 1} with fuel factor {fuel_factor:.2f}: {e}")
-            fuel_factor += increment  # Increase the fuel factor for the next attempt
+    fuel_consumption_array, emissions = missionOutputs(emission, valid, solution)
+    CO2_emissions_array = emissions["co2"]
+    H2O_emissions_array = emissions["h2o"]
+    Nox_emissions_array = emissions["nox"]
 
-            if attempt == max_tries - 1:
-                #print("Max retries reached. Unable to calculate emissions with the given parameters.")
-                #print("Flight ID : ", trajectory['flight_id'])
-                #print("Current mission distance: ", trajectory['cumulative_distance_nmi'])
-                raise  # Re-raise the last exception to indicate failure after all retries
+    fuel_burn = solution["trip_fuel"]
+    Trip_fuel = solution["trip_fuel"]
+    CO2 = np.sum(CO2_emissions_array)
+    H2O = np.sum(H2O_emissions_array)
+    NOX = np.sum(Nox_emissions_array)
+    CO = np.sum(emissions["co"])
+    HC = np.sum(emissions["hc"])
 
-  
+    print("Fuel burn:", fuel_burn)
+    print("---------------------------------------------------------------------")
 
+    return fuel_burn, CO2, H2O, NOX, CO, HC, Reserve_fuel, Trip_fuel, Payload_weight, fuel_consumption_array, CO2_emissions_array, H2O_emissions_array, Nox_emissions_array